@@ -2,8 +2,11 @@ from flask import Flask, g, request  # ✅ thêm request
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
-from flask_compress import Compress
+from app import assets, cache, fragment_cache
+from app.compression import Compression
 from app.config import Config
+from app.rate_limit import RateLimiter
+from app.startup_profile import PROFILE as STARTUP_PROFILE, is_enabled as startup_profile_enabled
 import cloudinary
 import os
 from dotenv import load_dotenv
@@ -13,19 +16,24 @@ import pytz
 db = SQLAlchemy()
 migrate = Migrate()
 login_manager = LoginManager()
-compress = Compress()
+compress = Compression()
+limiter = RateLimiter()
 
 # Timezone Việt Nam
 VN_TZ = pytz.timezone('Asia/Ho_Chi_Minh')
 
 # ===== CACHE GLOBAL (TTL) =====
-_CATEGORIES_CACHE = None
-_CACHE_TIMESTAMP = None
-_CACHE_TTL = 300  # 5 phút
+# Danh mục active cho menu: TTL 5 phút, hết hạn thì trả bản cũ thêm tối đa 60s
+# trong lúc 1 thread nạp lại (các request khác không cùng query)
+@cache.memoize('categories', ttl=300, stale_ttl=60)
+def active_categories():
+    from app.models import Category
+    return Category.query.filter_by(is_active=True).all()
 
 
 def create_app(config_class=Config):
     """Factory function để tạo Flask app - Tối ưu cho Render"""
+    STARTUP_PROFILE.begin()  # ⏱️ đo thời gian từng phase (flask startup-profile)
     app = Flask(__name__)
     load_dotenv()
 
@@ -33,12 +41,17 @@ def create_app(config_class=Config):
     app.config.from_object(config_class)
     app.config['GEMINI_API_KEY'] = os.getenv('GEMINI_API_KEY')
     app.config['CHATBOT_ENABLED'] = True
+    STARTUP_PROFILE.mark('config')
 
     # ==================== INIT EXTENSIONS ====================
     db.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
-    compress.init_app(app)  # ✅ bật nén HTTP
+    fragment_cache.init_app(app)  # ✅ tag {% cache %} cho header/footer/component
+    assets.init_app(app)  # ✅ static_url(): CSS/JS có hash (build trước compress để dist/ được nén sẵn)
+    compress.init_app(app)  # ✅ nén HTTP: static .br/.gz nén sẵn, body nén cache theo ETag
+    limiter.init_app(app)  # ✅ rate limit theo IP/session/email (RATELIMIT_STORAGE_URL)
+    STARTUP_PROFILE.mark('extensions')
 
     # ==================== CLOUDINARY ====================
     cloudinary.config(
@@ -47,6 +60,7 @@ def create_app(config_class=Config):
         api_secret=os.getenv('CLOUDINARY_API_SECRET'),
         secure=True
     )
+    STARTUP_PROFILE.mark('cloudinary')
 
     # ==================== FLASK-LOGIN ====================
     login_manager.login_view = 'admin.login'
@@ -65,13 +79,39 @@ def create_app(config_class=Config):
     app.register_blueprint(quiz_bp)
     app.register_blueprint(quiz_admin_bp)
 
-    # ==================== GEMINI INIT ====================
-    with app.app_context():
-        from app.chatbot.routes import init_gemini
-        init_gemini()
+    from app import detail_cache, related, shared_cache
+    from app.cache_bus import bus as cache_bus
+    cache_bus.init_app(app)  # xoá cache đồng bộ giữa worker/instance (CACHE_BUS)
+    shared_cache.init_app(app)  # settings/danh mục/slug dùng chung qua mmap (SHARED_CACHE_ENABLED)
+    detail_cache.init_app(app)  # LRU trang chi tiết (DETAIL_CACHE_MAX_BYTES)
+    related.init_app(app)  # related index tự rebuild nền khi nội dung đổi
+
+    from app.admin import metrics
+    metrics.init_app(app)  # số liệu dashboard (ADMIN_METRICS_TTL)
+    STARTUP_PROFILE.mark('blueprints')
+
+    # ==================== GEMINI (LAZY) ====================
+    # Không import google.generativeai lúc boot → cold start nhanh, RSS thấp;
+    # SDK được warm-up trong thread nền sau khi worker sẵn sàng
+    from app.chatbot.routes import init_chatbot
+    init_chatbot(app)
+    STARTUP_PROFILE.mark('gemini')
 
     # Khởi tạo cấu hình logging, v.v.
     config_class.init_app(app)
+    STARTUP_PROFILE.mark('logging')
+
+    # ==================== WARM CACHE TỪ SNAPSHOT ====================
+    # Worker mới (recycle sau max_requests) đọc settings/danh mục từ file
+    # snapshot thay vì query DB cho các request đầu tiên
+    snapshot_path = app.config.get('SNAPSHOT_WARM_PATH')
+    if snapshot_path:
+        from app.snapshot import warm_caches
+        try:
+            warm_caches(snapshot_path)
+        except Exception as e:
+            app.logger.warning(f'Không warm được cache từ snapshot {snapshot_path}: {e}')
+        STARTUP_PROFILE.mark('snapshot_warm')
 
     # ==================== CONTEXT PROCESSOR (TTL + per-request g) ====================
     @app.context_processor
@@ -80,24 +120,16 @@ def create_app(config_class=Config):
         - TTL cache (process-level) 5 phút để tránh query lặp qua nhiều request
         - Per-request cache bằng g.* để 1 request không query lại
         """
-        from app.models import get_setting, Category
+        from app import shared_cache
+        from app.models import get_setting
         from datetime import datetime
-        import time
-
-        global _CATEGORIES_CACHE, _CACHE_TIMESTAMP
 
         # per-request guard
         if not hasattr(g, 'all_categories'):
-            now = time.time()
-            need_refresh = (
-                _CATEGORIES_CACHE is None or
-                _CACHE_TIMESTAMP is None or
-                (now - _CACHE_TIMESTAMP) > _CACHE_TTL
-            )
-            if need_refresh:
-                _CATEGORIES_CACHE = Category.query.filter_by(is_active=True).all()
-                _CACHE_TIMESTAMP = now
-            g.all_categories = _CATEGORIES_CACHE  # dùng cache process-level
+            if shared_cache.enabled():
+                g.all_categories = shared_cache.menu_categories()  # mmap dùng chung giữa worker
+            else:
+                g.all_categories = active_categories()  # dùng cache process-level
 
         return {
             'get_setting': get_setting,
@@ -179,11 +211,15 @@ def create_app(config_class=Config):
     @app.after_request
     def after_request(response):
         """
-        - Cache static mạnh tay
+        - Cache static: file có hash (static/dist) 1 năm + immutable, còn lại cache ngắn
         - Thêm security headers cơ bản
         """
         if request.path.startswith('/static/'):
-            response.cache_control.max_age = 31536000  # 1 năm
+            if assets.is_fingerprinted(request.path):
+                response.cache_control.max_age = 31536000  # 1 năm - nội dung đổi thì URL đổi
+                response.cache_control.immutable = True
+            else:
+                response.cache_control.max_age = app.config['STATIC_MAX_AGE']
             response.cache_control.public = True
 
         response.headers['X-Content-Type-Options'] = 'nosniff'
@@ -196,12 +232,19 @@ def create_app(config_class=Config):
         """Đảm bảo đóng session sau mỗi request"""
         db.session.remove()
 
+    STARTUP_PROFILE.mark('jinja_hooks')
+    if startup_profile_enabled():
+        print(STARTUP_PROFILE.format_report())
+
     return app
 
 
 # ==================== CLEAR CACHE FUNCTION ====================
 def clear_categories_cache():
     """Helper function để clear cache khi cần"""
-    global _CATEGORIES_CACHE, _CACHE_TIMESTAMP
-    _CATEGORIES_CACHE = None
-    _CACHE_TIMESTAMP = None
+    active_categories.cache.invalidate()
+
+
+def warm_categories_cache(categories):
+    """Nạp sẵn danh mục (vd từ snapshot lúc boot) - vẫn hết hạn theo TTL của namespace"""
+    active_categories.cache.set((), categories)
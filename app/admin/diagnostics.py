@@ -0,0 +1,207 @@
+"""
+Admin Diagnostics - Tìm rò rỉ bộ nhớ bằng tracemalloc + đếm object theo kiểu
+
+Worker đang bị recycle sau max_requests vì RSS tăng dần (mất cache ấm, thêm
+cold start). Để tìm chỗ rò thật:
+
+1. start(frames): bật tracemalloc trong worker (tốn thêm RAM/CPU → chỉ bật khi đo)
+2. take_snapshot(label): chụp allocation + đếm object theo kiểu (gc), ghi ra
+   file trong DIAGNOSTICS_DIR (không giữ snapshot trong RAM của worker)
+3. Chạy tải một lúc rồi chụp tiếp → diff(base, target): top vị trí
+   (file:dòng / file / traceback) tăng nhiều nhất + kiểu object tăng nhiều nhất
+4. stop()
+
+gthread: tracemalloc theo process, dùng chung cho mọi thread; thao tác được
+khoá bằng _LOCK. Nhiều worker: snapshot id có pid ('<pid>-<label>'), file
+nằm chung thư mục nên diff được từ bất kỳ worker nào.
+"""
+
+import gc
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from flask import current_app
+
+from app.startup_profile import memory_report
+
+GROUP_BY = ('lineno', 'filename', 'traceback')
+DEFAULT_FRAMES = 10
+MAX_FRAMES = 50
+
+_LOCK = threading.Lock()
+_LABEL_RE = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+_ID_RE = re.compile(r'^\d+-[A-Za-z0-9_.-]{1,64}$')
+
+# Allocation của chính công cụ đo / import module - không phải rò rỉ của app
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+class DiagnosticsError(ValueError):
+    """Tham số sai / snapshot không tồn tại (route trả 400/404)"""
+
+
+def _directory():
+    path = current_app.config.get('DIAGNOSTICS_DIR') or os.path.join(tempfile.gettempdir(), 'bricon-diagnostics')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _paths(snapshot_id):
+    if not _ID_RE.match(snapshot_id or ''):
+        raise DiagnosticsError(f'Snapshot id không hợp lệ: {snapshot_id!r}')
+    base = os.path.join(_directory(), snapshot_id)
+    return f'{base}.tracemalloc', f'{base}.types.json'
+
+
+# ==================== TRẠNG THÁI ====================
+def status():
+    current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+    return {
+        'pid': os.getpid(),
+        'tracing': tracemalloc.is_tracing(),
+        'frames': tracemalloc.get_traceback_limit() if tracemalloc.is_tracing() else None,
+        'traced_kb': current // 1024,
+        'traced_peak_kb': peak // 1024,
+        'overhead_kb': tracemalloc.get_tracemalloc_memory() // 1024,
+        'memory': memory_report(),
+        'gc': {'counts': gc.get_count(), 'frozen': gc.get_freeze_count(), 'garbage': len(gc.garbage)},
+        'snapshots': list_snapshots(),
+    }
+
+
+def start(frames=DEFAULT_FRAMES):
+    frames = int(frames)
+    if not 1 <= frames <= MAX_FRAMES:
+        raise DiagnosticsError(f'frames phải trong khoảng 1..{MAX_FRAMES}')
+    with _LOCK:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()  # đổi số frame phải khởi động lại
+        tracemalloc.start(frames)
+    return status()
+
+
+def stop():
+    with _LOCK:
+        tracemalloc.stop()
+    return status()
+
+
+# ==================== SNAPSHOT ====================
+def type_counts():
+    """{'module.Kiểu': số object} của mọi object GC đang theo dõi"""
+    return dict(Counter(
+        f'{type(obj).__module__}.{type(obj).__qualname__}' for obj in gc.get_objects()
+    ))
+
+
+def take_snapshot(label=None, group_by='lineno', limit=10):
+    if group_by not in GROUP_BY:
+        raise DiagnosticsError(f'group_by phải là 1 trong {GROUP_BY}')
+    label = label or time.strftime('%Y%m%d-%H%M%S')
+    if not _LABEL_RE.match(label):
+        raise DiagnosticsError('Label chỉ gồm chữ, số, . _ - (tối đa 64 ký tự)')
+    if not tracemalloc.is_tracing():
+        raise DiagnosticsError('tracemalloc chưa bật - gọi start trước')
+
+    snapshot_id = f'{os.getpid()}-{label}'
+    trace_path, types_path = _paths(snapshot_id)
+    with _LOCK:
+        snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+        snapshot.dump(trace_path)
+        with open(types_path, 'w', encoding='utf-8') as f:
+            json.dump({'taken_at': time.time(), 'memory': memory_report(), 'types': type_counts()}, f)
+
+    stats = snapshot.statistics(group_by)
+    return {
+        'id': snapshot_id,
+        'total_kb': sum(stat.size for stat in stats) // 1024,
+        'top': [_stat_row(stat, group_by) for stat in stats[:limit]],
+    }
+
+
+def list_snapshots():
+    suffix = '.tracemalloc'
+    return sorted(name[:-len(suffix)] for name in os.listdir(_directory()) if name.endswith(suffix))
+
+
+def delete_snapshot(snapshot_id):
+    for path in _paths(snapshot_id):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _load(snapshot_id):
+    trace_path, types_path = _paths(snapshot_id)
+    if not os.path.exists(trace_path):
+        raise DiagnosticsError(f'Không có snapshot {snapshot_id}')
+    with open(types_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    return tracemalloc.Snapshot.load(trace_path), meta
+
+
+# ==================== DIFF ====================
+def _site(traceback):
+    frame = traceback[0]
+    return f'{frame.filename}:{frame.lineno}'
+
+
+def _stat_row(stat, group_by):
+    row = {
+        'site': _site(stat.traceback),
+        'size_kb': round(stat.size / 1024, 1),
+        'count': stat.count,
+    }
+    if group_by == 'traceback':
+        row['traceback'] = stat.traceback.format()
+    return row
+
+
+def diff(base_id, target_id, group_by='lineno', limit=20):
+    """
+    Top vị trí cấp phát tăng nhiều nhất từ base → target, và kiểu object
+    có số lượng tăng nhiều nhất
+    """
+    if group_by not in GROUP_BY:
+        raise DiagnosticsError(f'group_by phải là 1 trong {GROUP_BY}')
+    base, base_meta = _load(base_id)
+    target, target_meta = _load(target_id)
+
+    growth = []
+    for stat in target.compare_to(base, group_by):
+        if stat.size_diff <= 0:
+            continue
+        row = _stat_row(stat, group_by)
+        row.update(size_diff_kb=round(stat.size_diff / 1024, 1), count_diff=stat.count_diff)
+        growth.append(row)
+    growth.sort(key=lambda row: row['size_diff_kb'], reverse=True)
+
+    base_types, target_types = base_meta['types'], target_meta['types']
+    type_growth = sorted(
+        ((name, count - base_types.get(name, 0), count) for name, count in target_types.items()),
+        key=lambda item: item[1], reverse=True
+    )
+
+    return {
+        'base': base_id,
+        'target': target_id,
+        'group_by': group_by,
+        'seconds': round(target_meta['taken_at'] - base_meta['taken_at'], 1),
+        'memory': {'base': base_meta['memory'], 'target': target_meta['memory']},
+        'total_growth_kb': round(sum(row['size_diff_kb'] for row in growth), 1),
+        'top': growth[:limit],
+        'types': [
+            {'type': name, 'diff': delta, 'count': count}
+            for name, delta, count in type_growth[:limit] if delta > 0
+        ],
+    }
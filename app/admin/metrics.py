@@ -0,0 +1,102 @@
+"""
+Admin Metrics - Số liệu dashboard / media bằng aggregate query + TTL cache
+
+- Dashboard: 4 COUNT (sản phẩm, danh mục, bài viết, liên hệ chưa đọc) gộp
+  thành 1 SELECT gồm các scalar subquery
+- Media: tổng file, tổng dung lượng và 4 nhóm điểm SEO trong 1 query
+  (SUM(CASE ...)) thay vì 6 query
+- Cache TTL ngắn (ADMIN_METRICS_TTL, hết hạn thì trả số cũ tối đa 30s trong lúc
+  nạp lại nền), xoá sau commit khi có insert/xoá
+  (hoặc đổi trạng thái đã đọc / điểm SEO) trên bảng liên quan
+- get_metrics() trả dict cho endpoint JSON (widget dashboard tải async)
+"""
+
+from sqlalchemy import case, event, func, select
+from sqlalchemy.orm import object_session
+
+from app import cache, db
+from app.models import Product, Category, Blog, Contact, Media
+
+_metrics = cache.namespace('admin_metrics', ttl=60, stale_ttl=30)
+
+# Ngưỡng điểm SEO media (giống bộ lọc ở trang Media Library)
+SEO_BUCKETS = (
+    ('excellent', Media.seo_score >= 85),
+    ('good', Media.seo_score.between(65, 84)),
+    ('fair', Media.seo_score.between(50, 64)),
+    ('poor', Media.seo_score < 50),
+)
+
+
+def init_app(app):
+    _metrics.ttl = app.config.get('ADMIN_METRICS_TTL', _metrics.ttl)
+
+
+def _count(model, *criteria):
+    return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+
+# ==================== LOADERS ====================
+def _load_content():
+    row = db.session.execute(select(
+        _count(Product).label('products'),
+        _count(Category).label('categories'),
+        _count(Blog).label('blogs'),
+        _count(Contact, Contact.is_read == False).label('unread_contacts'),  # noqa: E712
+    )).one()
+    return dict(row._mapping)
+
+
+def _load_media():
+    row = db.session.execute(select(
+        func.count(Media.id).label('total_files'),
+        func.coalesce(func.sum(Media.file_size), 0).label('total_size'),
+        *[func.coalesce(func.sum(case((condition, 1), else_=0)), 0).label(name) for name, condition in SEO_BUCKETS]
+    )).one()
+
+    total_size = int(row.total_size or 0)
+    return {
+        'total_files': row.total_files,
+        'total_size': total_size,
+        'total_size_mb': round(total_size / (1024 * 1024), 2),
+        'seo_stats': {name: int(getattr(row, name)) for name, _ in SEO_BUCKETS},
+    }
+
+
+def get_content_metrics():
+    """{'products', 'categories', 'blogs', 'unread_contacts'}"""
+    return _metrics.get_or_set('content', _load_content)
+
+
+def get_media_metrics():
+    """{'total_files', 'total_size', 'total_size_mb', 'seo_stats': {...}}"""
+    return _metrics.get_or_set('media', _load_media)
+
+
+def unread_contacts():
+    return get_content_metrics()['unread_contacts']
+
+
+def get_metrics(sections=('content', 'media')):
+    loaders = {'content': get_content_metrics, 'media': get_media_metrics}
+    return {section: loaders[section]() for section in sections if section in loaders}
+
+
+# ==================== AUTO INVALIDATE ====================
+def _listener(section):
+    def handler(mapper, connection, target):
+        session = object_session(target)
+        if session is not None:
+            cache.invalidate_after_commit(session, 'admin_metrics', section)
+    return handler
+
+
+_content_changed = _listener('content')
+for _model in (Product, Category, Blog, Contact):
+    event.listen(_model, 'after_insert', _content_changed)
+    event.listen(_model, 'after_delete', _content_changed)
+event.listen(Contact, 'after_update', _content_changed)  # đánh dấu đã đọc
+
+_media_changed = _listener('media')
+for _event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Media, _event_name, _media_changed)
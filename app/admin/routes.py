@@ -1,15 +1,16 @@
 import os
-from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, jsonify, session
+from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, jsonify
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.utils import secure_filename
-from app import db
-from app.models import User, Product, Category, Banner, Blog, FAQ, Contact, Media, Project, Job, Settings, get_setting, set_setting
+from app import db, limiter
+from app.models import User, Product, Category, Banner, Blog, FAQ, Contact, Media, Project, Job, Settings, get_setting, set_settings
 from app.models_rbac import Role, Permission
 from app.forms import (LoginForm, CategoryForm, ProductForm, BannerForm,
                        BlogForm, FAQForm, UserForm, ProjectForm, JobForm,
                        RoleForm, PermissionForm, SettingsForm)
 from app.utils import save_upload_file, delete_file, get_albums, optimize_image
 from app.decorators import permission_required, role_required
+from app.admin.metrics import get_content_metrics, get_media_metrics, get_metrics, unread_contacts
 import shutil
 import re
 from html import unescape
@@ -474,9 +475,25 @@ def get_image_from_form(form_image_field, field_name='image', folder='uploads'):
 
 # ==================== LOGIN & LOGOUT ====================
 
+def _login_limited(result):
+    """Quá nhiều lần POST /login từ 1 IP"""
+    minutes = max(1, result.reset_after // 60)
+    flash(f'🔒 Quá nhiều lần đăng nhập từ địa chỉ này! Vui lòng thử lại sau {minutes} phút.', 'danger')
+    return render_template('admin/login.html', form=LoginForm()), 429
+
+
+def _login_lockout_state(email, max_attempts):
+    """Số lần sai còn lại của email (đếm ở server, không nằm trong session)"""
+    return limiter.peek('login_fail', 'email', email.strip().lower(), max_attempts,
+                        current_app.config.get('LOGIN_LOCKOUT_SECONDS', 1800))
+
+
 @admin_bp.route('/login', methods=['GET', 'POST'])
+@limiter.limit('login', limit=lambda: current_app.config.get('LOGIN_RATE_LIMIT', 20),
+               window=lambda: current_app.config.get('LOGIN_RATE_WINDOW', 900),
+               key_by=('ip',), methods=('POST',), on_limited=_login_limited)
 def login():
-    """Trang đăng nhập admin - CÓ GIỚI HẠN ATTEMPTS VÀ KHÓA 30 PHÚT"""
+    """Trang đăng nhập admin - CÓ GIỚI HẠN ATTEMPTS VÀ KHÓA LOGIN_LOCKOUT_SECONDS"""
     if current_user.is_authenticated:
         if current_user.has_any_permission('manage_users', 'manage_products', 'manage_categories'):
             return redirect(url_for('admin.dashboard'))
@@ -487,37 +504,22 @@ def login():
 
     if form.validate_on_submit():
         email = form.email.data
+        email_key = email.strip().lower()
 
         # ✅ LẤY GIỚI HẠN TỪ SETTINGS
         from app.models import get_setting
         max_attempts = int(get_setting('login_attempt_limit', '5'))
+        lockout_seconds = current_app.config.get('LOGIN_LOCKOUT_SECONDS', 1800)
+        lockout_minutes = max(1, lockout_seconds // 60)
 
-        # Keys cho session
-        attempt_key = f'login_attempts_{email}'
-        lockout_key = f'login_lockout_{email}'
+        # ✅ KIỂM TRA THỜI GIAN KHÓA (bộ đếm theo email ở server)
+        state = _login_lockout_state(email, max_attempts)
+        if not state.allowed:
+            minutes = int(state.reset_after / 60)
+            seconds = int(state.reset_after % 60)
 
-        # Lấy thông tin attempts và lockout time
-        attempts = session.get(attempt_key, 0)
-        lockout_until = session.get(lockout_key)
-
-        # ✅ KIỂM TRA THỜI GIAN KHÓA
-        if lockout_until:
-            lockout_time = datetime.fromisoformat(lockout_until)
-            now = datetime.now()
-
-            if now < lockout_time:
-                # Tính thời gian còn lại
-                remaining_time = lockout_time - now
-                minutes = int(remaining_time.total_seconds() / 60)
-                seconds = int(remaining_time.total_seconds() % 60)
-
-                flash(f'🔒 Tài khoản đang bị khóa! Vui lòng thử lại sau {minutes} phút {seconds} giây.', 'danger')
-                return render_template('admin/login.html', form=form)
-            else:
-                # Hết thời gian khóa - reset
-                session.pop(attempt_key, None)
-                session.pop(lockout_key, None)
-                attempts = 0
+            flash(f'🔒 Tài khoản đang bị khóa! Vui lòng thử lại sau {minutes} phút {seconds} giây.', 'danger')
+            return render_template('admin/login.html', form=form)
 
         # ✅ KIỂM TRA ĐĂNG NHẬP
         user = User.query.filter_by(email=form.email.data).first()
@@ -525,8 +527,7 @@ def login():
         if user and user.check_password(form.password.data):
             # Đăng nhập thành công - reset attempts
             login_user(user, remember=form.remember_me.data)
-            session.pop(attempt_key, None)
-            session.pop(lockout_key, None)
+            limiter.reset('login_fail', 'email', email_key)
 
             next_page = request.args.get('next')
             if next_page:
@@ -538,22 +539,18 @@ def login():
                 return redirect(url_for('admin.welcome'))
         else:
             # ❌ ĐĂNG NHẬP SAI
-            attempts += 1
-            session[attempt_key] = attempts
-            remaining = max_attempts - attempts
-
-            # ✅ HẾT LƯỢT THỬ - KHÓA 30 PHÚT
-            if attempts >= max_attempts:
-                lockout_time = datetime.now() + timedelta(minutes=30)
-                session[lockout_key] = lockout_time.isoformat()
+            result = limiter.hit('login_fail', 'email', email_key, max_attempts, lockout_seconds)
+            remaining = result.remaining
 
-                flash(f'Tài khoản đã bị khóa 30 phút do đăng nhập sai {max_attempts} lần liên tiếp!', 'danger')
+            # ✅ HẾT LƯỢT THỬ - KHÓA
+            if remaining <= 0:
+                flash(f'Tài khoản đã bị khóa {lockout_minutes} phút do đăng nhập sai {max_attempts} lần liên tiếp!', 'danger')
                 return render_template('admin/login.html', form=form)
 
             # ⚠️ CẢNH BÁO LẦN CUỐI CÙNG
             elif remaining == 1:
                 flash(
-                    f'⚠CẢNH BÁO: Email hoặc mật khẩu không đúng! Đây là lần thử cuối cùng. Tài khoản sẽ bị khóa 30 phút nếu nhập sai.',
+                    f'⚠CẢNH BÁO: Email hoặc mật khẩu không đúng! Đây là lần thử cuối cùng. Tài khoản sẽ bị khóa {lockout_minutes} phút nếu nhập sai.',
                     'danger')
 
             # ℹ️ CÒN NHIỀU LƯỢT
@@ -576,25 +573,21 @@ def logout():
 @admin_bp.route('/check-lockout', methods=['POST'])
 def check_lockout():
     """API kiểm tra thời gian còn lại của lockout"""
-    email = request.json.get('email')
+    email = (request.get_json(silent=True) or {}).get('email')
 
     if not email:
         return jsonify({'locked': False})
 
-    lockout_key = f'login_lockout_{email}'
-    lockout_until = session.get(lockout_key)
+    max_attempts = int(get_setting('login_attempt_limit', '5'))
+    state = _login_lockout_state(email, max_attempts)
 
-    if lockout_until:
-        lockout_time = datetime.fromisoformat(lockout_until)
-        now = datetime.now()
-
-        if now < lockout_time:
-            remaining = int((lockout_time - now).total_seconds())
-            return jsonify({
-                'locked': True,
-                'remaining_seconds': remaining,
-                'lockout_until': lockout_time.strftime('%Y-%m-%d %H:%M:%S')
-            })
+    if not state.allowed:
+        lockout_time = datetime.now() + timedelta(seconds=state.reset_after)
+        return jsonify({
+            'locked': True,
+            'remaining_seconds': state.reset_after,
+            'lockout_until': lockout_time.strftime('%Y-%m-%d %H:%M:%S')
+        })
 
     return jsonify({'locked': False})
 
@@ -611,11 +604,12 @@ def dashboard():
     if not current_user.has_any_permission('manage_users', 'manage_products', 'manage_categories'):
         return redirect(url_for('admin.welcome'))
 
-    # Dashboard cho Admin/Editor
-    total_products = Product.query.count()
-    total_categories = Category.query.count()
-    total_blogs = Blog.query.count()
-    total_contacts = Contact.query.filter_by(is_read=False).count()
+    # Dashboard cho Admin/Editor - 4 COUNT gộp 1 query, cache TTL ngắn
+    counts = get_content_metrics()
+    total_products = counts['products']
+    total_categories = counts['categories']
+    total_blogs = counts['blogs']
+    total_contacts = counts['unread_contacts']
     recent_products = Product.query.order_by(Product.created_at.desc()).limit(5).all()
     recent_contacts = Contact.query.order_by(Contact.created_at.desc()).limit(5).all()
 
@@ -639,11 +633,26 @@ def welcome():
     # Lấy số liên hệ chưa đọc (nếu có quyền xem)
     total_contacts = 0
     if current_user.has_any_permission('view_contacts', 'manage_contacts'):
-        total_contacts = Contact.query.filter_by(is_read=False).count()
+        total_contacts = unread_contacts()
 
     return render_template('admin/welcome.html', total_contacts=total_contacts)
 
 
+# ==================== METRICS (JSON CHO WIDGET) ====================
+@admin_bp.route('/metrics.json')
+@login_required
+def metrics_json():
+    """Số liệu dashboard/media (cache TTL ngắn) - chỉ trả phần user có quyền xem"""
+    sections = []
+    if current_user.has_permission('view_dashboard'):
+        sections.append('content')
+    if current_user.has_permission('view_media'):
+        sections.append('media')
+    if not sections:
+        return jsonify({'error': 'forbidden'}), 403
+    return jsonify(get_metrics(sections))
+
+
 # ==================== QUẢN LÝ DANH MỤC ====================
 @admin_bp.route('/categories')
 @permission_required('manage_categories')  # ✅ Quản lý danh mục
@@ -1405,16 +1414,12 @@ def media():
     )
 
     albums = get_albums()
-    total_files = Media.query.count()
-    total_size = db.session.query(db.func.sum(Media.file_size)).scalar() or 0
-    total_size_mb = round(total_size / (1024 * 1024), 2)
-
-    seo_stats = {
-        'excellent': db.session.query(Media).filter(Media.seo_score >= 85).count(),
-        'good': db.session.query(Media).filter(Media.seo_score.between(65, 84)).count(),
-        'fair': db.session.query(Media).filter(Media.seo_score.between(50, 64)).count(),
-        'poor': db.session.query(Media).filter(Media.seo_score < 50).count(),
-    }
+
+    # Tổng file + dung lượng + 4 nhóm SEO: 1 query (cache TTL ngắn)
+    media_metrics = get_media_metrics()
+    total_files = media_metrics['total_files']
+    total_size_mb = media_metrics['total_size_mb']
+    seo_stats = media_metrics['seo_stats']
 
     return render_template(
         'admin/media.html',
@@ -2156,136 +2161,113 @@ def settings():
     form = SettingsForm()
 
     if form.validate_on_submit():
+        # Gom tất cả vào 1 dict → set_settings: 1 query IN + 1 commit
+        # (trước đây mỗi set_setting 1 SELECT + 1 commit, ~60 lượt/lần lưu)
+        items = {}
+
         # ==================== GENERAL SETTINGS ====================
-        set_setting('website_name', form.website_name.data, 'general', 'Tên website')
-        set_setting('slogan', form.slogan.data, 'general', 'Slogan của website')
-        set_setting('address', form.address.data, 'general', 'Địa chỉ công ty')
-        set_setting('email', form.email.data, 'general', 'Email chính')
-        set_setting('hotline', form.hotline.data, 'general', 'Số hotline')
-        set_setting('main_url', form.main_url.data, 'general', 'URL chính của website')
-        set_setting('company_info', form.company_info.data, 'general', 'Thông tin công ty')
+        items['website_name'] = (form.website_name.data, 'general', 'Tên website')
+        items['slogan'] = (form.slogan.data, 'general', 'Slogan của website')
+        items['address'] = (form.address.data, 'general', 'Địa chỉ công ty')
+        items['email'] = (form.email.data, 'general', 'Email chính')
+        items['hotline'] = (form.hotline.data, 'general', 'Số hotline')
+        items['main_url'] = (form.main_url.data, 'general', 'URL chính của website')
+        items['company_info'] = (form.company_info.data, 'general', 'Thông tin công ty')
+
+        # ==================== UPLOAD LOGO / FAVICON (SONG SONG) ====================
+        # (setting key, field, thư mục Cloudinary, group, mô tả)
+        uploads = [
+            ('logo_url', form.logo, 'logos', 'theme', 'URL logo website'),
+            ('logo_chatbot_url', form.logo_chatbot, 'logos', 'theme', 'URL logo chatbot'),
+            ('favicon_ico_url', form.favicon_ico, 'favicons', 'seo', 'Favicon .ico'),
+            ('favicon_png_url', form.favicon_png, 'favicons', 'seo', 'Favicon PNG 96x96'),
+            ('favicon_svg_url', form.favicon_svg, 'favicons', 'seo', 'Favicon SVG'),
+            ('apple_touch_icon_url', form.apple_touch_icon, 'favicons', 'seo', 'Apple Touch Icon'),
+            ('favicon_url', form.favicon, 'favicons', 'seo', 'URL favicon'),
+            ('default_share_image', form.default_share_image, 'share_images', 'seo', 'Ảnh chia sẻ mặc định'),
+        ]
+        uploads = [upload for upload in uploads if upload[1].data]
+        if uploads:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=min(4, len(uploads))) as pool:
+                results = list(pool.map(lambda u: save_upload_file(u[1].data, u[2]), uploads))
+
+            for (key, field, _, group, description), (url, _) in zip(uploads, results):
+                if url:
+                    items[key] = (url, group, description)
+                else:
+                    flash(f'Không upload được {field.label.text}', 'warning')
 
         # ==================== THEME/UI SETTINGS ====================
-        # ✅ Xử lý logo upload
-        if form.logo.data:
-            logo_path = save_upload_file(form.logo.data, 'logos')
-            if isinstance(logo_path, tuple):
-                logo_path = logo_path[0]
-            set_setting('logo_url', logo_path, 'theme', 'URL logo website')
-
-        # ✅ Xử lý logo chatbot upload
-        if form.logo_chatbot.data:
-            chatbot_logo_path = save_upload_file(form.logo_chatbot.data, 'logos')
-            if isinstance(chatbot_logo_path, tuple):
-                chatbot_logo_path = chatbot_logo_path[0]
-            set_setting('logo_chatbot_url', chatbot_logo_path, 'theme', 'URL logo chatbot')
-
-        set_setting('primary_color', form.primary_color.data, 'theme', 'Màu chủ đạo')
+        items['primary_color'] = (form.primary_color.data, 'theme', 'Màu chủ đạo')
 
         # ==================== SEO & META DEFAULTS ====================
-        set_setting('meta_title', form.meta_title.data, 'seo', 'Meta title mặc định')
-        set_setting('meta_description', form.meta_description.data, 'seo', 'Meta description mặc định')
-        set_setting('meta_keywords', form.meta_keywords.data, 'seo', 'Meta keywords mặc định')
-
-        # 1. Favicon .ico
-        if form.favicon_ico.data:
-            favicon_ico_path = save_upload_file(form.favicon_ico.data, 'favicons')
-            if isinstance(favicon_ico_path, tuple):
-                favicon_ico_path = favicon_ico_path[0]
-            set_setting('favicon_ico_url', favicon_ico_path, 'seo', 'Favicon .ico')
-
-        # 2. Favicon PNG 96x96
-        if form.favicon_png.data:
-            favicon_png_path = save_upload_file(form.favicon_png.data, 'favicons')
-            if isinstance(favicon_png_path, tuple):
-                favicon_png_path = favicon_png_path[0]
-            set_setting('favicon_png_url', favicon_png_path, 'seo', 'Favicon PNG 96x96')
-
-        # 3. Favicon SVG
-        if form.favicon_svg.data:
-            favicon_svg_path = save_upload_file(form.favicon_svg.data, 'favicons')
-            if isinstance(favicon_svg_path, tuple):
-                favicon_svg_path = favicon_svg_path[0]
-            set_setting('favicon_svg_url', favicon_svg_path, 'seo', 'Favicon SVG')
-
-        # 4. Apple Touch Icon
-        if form.apple_touch_icon.data:
-            apple_icon_path = save_upload_file(form.apple_touch_icon.data, 'favicons')
-            if isinstance(apple_icon_path, tuple):
-                apple_icon_path = apple_icon_path[0]
-            set_setting('apple_touch_icon_url', apple_icon_path, 'seo', 'Apple Touch Icon')
-
-        # ✅ Xử lý favicon upload
-        if form.favicon.data:
-            favicon_path = save_upload_file(form.favicon.data, 'favicons')
-            if isinstance(favicon_path, tuple):
-                favicon_path = favicon_path[0]
-            set_setting('favicon_url', favicon_path, 'seo', 'URL favicon')
-
-        # ✅ Xử lý default share image upload
-        if form.default_share_image.data:
-            share_image_path = save_upload_file(form.default_share_image.data, 'share_images')
-            if isinstance(share_image_path, tuple):
-                share_image_path = share_image_path[0]
-            set_setting('default_share_image', share_image_path, 'seo', 'Ảnh chia sẻ mặc định')
+        items['meta_title'] = (form.meta_title.data, 'seo', 'Meta title mặc định')
+        items['meta_description'] = (form.meta_description.data, 'seo', 'Meta description mặc định')
+        items['meta_keywords'] = (form.meta_keywords.data, 'seo', 'Meta keywords mặc định')
 
         # Open Graph settings
-        set_setting('og_title', form.meta_title.data, 'seo', 'OG title mặc định')
-        set_setting('og_description', form.meta_description.data, 'seo', 'OG description mặc định')
-        set_setting('og_image', get_setting('default_share_image', ''), 'seo', 'OG image mặc định')
+        share_image = items['default_share_image'][0] if 'default_share_image' in items \
+            else get_setting('default_share_image', '')
+        items['og_title'] = (form.meta_title.data, 'seo', 'OG title mặc định')
+        items['og_description'] = (form.meta_description.data, 'seo', 'OG description mặc định')
+        items['og_image'] = (share_image, 'seo', 'OG image mặc định')
 
         # Page-specific meta descriptions
-        set_setting('index_meta_description', form.index_meta_description.data, 'seo', 'Meta description trang chủ')
-        set_setting('about_meta_description', form.about_meta_description.data, 'seo',
-                    'Meta description trang giới thiệu')
-        set_setting('contact_meta_description', form.contact_meta_description.data, 'seo',
-                    'Meta description trang liên hệ')
-        set_setting('products_meta_description', form.products_meta_description.data, 'seo',
-                    'Meta description trang sản phẩm')
-        set_setting('product_meta_description', form.product_meta_description.data, 'seo',
-                    'Meta description chi tiết sản phẩm')
-        set_setting('blog_meta_description', form.blog_meta_description.data, 'seo', 'Meta description trang blog')
-        set_setting('careers_meta_description', form.careers_meta_description.data, 'seo',
-                    'Meta description trang tuyển dụng')
-        set_setting('faq_meta_description', form.faq_meta_description.data, 'seo', 'Meta description trang FAQ')
-        set_setting('projects_meta_description', form.projects_meta_description.data, 'seo',
-                    'Meta description trang dự án')
+        items['index_meta_description'] = (form.index_meta_description.data, 'seo', 'Meta description trang chủ')
+        items['about_meta_description'] = (form.about_meta_description.data, 'seo',
+                                           'Meta description trang giới thiệu')
+        items['contact_meta_description'] = (form.contact_meta_description.data, 'seo',
+                                             'Meta description trang liên hệ')
+        items['products_meta_description'] = (form.products_meta_description.data, 'seo',
+                                              'Meta description trang sản phẩm')
+        items['product_meta_description'] = (form.product_meta_description.data, 'seo',
+                                             'Meta description chi tiết sản phẩm')
+        items['blog_meta_description'] = (form.blog_meta_description.data, 'seo', 'Meta description trang blog')
+        items['careers_meta_description'] = (form.careers_meta_description.data, 'seo',
+                                             'Meta description trang tuyển dụng')
+        items['faq_meta_description'] = (form.faq_meta_description.data, 'seo', 'Meta description trang FAQ')
+        items['projects_meta_description'] = (form.projects_meta_description.data, 'seo',
+                                              'Meta description trang dự án')
 
         # ==================== CONTACT & SOCIAL SETTINGS ====================
-        set_setting('contact_email', form.contact_email.data, 'contact', 'Email liên hệ')
-        set_setting('facebook_url', form.facebook_url.data, 'contact', 'URL Facebook')
-        set_setting('facebook_messenger_url', form.facebook_messenger_url.data, 'contact', 'Facebook Messenger URL')
-        set_setting('zalo_url', form.zalo_url.data, 'contact', 'URL Zalo')
-        set_setting('tiktok_url', form.tiktok_url.data, 'contact', 'URL TikTok')
-        set_setting('youtube_url', form.youtube_url.data, 'contact', 'URL YouTube')
-        set_setting('google_maps', form.google_maps.data, 'contact', 'Mã nhúng Google Maps')
-        set_setting('hotline_north', form.hotline_north.data, 'contact', 'Hotline miền Bắc')
-        set_setting('hotline_central', form.hotline_central.data, 'contact', 'Hotline miền Trung')
-        set_setting('hotline_south', form.hotline_south.data, 'contact', 'Hotline miền Nam')
-        set_setting('working_hours', form.working_hours.data, 'contact', 'Giờ làm việc')
-        set_setting('branch_addresses', form.branch_addresses.data, 'contact', 'Danh sách địa chỉ chi nhánh')
+        items['contact_email'] = (form.contact_email.data, 'contact', 'Email liên hệ')
+        items['facebook_url'] = (form.facebook_url.data, 'contact', 'URL Facebook')
+        items['facebook_messenger_url'] = (form.facebook_messenger_url.data, 'contact', 'Facebook Messenger URL')
+        items['zalo_url'] = (form.zalo_url.data, 'contact', 'URL Zalo')
+        items['tiktok_url'] = (form.tiktok_url.data, 'contact', 'URL TikTok')
+        items['youtube_url'] = (form.youtube_url.data, 'contact', 'URL YouTube')
+        items['google_maps'] = (form.google_maps.data, 'contact', 'Mã nhúng Google Maps')
+        items['hotline_north'] = (form.hotline_north.data, 'contact', 'Hotline miền Bắc')
+        items['hotline_central'] = (form.hotline_central.data, 'contact', 'Hotline miền Trung')
+        items['hotline_south'] = (form.hotline_south.data, 'contact', 'Hotline miền Nam')
+        items['working_hours'] = (form.working_hours.data, 'contact', 'Giờ làm việc')
+        items['branch_addresses'] = (form.branch_addresses.data, 'contact', 'Danh sách địa chỉ chi nhánh')
 
         # ==================== SYSTEM & SECURITY SETTINGS ====================
-        set_setting('login_attempt_limit', str(form.login_attempt_limit.data), 'system', 'Giới hạn đăng nhập sai')
-        set_setting('cache_time', str(form.cache_time.data), 'system', 'Thời gian cache (giây)')
+        items['login_attempt_limit'] = (str(form.login_attempt_limit.data), 'system', 'Giới hạn đăng nhập sai')
+        items['cache_time'] = (str(form.cache_time.data), 'system', 'Thời gian cache (giây)')
 
         # ==================== INTEGRATION SETTINGS ====================
-        set_setting('cloudinary_api_key', form.cloudinary_api_key.data, 'integration', 'API Key Cloudinary')
-        set_setting('gemini_api_key', form.gemini_api_key.data, 'integration', 'API Key Gemini/OpenAI')
-        set_setting('google_analytics', form.google_analytics.data, 'integration', 'Google Analytics ID')
-        set_setting('shopee_api', form.shopee_api.data, 'integration', 'Shopee Integration')
-        set_setting('tiktok_api', form.tiktok_api.data, 'integration', 'TikTok Integration')
-        set_setting('zalo_oa', form.zalo_oa.data, 'integration', 'Zalo OA')
+        items['cloudinary_api_key'] = (form.cloudinary_api_key.data, 'integration', 'API Key Cloudinary')
+        items['gemini_api_key'] = (form.gemini_api_key.data, 'integration', 'API Key Gemini/OpenAI')
+        items['google_analytics'] = (form.google_analytics.data, 'integration', 'Google Analytics ID')
+        items['shopee_api'] = (form.shopee_api.data, 'integration', 'Shopee Integration')
+        items['tiktok_api'] = (form.tiktok_api.data, 'integration', 'TikTok Integration')
+        items['zalo_oa'] = (form.zalo_oa.data, 'integration', 'Zalo OA')
 
         # ==================== CONTENT DEFAULTS ====================
-        set_setting('terms_of_service', form.terms_of_service.data, 'content', 'Điều khoản dịch vụ')
-        set_setting('shipping_policy', form.shipping_policy.data, 'content', 'Chính sách vận chuyển')
-        set_setting('return_policy', form.return_policy.data, 'content', 'Chính sách đổi trả')
-        set_setting('warranty_policy', form.warranty_policy.data, 'content', 'Chính sách bảo hành')
-        set_setting('privacy_policy', form.privacy_policy.data, 'content', 'Chính sách bảo mật')
-        set_setting('contact_form', form.contact_form.data, 'content', 'Form liên hệ mặc định')
-        set_setting('default_posts_per_page', str(form.default_posts_per_page.data), 'content',
-                    'Số lượng bài viết mặc định')
+        items['terms_of_service'] = (form.terms_of_service.data, 'content', 'Điều khoản dịch vụ')
+        items['shipping_policy'] = (form.shipping_policy.data, 'content', 'Chính sách vận chuyển')
+        items['return_policy'] = (form.return_policy.data, 'content', 'Chính sách đổi trả')
+        items['warranty_policy'] = (form.warranty_policy.data, 'content', 'Chính sách bảo hành')
+        items['privacy_policy'] = (form.privacy_policy.data, 'content', 'Chính sách bảo mật')
+        items['contact_form'] = (form.contact_form.data, 'content', 'Form liên hệ mặc định')
+        items['default_posts_per_page'] = (str(form.default_posts_per_page.data), 'content',
+                                           'Số lượng bài viết mặc định')
+
+        set_settings(items)
 
         # ==================== GENERATE SEO FILES ====================
         try:
@@ -2550,4 +2532,116 @@ def ckeditor_upload_image():
             'error': {'message': f'Lỗi server: {str(e)}'}
         }), 500
 
-# ==================== KẾT THÚC PHẦN THÊM MỚI ====================
\ No newline at end of file
+# ==================== KẾT THÚC PHẦN THÊM MỚI ====================
+
+# ==================== CACHE STATS ====================
+@admin_bp.route('/cache/stats')
+@permission_required('manage_settings')
+def cache_stats():
+    """Thống kê cache in-process của worker hiện tại (LRU trang chi tiết, settings...)"""
+    from app import cache, fragment_cache, shared_cache
+    from app.cache_bus import bus
+    return jsonify({
+        'pid': os.getpid(),
+        'namespaces': cache.stats(),
+        'bus': bus.stats(),
+        'shared': shared_cache.stats(),
+        'fragments': fragment_cache.stats(),
+    })
+
+
+@admin_bp.route('/cache/clear', methods=['POST'])
+@permission_required('manage_settings')
+def cache_clear():
+    """Xoá toàn bộ cache in-process (worker hiện tại + báo worker khác qua cache bus)"""
+    from app import cache
+    cache.clear_all()  # gồm cả danh mục menu ('categories')
+    return jsonify({'success': True})
+
+
+# ==================== MEMORY (COPY-ON-WRITE) ====================
+@admin_bp.route('/memory')
+@permission_required('manage_settings')
+def memory_stats():
+    """RSS shared/private của worker hiện tại + kết quả warm-up ở master (preload)"""
+    import gc
+    from app.preload import LAST_REPORT
+    from app.startup_profile import memory_report
+    return jsonify({
+        'pid': os.getpid(),
+        'memory': memory_report(),
+        'gc': {'frozen': gc.get_freeze_count(), 'counts': gc.get_count(), 'enabled': gc.isenabled()},
+        'preload': LAST_REPORT or None,
+    })
+
+
+# ==================== DIAGNOSTICS (TRACEMALLOC) ====================
+# Bật bằng DIAGNOSTICS_ENABLED=1; mỗi response có pid của worker xử lý.
+# Quy trình: start → snapshot (base) → chạy tải → snapshot (target) → diff → stop
+def _diagnostics_call(func, *args, **kwargs):
+    from app.admin.diagnostics import DiagnosticsError
+    if not current_app.config.get('DIAGNOSTICS_ENABLED'):
+        return jsonify({'error': 'Diagnostics đang tắt (DIAGNOSTICS_ENABLED=1 để bật)'}), 404
+    try:
+        return jsonify(func(*args, **kwargs))
+    except DiagnosticsError as e:
+        return jsonify({'error': str(e), 'pid': os.getpid()}), 400
+
+
+@admin_bp.route('/diagnostics')
+@permission_required('manage_settings')
+def diagnostics_status():
+    from app.admin import diagnostics
+    return _diagnostics_call(diagnostics.status)
+
+
+@admin_bp.route('/diagnostics/tracemalloc/start', methods=['POST'])
+@permission_required('manage_settings')
+def diagnostics_start():
+    from app.admin import diagnostics
+    return _diagnostics_call(diagnostics.start, request.values.get('frames', diagnostics.DEFAULT_FRAMES, type=int))
+
+
+@admin_bp.route('/diagnostics/tracemalloc/stop', methods=['POST'])
+@permission_required('manage_settings')
+def diagnostics_stop():
+    from app.admin import diagnostics
+    return _diagnostics_call(diagnostics.stop)
+
+
+@admin_bp.route('/diagnostics/snapshots', methods=['POST'])
+@permission_required('manage_settings')
+def diagnostics_snapshot():
+    from app.admin import diagnostics
+    return _diagnostics_call(
+        diagnostics.take_snapshot,
+        request.values.get('label'),
+        request.values.get('group_by', 'lineno'),
+        request.values.get('limit', 10, type=int),
+    )
+
+
+@admin_bp.route('/diagnostics/snapshots/<snapshot_id>', methods=['DELETE'])
+@permission_required('manage_settings')
+def diagnostics_delete_snapshot(snapshot_id):
+    from app.admin import diagnostics
+
+    def delete():
+        diagnostics.delete_snapshot(snapshot_id)
+        return {'deleted': snapshot_id}
+
+    return _diagnostics_call(delete)
+
+
+@admin_bp.route('/diagnostics/diff')
+@permission_required('manage_settings')
+def diagnostics_diff():
+    """?base=<pid>-<label>&target=<pid>-<label>&group_by=lineno|filename|traceback&limit=20"""
+    from app.admin import diagnostics
+    return _diagnostics_call(
+        diagnostics.diff,
+        request.args.get('base'),
+        request.args.get('target'),
+        request.args.get('group_by', 'lineno'),
+        request.args.get('limit', 20, type=int),
+    )
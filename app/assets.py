@@ -0,0 +1,210 @@
+"""
+Assets - Fingerprint + bundle CSS/JS trong app/static, cache immutable
+
+after_request cho mọi file /static/ cache 1 năm, nhưng style.css, main.js...
+không có hash trong tên: sửa file xong trình duyệt vẫn dùng bản cũ tới 1 năm.
+
+build(static_folder):
+- Gộp các file trong BUNDLES (đúng thứ tự <link>/<script> ở base.html) → 1
+  request CSS + 1 request JS cho mọi trang
+- Minify (rcssmin / rjsmin nếu đã cài; không có thì CSS chỉ bỏ comment +
+  khoảng trắng, JS giữ nguyên)
+- Ghi ra static/dist/<tên>.<hash nội dung>.<ext> + dist/manifest.json
+  {'css/style.css': 'dist/css/style.3f9a1c2b7d.css', ...}
+
+static_url(filename) (template global): URL có hash nếu có trong manifest,
+không thì url_for('static') thường. URL dưới dist/ cache 1 năm + immutable,
+URL không hash cache ngắn (STATIC_MAX_AGE).
+
+Deploy: `flask build-assets` (hoặc tự build lúc khởi động khi manifest
+thiếu / cũ hơn file nguồn - ASSETS_BUILD_ON_START).
+"""
+
+import hashlib
+import json
+import os
+import re
+
+from flask import url_for
+
+try:
+    import rcssmin
+except ImportError:  # tuỳ chọn
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:  # tuỳ chọn
+    rjsmin = None
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+SOURCE_DIRS = ('css', 'js')
+HASH_LENGTH = 10
+
+# Bundle → các file nguồn theo đúng thứ tự nạp trong base.html
+BUNDLES = {
+    'css/site.css': [
+        'css/style.css',
+        'css/chatbot.css',
+        'css/theme-dynamic.css',
+        'css/scale-down.css',
+        'css/chatbot-zindex-fix.css',
+        'css/project-filters.css',
+    ],
+    'js/site.js': [
+        'js/main.js',
+        'js/projects-carousel.js',
+        'js/chatbot.js',
+    ],
+}
+
+_manifest = {}
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s+')
+_CSS_PUNCT = re.compile(r'\s*([{};,>])\s*')
+
+
+# ==================== MINIFY ====================
+def minify_css(text):
+    if rcssmin is not None:
+        return rcssmin.cssmin(text)
+    text = _CSS_COMMENT.sub('', text)
+    text = _CSS_SPACE.sub(' ', text)
+    text = _CSS_PUNCT.sub(r'\1', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    # Không có rjsmin thì giữ nguyên (tự bỏ khoảng trắng JS dễ làm hỏng regex / template string)
+    return rjsmin.jsmin(text) if rjsmin is not None else text
+
+
+def _minify(name, text):
+    return minify_css(text) if name.endswith('.css') else minify_js(text)
+
+
+# ==================== BUILD ====================
+def _sources(static_folder):
+    """Mọi file .css/.js (đường dẫn tương đối kiểu posix) trong SOURCE_DIRS"""
+    names = []
+    for directory in SOURCE_DIRS:
+        root = os.path.join(static_folder, directory)
+        for current, _, files in os.walk(root):
+            for filename in files:
+                if filename.endswith(('.css', '.js')):
+                    path = os.path.join(current, filename)
+                    names.append(os.path.relpath(path, static_folder).replace(os.sep, '/'))
+    return sorted(names)
+
+
+def _read(static_folder, name):
+    with open(os.path.join(static_folder, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def _fingerprinted(name, body):
+    digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+    stem, ext = os.path.splitext(name)
+    return f'{DIST_DIR}/{stem}.{digest}{ext}'
+
+
+def build(static_folder, minify=True, bundle=True):
+    """
+    Ghi file có hash vào static/dist + manifest, xoá file hash cũ không còn
+    dùng. Returns: manifest {tên gốc: tên có hash}
+    """
+    outputs = {}
+    for name in _sources(static_folder):
+        text = _read(static_folder, name)
+        outputs[name] = _minify(name, text) if minify else text
+    if bundle:
+        for name, parts in BUNDLES.items():
+            separator = '\n' if name.endswith('.css') else ';\n'
+            outputs[name] = separator.join(outputs[part] for part in parts)
+
+    manifest = {}
+    dist_root = os.path.join(static_folder, DIST_DIR)
+    for name, text in outputs.items():
+        body = text.encode('utf-8')
+        target = _fingerprinted(name, body)
+        manifest[name] = target
+        path = os.path.join(static_folder, target)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f'{path}.tmp', 'wb') as f:
+                f.write(body)
+            os.replace(f'{path}.tmp', path)
+
+    manifest_path = os.path.join(dist_root, MANIFEST)
+    with open(f'{manifest_path}.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(f'{manifest_path}.tmp', manifest_path)
+
+    # File hash cũ (kèm bản .br/.gz nén sẵn) không còn trong manifest
+    keep = {os.path.join(static_folder, target) for target in manifest.values()}
+    for current, _, files in os.walk(dist_root):
+        for filename in files:
+            path = os.path.join(current, filename)
+            base, ext = os.path.splitext(path)
+            if ext not in ('.br', '.gz'):
+                base = path
+            if filename != MANIFEST and base not in keep:
+                os.remove(path)
+    return manifest
+
+
+def is_stale(static_folder):
+    """Manifest thiếu hoặc cũ hơn 1 file nguồn"""
+    manifest_path = os.path.join(static_folder, DIST_DIR, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return True
+    built_at = os.stat(manifest_path).st_mtime
+    return any(
+        os.stat(os.path.join(static_folder, name)).st_mtime > built_at
+        for name in _sources(static_folder)
+    )
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# ==================== FLASK ====================
+def init_app(app):
+    """Nạp manifest + đăng ký static_url / static_bundle cho template (gọi trước compress.init_app)"""
+    global _manifest
+    _manifest = {}
+    enabled = app.config.get('ASSETS_ENABLED', True) and not app.debug and app.static_folder
+    if enabled:
+        if app.config.get('ASSETS_BUILD_ON_START', True) and is_stale(app.static_folder):
+            try:
+                build(app.static_folder, minify=app.config.get('ASSETS_MINIFY', True))
+            except OSError as e:  # filesystem chỉ đọc → dùng URL không hash
+                app.logger.warning(f'Không build được assets: {e}')
+        _manifest = load_manifest(app.static_folder)
+
+    app.add_template_global(static_url)
+    app.add_template_global(static_bundle)
+
+
+def static_url(filename, **kwargs):
+    """URL file static - bản có hash (cache immutable) nếu đã build"""
+    return url_for('static', filename=_manifest.get(filename, filename), **kwargs)
+
+
+def static_bundle(name):
+    """List URL cho 1 bundle: 1 URL bundle nếu đã build, không thì từng file nguồn"""
+    if name in _manifest:
+        return [static_url(name)]
+    return [static_url(part) for part in BUNDLES[name]]
+
+
+def is_fingerprinted(path):
+    """Path request (/static/dist/...) là file có hash → cache immutable"""
+    return path.startswith(f'/static/{DIST_DIR}/')
@@ -0,0 +1,483 @@
+"""
+App Cache - Cache in-process theo namespace
+
+Mỗi namespace (vd: 'quiz_answer_key') là 1 dict {key: entry} có TTL riêng.
+Các module đăng ký namespace 1 lần rồi dùng get_or_set / invalidate thay vì
+tự giữ biến global + timestamp.
+
+get_or_set():
+- Single-flight: nhiều thread cùng miss 1 key → chỉ 1 thread chạy loader,
+  các thread còn lại chờ và dùng chung kết quả (đếm vào 'coalesced')
+- Stale-while-revalidate (stale_ttl > 0): hết TTL nhưng còn trong cửa sổ
+  stale → trả ngay giá trị cũ, 1 thread nền nạp lại
+- version (mtime file, updated_at...): khác phiên bản đã lưu → nạp lại
+- Loader lỗi mà còn giá trị cũ → dùng tạm giá trị cũ (stale-if-error)
+- TTL bị rút ngắn ngẫu nhiên tối đa `jitter` (mặc định 10%) để các key nạp
+  cùng lúc (boot, warm-up) không cùng hết hạn 1 lúc
+
+Usage:
+    from app import cache
+
+    answer_keys = cache.namespace('quiz_answer_key', ttl=3600)
+    key = answer_keys.get_or_set(quiz_id, lambda: build_key(quiz_id))
+    answer_keys.invalidate(quiz_id)      # xoá 1 key
+    cache.invalidate('quiz_answer_key')  # xoá cả namespace
+
+    # Cho phép trả giá trị cũ tối đa 60s trong lúc nạp lại nền
+    settings = cache.namespace('settings', ttl=300, stale_ttl=60)
+
+    # Nạp lại khi file đổi
+    info = files.get_or_set('company', read_file, version=os.path.getmtime(path))
+
+    # Hàm không tham số / tham số hashable
+    @cache.memoize('categories', ttl=300, stale_ttl=60)
+    def active_categories(): ...
+
+    # Trong event ORM (flush): chỉ xoá sau khi commit thành công
+    cache.invalidate_after_commit(session, 'quiz_stats')
+
+    # LRU giới hạn theo bytes (trang chi tiết...): bản ghi ít dùng bị đẩy ra
+    details = cache.lru_namespace('detail', max_bytes=8 * 1024 * 1024, ttl=600)
+
+Nhiều worker / instance: invalidate() còn báo cho các worker khác qua
+app/cache_bus.py (CACHE_BUS) - các worker đó xoá cả namespace.
+"""
+
+import functools
+import logging
+import pickle
+import random
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import nullcontext
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+_NAMESPACES = {}
+_REGISTRY_LOCK = threading.Lock()
+_PUBLISHERS = []
+_SUBSCRIBERS = []
+DEFAULT_JITTER = 0.1
+
+# fresh_until: hết TTL; stale_until: hết cửa sổ stale → bỏ hẳn (None = không hết hạn)
+_Entry = namedtuple('_Entry', 'value fresh_until stale_until version size')
+
+
+class _Flight:
+    """1 lần nạp đang chạy của 1 key - các thread khác chờ `done` rồi dùng chung kết quả"""
+
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class Namespace:
+    """1 vùng cache có TTL (None = không hết hạn, chỉ xoá khi invalidate)"""
+
+    def __init__(self, name, ttl=None, stale_ttl=0, jitter=DEFAULT_JITTER):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.jitter = jitter
+        self._data = {}
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._flight_lock = threading.Lock()
+        self._generation = 0
+        # Bộ đếm thống kê (không khoá - lệch vài đơn vị khi nhiều thread, chấp nhận)
+        self.hits = self.misses = self.stale_hits = self.coalesced = 0
+        self.loads = self.errors = 0
+        self.load_seconds = 0.0
+
+    # ==================== LƯU TRỮ (LRUNamespace override) ====================
+    def _lookup(self, key):
+        """Entry còn dùng được (tươi hoặc trong cửa sổ stale), None nếu không có"""
+        entry = self._data.get(key)
+        if entry is not None and entry.stale_until is not None and entry.stale_until <= time.time():
+            self._data.pop(key, None)
+            return None
+        return entry
+
+    def _store(self, key, entry):
+        self._data[key] = entry
+
+    def _expiry(self, ttl):
+        ttl = self.ttl if ttl is _MISSING else ttl
+        if not ttl:
+            return None, None
+        fresh_until = time.time() + ttl * (1 - self.jitter * random.random())
+        return fresh_until, fresh_until + (self.stale_ttl or 0)
+
+    @staticmethod
+    def _is_fresh(entry, version=_MISSING):
+        if version is not _MISSING and entry.version != version:
+            return False
+        return entry.fresh_until is None or entry.fresh_until > time.time()
+
+    # ==================== API ====================
+    def get(self, key, default=None):
+        """Giá trị còn hạn (không trả giá trị đang stale)"""
+        entry = self._lookup(key)
+        if entry is None or not self._is_fresh(entry):
+            self.misses += 1
+            return default
+        self.hits += 1
+        return entry.value
+
+    def peek(self, key, default=None):
+        """Giá trị đang lưu kể cả đã hết TTL - dùng làm dự phòng khi nguồn lỗi"""
+        entry = self._data.get(key)
+        return default if entry is None else entry.value
+
+    def set(self, key, value, ttl=_MISSING, version=None):
+        fresh_until, stale_until = self._expiry(ttl)
+        self._store(key, _Entry(value, fresh_until, stale_until, version, 0))
+        return value
+
+    def get_or_set(self, key, loader, ttl=_MISSING, version=_MISSING):
+        """
+        Trả về value đã cache, chưa có / hết hạn thì gọi loader() rồi lưu lại.
+        Nhiều thread cùng miss 1 key → loader chỉ chạy 1 lần.
+        """
+        entry = self._lookup(key)
+        if entry is not None:
+            if self._is_fresh(entry, version):
+                self.hits += 1
+                return entry.value
+            if self.stale_ttl and (version is _MISSING or entry.version == version):
+                # Hết TTL nhưng còn trong cửa sổ stale → trả giá trị cũ, nạp lại nền
+                self.stale_hits += 1
+                self._refresh_in_background(key, loader, ttl, version, entry)
+                return entry.value
+
+        self.misses += 1
+        flight, leader = self._join(key)
+        if leader:
+            return self._load(key, flight, loader, ttl, version, entry)
+
+        self.coalesced += 1
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    # ==================== SINGLE-FLIGHT ====================
+    def _join(self, key):
+        """(flight mới, True) nếu thread này phải nạp; (flight đang chạy, False) nếu chỉ cần chờ"""
+        with self._flight_lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def _load(self, key, flight, loader, ttl, version, previous=None):
+        try:
+            flight.value = self._call(key, loader, ttl, version, previous)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flight_lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+
+    def _call(self, key, loader, ttl, version, previous):
+        generation = self._generation
+        started = time.perf_counter()
+        try:
+            value = loader()
+        except Exception as e:
+            self.errors += 1
+            if previous is None:
+                raise
+            logger.warning('Cache %s: nạp lại %r lỗi (%s) - dùng giá trị cũ', self.name, key, e)
+            return previous.value
+
+        self.loads += 1
+        self.load_seconds += time.perf_counter() - started
+        # invalidate() trong lúc đang nạp → kết quả có thể đã cũ, trả về nhưng không lưu
+        if generation == self._generation:
+            self.set(key, value, ttl, None if version is _MISSING else version)
+        return value
+
+    def _refresh_in_background(self, key, loader, ttl, version, previous):
+        flight, leader = self._join(key)
+        if not leader:
+            return  # đã có thread khác đang nạp key này
+        # loader thường query DB → cần app context ở thread nền
+        app = current_app._get_current_object() if has_app_context() else None
+
+        def run():
+            with app.app_context() if app is not None else nullcontext():
+                try:
+                    self._load(key, flight, loader, ttl, version, previous)
+                except Exception:
+                    logger.exception('Cache %s: refresh nền %r lỗi', self.name, key)
+
+        threading.Thread(target=run, name=f'cache-refresh-{self.name}', daemon=True).start()
+
+    # ==================== INVALIDATE / THỐNG KÊ ====================
+    def _forget_flights(self, key=_MISSING):
+        # Lần nạp đang chạy vẫn trả kết quả cho thread đang chờ, nhưng miss mới
+        # sau invalidate phải nạp lại từ đầu
+        with self._flight_lock:
+            if key is _MISSING:
+                self._flights.clear()
+            else:
+                self._flights.pop(key, None)
+
+    def invalidate(self, key=_MISSING, publish=True):
+        """
+        Xoá 1 key, hoặc toàn bộ namespace nếu không truyền key.
+        publish: báo các worker khác xoá namespace này (xem on_invalidate)
+        """
+        self._generation += 1
+        self._forget_flights(key)
+        if key is _MISSING:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+        _notify((self.name,))
+        if publish:
+            _publish((self.name,))
+
+    def items(self):
+        """Snapshot (key, value) còn dùng được (kể cả đang stale)"""
+        now = time.time()
+        return [
+            (k, entry.value) for k, entry in list(self._data.items())
+            if entry.stale_until is None or entry.stale_until > now
+        ]
+
+    def __len__(self):
+        return len(self._data)
+
+    def _counters(self):
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'loads': self.loads,
+            'errors': self.errors,
+            'in_flight': len(self._flights),
+            'hit_rate': round((self.hits + self.stale_hits) / lookups, 3) if lookups else None,
+            'avg_load_ms': round(self.load_seconds * 1000 / self.loads, 1) if self.loads else None,
+        }
+
+    def stats(self):
+        return {
+            'type': 'ttl',
+            'ttl': self.ttl,
+            'stale_ttl': self.stale_ttl,
+            'entries': len(self._data),
+            **self._counters(),
+        }
+
+
+def _pickled_size(value):
+    return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+class LRUNamespace(Namespace):
+    """
+    Namespace giới hạn theo tổng bytes (ước lượng bằng kích thước pickle):
+    vượt max_bytes thì đẩy bản ghi lâu không dùng nhất ra
+    """
+
+    def __init__(self, name, max_bytes, ttl=None, stale_ttl=0, jitter=DEFAULT_JITTER, sizeof=_pickled_size):
+        super().__init__(name, ttl, stale_ttl, jitter)
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._data = OrderedDict()  # key → _Entry (size = bytes ước lượng)
+        self._bytes = 0
+        self.evictions = 0
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry.stale_until is not None and entry.stale_until <= time.time():
+                self._drop(key)
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def _store(self, key, entry):
+        size = self.sizeof(entry.value)
+        if size > self.max_bytes:
+            return  # 1 bản ghi lớn hơn cả cache → không lưu
+        with self._lock:
+            self._drop(key)
+            self._data[key] = entry._replace(size=size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def _drop(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def invalidate(self, key=_MISSING, publish=True):
+        self._forget_flights(key)
+        with self._lock:
+            self._generation += 1
+            if key is _MISSING:
+                self._data.clear()
+                self._bytes = 0
+            else:
+                self._drop(key)
+        _notify((self.name,))
+        if publish:
+            _publish((self.name,))
+
+    def stats(self):
+        return {
+            'type': 'lru',
+            'ttl': self.ttl,
+            'stale_ttl': self.stale_ttl,
+            'entries': len(self._data),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions,
+            **self._counters(),
+        }
+
+
+def namespace(name, ttl=None, stale_ttl=0, jitter=DEFAULT_JITTER):
+    """Lấy (hoặc đăng ký) namespace theo tên"""
+    ns = _NAMESPACES.get(name)
+    if ns is None:
+        with _REGISTRY_LOCK:
+            ns = _NAMESPACES.setdefault(name, Namespace(name, ttl, stale_ttl, jitter))
+    return ns
+
+
+def lru_namespace(name, max_bytes, ttl=None, stale_ttl=0, jitter=DEFAULT_JITTER, sizeof=_pickled_size):
+    """Lấy (hoặc đăng ký) namespace LRU giới hạn theo bytes (sizeof=len cho value là bytes)"""
+    ns = _NAMESPACES.get(name)
+    if ns is None:
+        with _REGISTRY_LOCK:
+            ns = _NAMESPACES.setdefault(name, LRUNamespace(name, max_bytes, ttl, stale_ttl, jitter, sizeof))
+    return ns
+
+
+def memoize(name, ttl=None, stale_ttl=0, jitter=DEFAULT_JITTER):
+    """
+    Decorator: cache kết quả hàm theo tham số (hashable) trong namespace `name`,
+    có đủ single-flight / stale-while-revalidate. Namespace ở `func.cache`.
+    """
+    ns = namespace(name, ttl, stale_ttl, jitter)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            return ns.get_or_set(args, lambda: func(*args))
+
+        wrapper.cache = ns
+        return wrapper
+
+    return decorator
+
+
+def stats():
+    """{namespace: thống kê} - dùng cho endpoint admin"""
+    return {name: ns.stats() for name, ns in sorted(_NAMESPACES.items())}
+
+
+def invalidate(name, key=_MISSING, publish=True):
+    ns = _NAMESPACES.get(name)
+    if ns is not None:
+        ns.invalidate(key, publish=False)
+    else:
+        _notify((name,))
+    if publish:
+        # Worker này chưa dùng namespace nhưng worker khác có thể đang cache
+        _publish((name,))
+
+
+def clear_all(publish=True):
+    names = list(_NAMESPACES)
+    for name in names:
+        _NAMESPACES[name].invalidate(publish=False)
+    if publish:
+        _publish(names)
+
+
+# ==================== BÁO WORKER KHÁC ====================
+def on_invalidate(publisher):
+    """Đăng ký hàm publisher(names) được gọi sau mỗi lần xoá (cache_bus)"""
+    if publisher not in _PUBLISHERS:
+        _PUBLISHERS.append(publisher)
+
+
+def subscribe(listener):
+    """
+    Đăng ký listener(names) được gọi mỗi khi namespace bị xoá ở process này,
+    kể cả do worker khác báo qua bus (vd: shared_cache đánh dấu segment cũ)
+    """
+    if listener not in _SUBSCRIBERS:
+        _SUBSCRIBERS.append(listener)
+
+
+def _notify(names):
+    for listener in _SUBSCRIBERS:
+        try:
+            listener(names)
+        except Exception:
+            logger.exception('Cache: listener invalidate %s lỗi', names)
+
+
+def _publish(names):
+    for publisher in _PUBLISHERS:
+        try:
+            publisher(names)
+        except Exception:
+            logger.exception('Cache: publish invalidate %s lỗi', names)
+
+
+# ==================== INVALIDATE SAU COMMIT ====================
+# Xoá cache ngay trong flush thì request khác có thể nạp lại dữ liệu cũ
+# (chưa commit) vào cache → hẹn lại, xoá khi commit xong.
+def invalidate_after_commit(session, name, key=_MISSING):
+    """Hẹn xoá namespace/key khi session commit (rollback thì huỷ)"""
+    session.info.setdefault('cache_invalidate', set()).add((name, key))
+
+
+def call_after_commit(session, func, *args):
+    """Hẹn gọi func(*args) khi session commit (rollback thì huỷ, trùng thì gọi 1 lần)"""
+    session.info.setdefault('cache_after_commit', set()).add((func, args))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_pending(session):
+    pending = session.info.pop('cache_invalidate', ())
+    for name, key in pending:
+        invalidate(name, key, publish=False)
+    if pending:
+        _publish({name for name, _ in pending})  # 1 lần cho cả commit
+    for func, args in session.info.pop('cache_after_commit', ()):
+        func(*args)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_pending(session, previous_transaction):
+    session.info.pop('cache_invalidate', None)
+    session.info.pop('cache_after_commit', None)
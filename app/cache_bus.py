@@ -0,0 +1,246 @@
+"""
+Cache Bus - Xoá cache in-process đồng bộ giữa các worker / instance
+
+Cache trong app/cache.py nằm trong RAM từng process: worker A sửa danh mục
+thì worker B (hoặc instance khác) vẫn phục vụ bản cũ đến hết TTL. Bus:
+
+- Ghi: mỗi lần cache.invalidate() (thường là sau commit) → tăng version của
+  namespace trong bảng cache_versions (1 transaction riêng, không đụng
+  session của request); CACHE_BUS='notify' + PostgreSQL thì kèm NOTIFY
+- Đọc: before_request kiểm tra bảng tối đa 1 lần / CACHE_BUS_POLL_MS,
+  namespace nào có version mới thì xoá cả namespace đó
+- 'notify': thêm 1 thread LISTEN (connection riêng, không chiếm pool) →
+  xoá ngay khi nhận; poll vẫn chạy để bù tin nhắn lỡ khi mất kết nối
+
+Version do chính worker vừa tăng thì bỏ qua (đã xoá cục bộ rồi).
+Bus lỗi (DB chập chờn) chỉ ghi log - cache vẫn hết hạn theo TTL như cũ.
+"""
+
+import logging
+import os
+import select
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+
+from app import cache, db
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'cache_invalidate'
+MODES = ('off', 'poll', 'notify')
+
+
+class CacheBus:
+    """Extension Flask: bus.init_app(app) - đọc CACHE_BUS / CACHE_BUS_POLL_MS"""
+
+    def __init__(self):
+        self.mode = 'off'
+        self.poll_interval = 1.0
+        self._app = None
+        self._known = {}  # namespace → version đã áp dụng ở worker này
+        self._has_baseline = False
+        self._listener_pid = None
+        self._last_poll = 0.0
+        self._poll_lock = threading.Lock()
+        self.published = self.received = self.errors = 0
+
+    @property
+    def notify(self):
+        return self.mode == 'notify'
+
+    def init_app(self, app):
+        mode = app.config.get('CACHE_BUS', 'off') or 'off'
+        if mode not in MODES:
+            raise ValueError(f'CACHE_BUS không hỗ trợ: {mode}')
+        uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+        if mode == 'notify' and make_url(uri).get_backend_name() != 'postgresql':
+            app.logger.warning('CACHE_BUS=notify cần PostgreSQL → dùng poll')
+            mode = 'poll'
+
+        self.mode = mode
+        self.poll_interval = app.config.get('CACHE_BUS_POLL_MS', 1000) / 1000
+        app.extensions['cache_bus'] = self
+        if mode == 'off':
+            return
+
+        self._app = app
+        cache.on_invalidate(self.publish)
+        app.before_request(self._before_request)
+
+    # ==================== GHI ====================
+    @staticmethod
+    def _table():
+        from app.models import CacheVersion
+        return CacheVersion.__table__
+
+    @staticmethod
+    def _bump(conn, table, name):
+        """version += 1 (upsert), trả về version mới"""
+        now = datetime.utcnow()
+        dialect = conn.engine.dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            insert = None
+
+        if insert is not None:
+            stmt = insert(table).values(namespace=name, version=1, updated_at=now)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.namespace],
+                set_={'version': table.c.version + 1, 'updated_at': now}
+            )
+            conn.execute(stmt)
+        else:
+            updated = conn.execute(
+                table.update()
+                .where(table.c.namespace == name)
+                .values(version=table.c.version + 1, updated_at=now)
+            ).rowcount
+            if not updated:
+                conn.execute(table.insert().values(namespace=name, version=1, updated_at=now))
+
+        return conn.execute(
+            table.select().with_only_columns(table.c.version).where(table.c.namespace == name)
+        ).scalar_one()
+
+    def publish(self, names):
+        """Tăng version các namespace vừa xoá (+ NOTIFY) - gọi qua cache.on_invalidate"""
+        names = sorted(set(names))
+        if not names:
+            return
+        table = self._table()
+        try:
+            with db.engine.begin() as conn:
+                versions = {name: self._bump(conn, table, name) for name in names}
+                if self.notify:
+                    for name, version in versions.items():
+                        conn.execute(
+                            text('SELECT pg_notify(:channel, :payload)'),
+                            {'channel': CHANNEL, 'payload': f'{name}:{version}'}
+                        )
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f'Cache bus: không publish được {names}: {e}')
+            return
+
+        self.published += len(names)
+        for name, version in versions.items():
+            # Chỉ bỏ qua khi không có worker nào khác tăng xen giữa
+            if self._known.get(name, 0) + 1 == version:
+                self._known[name] = version
+
+    # ==================== ĐỌC ====================
+    def _apply(self, versions, baseline=False):
+        for name, version in versions:
+            known = self._known.get(name)
+            if known is not None and version <= known:
+                continue
+            self._known[name] = version
+            if not baseline:
+                cache.invalidate(name, publish=False)
+                self.received += 1
+
+    def poll(self):
+        """Đọc toàn bộ cache_versions (vài chục dòng) và xoá namespace có version mới"""
+        table = self._table()
+        with db.engine.connect() as conn:
+            rows = conn.execute(table.select().with_only_columns(table.c.namespace, table.c.version)).all()
+
+        # Lần poll đầu (chưa có mốc): chỉ ghi nhận mốc, cache lúc này còn rỗng.
+        # Worker fork từ master đã warm-up thì kế thừa mốc của master (mark_baseline)
+        # → namespace đổi sau lúc warm-up bị xoá ngay lần poll đầu của worker
+        self._apply(rows, baseline=not self._has_baseline)
+        self._has_baseline = True
+
+    def mark_baseline(self):
+        """
+        Ghi nhận version hiện tại ở master (preload, TRƯỚC khi nạp cache): worker
+        fork sau đó - kể cả worker thay thế sau max_requests - so với mốc này thay
+        vì coi cache kế thừa từ master là mới. Returns: True nếu bus đang bật
+        """
+        if self.mode == 'off':
+            return False
+        self.poll()
+        return True
+
+    def _before_request(self):
+        if self.notify:
+            self._ensure_listener()
+
+        now = time.monotonic()
+        if now - self._last_poll < self.poll_interval:
+            return
+        if not self._poll_lock.acquire(blocking=False):
+            return  # thread khác đang poll
+        try:
+            self._last_poll = now
+            self.poll()
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f'Cache bus: poll lỗi: {e}')
+        finally:
+            self._poll_lock.release()
+
+    # ==================== LISTEN / NOTIFY ====================
+    def _ensure_listener(self):
+        # preload_app: thread tạo ở master không sống sót qua fork → mở ở từng worker
+        pid = os.getpid()
+        if self._listener_pid == pid:
+            return
+        self._listener_pid = pid
+        threading.Thread(target=self._listen, name='cache-bus-listener', daemon=True).start()
+
+    def _on_notify(self, payload):
+        name, _, version = payload.rpartition(':')
+        try:
+            self._apply([(name, int(version))])
+        except ValueError:
+            logger.warning(f'Cache bus: payload không hợp lệ {payload!r}')
+
+    def _listen(self):
+        with self._app.app_context():
+            url = db.engine.url
+        engine = create_engine(url, poolclass=NullPool)
+        backoff = 1
+
+        while True:
+            try:
+                raw = engine.raw_connection()
+                try:
+                    conn = raw.driver_connection  # psycopg2
+                    conn.autocommit = True
+                    conn.cursor().execute(f'LISTEN {CHANNEL}')
+                    backoff = 1
+                    while True:
+                        if select.select([conn], [], [], 60) == ([], [], []):
+                            continue
+                        conn.poll()
+                        while conn.notifies:
+                            self._on_notify(conn.notifies.pop(0).payload)
+                finally:
+                    raw.close()
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f'Cache bus: LISTEN mất kết nối ({e}), thử lại sau {backoff}s')
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+
+    def stats(self):
+        return {
+            'mode': self.mode,
+            'poll_interval_ms': int(self.poll_interval * 1000),
+            'known_versions': dict(self._known),
+            'published': self.published,
+            'received': self.received,
+            'errors': self.errors,
+        }
+
+
+bus = CacheBus()
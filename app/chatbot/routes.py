@@ -1,14 +1,20 @@
 from flask import request, jsonify, session, current_app
 from . import chatbot_bp
-import google.generativeai as genai
+from app import cache, limiter
+from app.rate_limit import get_client_ip, get_session_token
+from app.startup_profile import rss_kb
 from datetime import datetime
 import json
 import os
+import threading
+import time
 
 # ==================== GLOBALS ====================
 model = None  # Gemini model (per-worker)
-_COMPANY_INFO_CACHE = None
-_COMPANY_INFO_MTIME = None
+_genai = None  # module google.generativeai (import lazy, lần đầu dùng)
+_GEMINI_LOCK = threading.RLock()
+_WARMUP_PID = None  # pid đã chạy warm-up (preload_app: master không warm-up)
+_company_info = cache.namespace('chatbot_company_info')  # không TTL, nạp lại theo mtime
 _DEFAULT_MODEL_NAME = 'gemini-2.0-flash-lite'
 
 # Từ khoá kích hoạt chế độ "full" (kỹ thuật/CSKH chi tiết)
@@ -18,9 +24,39 @@ TECH_KEYWORDS = [
     "màu ron", "màu chà ron", "packaging", "bao bì", "ứng dụng", "hướng dẫn thi công"
 ]
 
+# ==================== LAZY SDK IMPORT ====================
+# google.generativeai kéo theo protobuf/grpc: vài giây + hàng chục MB RSS trên 0.5 CPU.
+# Chỉ import khi thật sự cần (warm-up nền hoặc request chat đầu tiên).
+GEMINI_IMPORT_STATS = {
+    'imported': False,
+    'import_seconds': None,
+    'import_rss_kb': None,
+    'init_seconds': None,
+    'warmup': 'pending',  # pending | running | done | skipped | failed
+}
+
+
+def get_genai():
+    """Import google.generativeai 1 lần/process, ghi lại thời gian + RSS tăng thêm"""
+    global _genai
+    if _genai is not None:
+        return _genai
+
+    with _GEMINI_LOCK:
+        if _genai is None:
+            rss_before = rss_kb()
+            started = time.perf_counter()
+            import google.generativeai as genai
+            GEMINI_IMPORT_STATS['import_seconds'] = round(time.perf_counter() - started, 3)
+            GEMINI_IMPORT_STATS['import_rss_kb'] = rss_kb() - rss_before
+            GEMINI_IMPORT_STATS['imported'] = True
+            _genai = genai
+    return _genai
+
+
 # ==================== INIT GEMINI ====================
 def init_gemini():
-    """Khởi tạo Gemini API (được gọi khi app boot và khi lần đầu /send)."""
+    """Khởi tạo Gemini API (gọi từ warm-up nền hoặc khi lần đầu /send)."""
     global model
     api_key = current_app.config.get('GEMINI_API_KEY')
     if not api_key:
@@ -28,45 +64,81 @@ def init_gemini():
         model = None
         return
 
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(_DEFAULT_MODEL_NAME)
-        current_app.logger.info("✅ Gemini API initialized successfully")
-    except Exception as e:
-        current_app.logger.error(f"❌ Failed to initialize Gemini API: {str(e)}")
-        model = None
+    with _GEMINI_LOCK:
+        if model is not None:
+            return
+        try:
+            started = time.perf_counter()
+            genai = get_genai()
+            genai.configure(api_key=api_key)
+            model = genai.GenerativeModel(_DEFAULT_MODEL_NAME)
+            GEMINI_IMPORT_STATS['init_seconds'] = round(time.perf_counter() - started, 3)
+            current_app.logger.info(
+                f"✅ Gemini API initialized (import {GEMINI_IMPORT_STATS['import_seconds']}s, "
+                f"+{GEMINI_IMPORT_STATS['import_rss_kb']} KB RSS)"
+            )
+        except Exception as e:
+            current_app.logger.error(f"❌ Failed to initialize Gemini API: {str(e)}")
+            model = None
+
+
+def start_warmup(app):
+    """
+    Warm-up Gemini + company info trong thread nền (1 lần/process).
+    Worker nhận request ngay, không chờ SDK import xong.
+    """
+    global _WARMUP_PID
+    if _WARMUP_PID == os.getpid():
+        return
+    _WARMUP_PID = os.getpid()
+
+    if not app.config.get('GEMINI_WARMUP', True) or not app.config.get('CHATBOT_ENABLED', True):
+        GEMINI_IMPORT_STATS['warmup'] = 'skipped'
+        return
+
+    def _run():
+        GEMINI_IMPORT_STATS['warmup'] = 'running'
+        try:
+            with app.app_context():
+                init_gemini()
+                load_company_info()
+            GEMINI_IMPORT_STATS['warmup'] = 'done' if model is not None else 'failed'
+        except Exception as e:
+            GEMINI_IMPORT_STATS['warmup'] = 'failed'
+            app.logger.error(f"❌ Chatbot warm-up error: {str(e)}")
+
+    threading.Thread(target=_run, name='gemini-warmup', daemon=True).start()
 
 
 # ==================== COMPANY INFO (CACHE + INVALIDATION) ====================
+def _read_company_info(json_path, mtime):
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    current_app.logger.info(f"✅ Loaded company info (mtime={mtime})")
+    return data
+
+
 def load_company_info():
     """
     Đọc company_info.json với cache theo mtime:
     - Lần đầu: đọc file & cache
-    - Khi file đổi (mtime khác): reload
+    - Khi file đổi (mtime khác): reload (nhiều request cùng lúc → chỉ đọc 1 lần)
     - Nếu lỗi, trả về cache cũ (nếu có) để không gián đoạn
     """
-    global _COMPANY_INFO_CACHE, _COMPANY_INFO_MTIME
     json_path = os.path.join(current_app.root_path, 'chatbot', 'company_info.json')
 
     try:
         mtime = os.path.getmtime(json_path)
-        if _COMPANY_INFO_CACHE is not None and _COMPANY_INFO_MTIME == mtime:
-            return _COMPANY_INFO_CACHE
-
-        with open(json_path, 'r', encoding='utf-8') as f:
-            _COMPANY_INFO_CACHE = json.load(f)
-            _COMPANY_INFO_MTIME = mtime
-            current_app.logger.info(f"✅ Loaded company info (mtime={mtime})")
-            return _COMPANY_INFO_CACHE
+        return _company_info.get_or_set(
+            'data', lambda: _read_company_info(json_path, mtime), version=mtime
+        )
     except FileNotFoundError:
         current_app.logger.error(f"❌ company_info.json not found at {json_path}")
-        return _COMPANY_INFO_CACHE or {}
     except json.JSONDecodeError as e:
         current_app.logger.error(f"❌ Invalid JSON: {str(e)}")
-        return _COMPANY_INFO_CACHE or {}
     except Exception as e:
         current_app.logger.error(f"❌ load_company_info error: {str(e)}")
-        return _COMPANY_INFO_CACHE or {}
+    return _company_info.peek('data', {})
 
 
 # ==================== PROMPT MODES ====================
@@ -241,12 +313,53 @@ def build_full_prompt(system_prompt: str, history_context: str, user_message: st
 """
 
 
+# ==================== RATE LIMIT ====================
+def _chatbot_limit():
+    return current_app.config.get('CHATBOT_REQUEST_LIMIT', 15)
+
+
+def _chatbot_ip_limit():
+    return current_app.config.get('CHATBOT_IP_REQUEST_LIMIT', 45)
+
+
+def _chatbot_window():
+    return current_app.config.get('CHATBOT_REQUEST_WINDOW', 3600)  # 1h
+
+
+def _chatbot_limited(result):
+    """Hết lượt chat: trả 200 như 1 tin nhắn bot để widget (chatbot.js) hiển thị"""
+    request_limit = _chatbot_limit()
+    minutes = max(1, result.reset_after // 60)
+    return jsonify({
+        'response': (
+            f'⏰ Anh/chị đã dùng hết {request_limit} lượt chat/giờ.\n'
+            f'Vui lòng thử lại sau {minutes} phút hoặc liên hệ 📞 1900 63 62 94 | Zalo {current_app.config.get("HOTLINE_ZALO","0901.180.094")}'
+        ),
+        'remaining_requests': 0
+    })
+
+
+def _chatbot_quota(consume):
+    """
+    Kết quả chặt nhất của 2 giới hạn (session + IP).
+    consume=False: chỉ xem còn lượt không | consume=True: trừ 1 lượt
+    """
+    window = int(_chatbot_window())
+    check = limiter.hit if consume else limiter.peek
+    results = (
+        check('chatbot', 'session', get_session_token(), int(_chatbot_limit()), window),
+        check('chatbot_ip', 'ip', get_client_ip(), int(_chatbot_ip_limit()), window),
+    )
+    return min(results, key=lambda result: (result.allowed, result.remaining))
+
+
 # ==================== ROUTES ====================
 @chatbot_bp.route('/send', methods=['POST'])
 def send_message():
     """
     Xử lý tin nhắn:
-    - Tuân thủ giới hạn trong app/config.py (15 req/giờ mặc định)
+    - Giới hạn lượt theo session + IP ở server (app/rate_limit.py), xoá cookie không reset được.
+      Chỉ trừ lượt khi model trả lời được: chatbot tắt / tin nhắn sai / lỗi API không tính
     - Tự động chọn 'lite'/'full' theo intent
     - Timeout gọi model dựa vào GEMINI_TIMEOUT (mặc định 30s) < gunicorn 60s
     """
@@ -272,29 +385,10 @@ def send_message():
         if len(user_message) > 500:
             return jsonify({'error': 'Tin nhắn quá dài (tối đa 500 ký tự)'}), 400
 
-        # Rate limit theo session
-        if 'chatbot_request_count' not in session:
-            session['chatbot_request_count'] = 0
-            session['chatbot_request_start_time'] = datetime.now().timestamp()
-
-        now_ts = datetime.now().timestamp()
-        request_limit = int(current_app.config.get('CHATBOT_REQUEST_LIMIT', 15))
-        window = int(current_app.config.get('CHATBOT_REQUEST_WINDOW', 3600))  # 1h
-
-        # Reset window
-        if now_ts - session['chatbot_request_start_time'] > window:
-            session['chatbot_request_count'] = 0
-            session['chatbot_request_start_time'] = now_ts
-
-        if session['chatbot_request_count'] >= request_limit:
-            return jsonify({
-                'response': (
-                    f'⏰ Anh/chị đã dùng hết {request_limit} lượt chat/giờ.\n'
-                    f'Vui lòng thử lại sau hoặc liên hệ 📞 1900 63 62 94 | Zalo {current_app.config.get("HOTLINE_ZALO","0901.180.094")}'
-                )
-            })
-
-        session['chatbot_request_count'] += 1
+        # Hết lượt → không gọi model
+        quota = _chatbot_quota(consume=False)
+        if not quota.allowed:
+            return _chatbot_limited(quota)
 
         # Lịch sử hội thoại (giới hạn ngắn để tiết kiệm token)
         history_turns = int(current_app.config.get('CHATBOT_HISTORY_TURNS', 5))
@@ -315,7 +409,7 @@ def send_message():
         try:
             response = model.generate_content(
                 full_prompt,
-                generation_config=genai.types.GenerationConfig(
+                generation_config=get_genai().types.GenerationConfig(
                     temperature=float(current_app.config.get('CHATBOT_TEMPERATURE', 0.6)),
                     max_output_tokens=int(current_app.config.get('CHATBOT_MAX_OUTPUT_TOKENS', 800 if mode == "full" else 400)),
                     top_p=0.9,
@@ -346,7 +440,8 @@ def send_message():
         session['chatbot_history'] = session['chatbot_history'][-20:]
         session.modified = True
 
-        remaining = request_limit - session['chatbot_request_count']
+        # Trừ lượt sau khi có câu trả lời
+        remaining = _chatbot_quota(consume=True).remaining
 
         return jsonify({
             'response': bot_reply,
@@ -366,9 +461,8 @@ def send_message():
 def reset_chat():
     """Xoá lịch sử + đếm lượt"""
     try:
+        # Chỉ xoá lịch sử - bộ đếm lượt nằm ở server nên không reset theo session
         session.pop('chatbot_history', None)
-        session.pop('chatbot_request_count', None)
-        session.pop('chatbot_request_start_time', None)
         session.modified = True
         current_app.logger.info("✅ Chat history reset successfully")
         return jsonify({'status': 'success', 'message': '✅ Đã làm mới hội thoại', 'timestamp': datetime.now().isoformat()})
@@ -382,13 +476,12 @@ def chatbot_status():
     """Kiểm tra trạng thái chatbot"""
     try:
         global model
-        limit = int(current_app.config.get('CHATBOT_REQUEST_LIMIT', 15))
-        used = int(session.get('chatbot_request_count', 0))
         return jsonify({
             'enabled': current_app.config.get('CHATBOT_ENABLED', True),
             'model_initialized': model is not None,
-            'request_limit': limit,
-            'remaining_requests': max(0, limit - used),
+            'sdk': GEMINI_IMPORT_STATS,
+            'request_limit': int(_chatbot_limit()),
+            'remaining_requests': _chatbot_quota(consume=False).remaining,
             'history_length': len(session.get('chatbot_history', [])),
             'timestamp': datetime.now().isoformat()
         })
@@ -399,12 +492,13 @@ def chatbot_status():
 
 # ==================== APP HOOK ====================
 def init_chatbot(app):
-    """Gọi ở __init__.py khi khởi động app"""
-    with app.app_context():
-        init_gemini()
-        # Preload company info để cache sẵn (không block request đầu)
-        try:
-            load_company_info()
-        except Exception:
-            pass
-        current_app.logger.info("🤖 BRICON Chatbot initialized (hybrid mode)")
+    """
+    Gọi ở __init__.py khi khởi động app - KHÔNG import SDK lúc boot.
+    - Gunicorn: post_worker_init gọi start_warmup() sau khi worker sẵn sàng
+    - Dev server / fallback: request đầu tiên của process kích hoạt warm-up nền
+    """
+
+    @app.before_request
+    def _chatbot_warmup_once():
+        if _WARMUP_PID != os.getpid():
+            start_warmup(app)
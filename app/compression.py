@@ -0,0 +1,240 @@
+"""
+Compression - Nén HTTP thay cho flask_compress
+
+flask_compress nén gzip level 6 mọi response HTML/JSON ở mỗi request: trên
+0.5 CPU, thời gian nén tranh CPU với xử lý request, và cùng 1 trang bị nén
+lại nhiều lần. Thay bằng:
+
+- Static (app/static): file .br / .gz nén sẵn 1 lần (lúc deploy bằng
+  `flask compress-static`, hoặc lúc khởi động - chỉ file thiếu/cũ), view
+  static trả thẳng file nén phù hợp Accept-Encoding
+- Response cacheable (GET 200, không Set-Cookie / private / no-store): gắn
+  ETag theo nội dung (trình duyệt gửi lại If-None-Match → 304), body nén
+  mức cao cache trong LRU theo (ETag, encoding) → trang giống nhau chỉ nén 1 lần
+- Response động không cache được: nén mức thấp (COMPRESS_DYNAMIC_LEVEL)
+- Brotli (nếu có package brotli và client chấp nhận), không thì gzip
+
+Usage:
+    compress = Compression()
+    compress.init_app(app)
+"""
+
+import gzip
+import mimetypes
+import os
+
+from flask import request, send_from_directory
+
+from app import cache
+
+try:
+    import brotli
+except ImportError:  # chưa cài brotli → chỉ gzip
+    brotli = None
+
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+# Đuôi file static đáng nén (ảnh/font đã nén sẵn thì bỏ qua)
+STATIC_EXTENSIONS = ('.css', '.js', '.svg', '.txt', '.xml', '.json', '.webmanifest', '.html', '.map')
+STATIC_SKIP_DIRS = ('uploads',)
+
+
+# ==================== NÉN ====================
+def compress_bytes(data, encoding, level):
+    """level: gzip 1-9 / brotli quality 0-11"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def parse_accept_encoding(header):
+    """'gzip, br;q=0.8, *;q=0' → {'gzip': 1.0, 'br': 0.8, '*': 0.0}"""
+    accepted = {}
+    for part in (header or '').split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    return accepted
+
+
+def negotiate(header, available=None):
+    """Encoding tốt nhất client chấp nhận: 'br' > 'gzip', None nếu không nén"""
+    accepted = parse_accept_encoding(header)
+    available = available or (('br', 'gzip') if brotli is not None else ('gzip',))
+    wildcard = accepted.get('*', 0.0)
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+# ==================== STATIC NÉN SẴN ====================
+def _static_sources(static_folder):
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = [d for d in dirs if d not in STATIC_SKIP_DIRS]
+        for name in files:
+            if name.endswith(STATIC_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def build_static(static_folder, min_size=500, force=False):
+    """
+    Ghi file .gz (level 9) và .br (quality 11) cạnh file static - bỏ qua file
+    đã có bản nén mới hơn. Returns: (số file nén mới, tổng bytes gốc, tổng bytes .br/.gz nhỏ nhất)
+    """
+    built, original_total, compressed_total = 0, 0, 0
+    for path in _static_sources(static_folder):
+        stat = os.stat(path)
+        if stat.st_size < min_size:
+            continue
+        data = None
+        smallest = stat.st_size
+        for encoding, suffix in SUFFIXES.items():
+            if encoding == 'br' and brotli is None:
+                continue
+            target = path + suffix
+            if not force and os.path.exists(target) and os.stat(target).st_mtime >= stat.st_mtime:
+                smallest = min(smallest, os.stat(target).st_size)
+                continue
+            if data is None:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            body = compress_bytes(data, encoding, 11 if encoding == 'br' else 9)
+            with open(target + '.tmp', 'wb') as f:
+                f.write(body)
+            os.replace(target + '.tmp', target)
+            smallest = min(smallest, len(body))
+            built += 1
+        original_total += stat.st_size
+        compressed_total += smallest
+    return built, original_total, compressed_total
+
+
+def scan_static(static_folder):
+    """{đường dẫn tương đối (posix): {encoding có sẵn}} - đọc 1 lần lúc khởi động"""
+    variants = {}
+    for path in _static_sources(static_folder):
+        rel = os.path.relpath(path, static_folder).replace(os.sep, '/')
+        found = {encoding for encoding, suffix in SUFFIXES.items() if os.path.exists(path + suffix)}
+        if found:
+            variants[rel] = found
+    return variants
+
+
+# ==================== EXTENSION ====================
+class Compression:
+    """Extension Flask: compress.init_app(app)"""
+
+    def __init__(self, app=None):
+        self.mimetypes = ()
+        self.min_size = 500
+        self.level = 6
+        self.br_level = 5
+        self.dynamic_level = 1
+        self.static_variants = {}
+        self._bodies = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        self.mimetypes = frozenset(config.get('COMPRESS_MIMETYPES', ()))
+        self.min_size = config.get('COMPRESS_MIN_SIZE', 500)
+        self.level = config.get('COMPRESS_LEVEL', 6)
+        self.br_level = config.get('COMPRESS_BR_LEVEL', 5)
+        self.dynamic_level = config.get('COMPRESS_DYNAMIC_LEVEL', 1)
+        self._bodies = cache.lru_namespace(
+            'compressed', max_bytes=config.get('COMPRESS_CACHE_MAX_BYTES', 4 * 1024 * 1024),
+            ttl=3600, sizeof=len
+        )
+
+        if app.static_folder and os.path.isdir(app.static_folder):
+            if config.get('COMPRESS_STATIC_ON_START', True):
+                try:
+                    build_static(app.static_folder, self.min_size)
+                except OSError as e:  # filesystem chỉ đọc → phục vụ bản gốc
+                    app.logger.warning(f'Không nén sẵn được static: {e}')
+            self.static_variants = scan_static(app.static_folder)
+            if 'static' in app.view_functions:
+                app.view_functions['static'] = self._static_view(app, app.view_functions['static'])
+
+        app.after_request(self.after_request)
+        app.extensions['compression'] = self
+
+    # ----- static -----
+    def _static_view(self, app, original):
+        def static(filename):
+            encodings = self.static_variants.get(filename)
+            encoding = negotiate(request.headers.get('Accept-Encoding'), tuple(
+                e for e in ('br', 'gzip') if e in encodings
+            )) if encodings else None
+            if encoding is None:
+                response = original(filename)
+            else:
+                response = send_from_directory(
+                    app.static_folder, filename + SUFFIXES[encoding],
+                    mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                    max_age=app.get_send_file_max_age(filename),
+                )
+                response.headers['Content-Encoding'] = encoding
+            if filename in self.static_variants:
+                response.vary.add('Accept-Encoding')
+            return response
+
+        return static
+
+    # ----- response động -----
+    @staticmethod
+    def _cacheable(response):
+        cc = response.cache_control
+        return not (cc.no_store or cc.private or 'Set-Cookie' in response.headers)
+
+    def after_request(self, response):
+        if (
+            response.mimetype not in self.mimetypes
+            or response.direct_passthrough
+            or response.is_streamed
+            or response.status_code != 200
+            or 'Content-Encoding' in response.headers
+        ):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        if response.content_length is not None and response.content_length < self.min_size:
+            return response
+
+        cacheable = request.method in ('GET', 'HEAD') and self._cacheable(response)
+        if cacheable:
+            if not response.get_etag()[0]:
+                response.add_etag()
+            response.make_conditional(request)
+            if response.status_code == 304:
+                return response
+
+        encoding = negotiate(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if cacheable:
+            etag = response.get_etag()[0]
+            level = self.br_level if encoding == 'br' else self.level
+            body = self._bodies.get_or_set((etag, encoding), lambda: compress_bytes(data, encoding, level))
+            # Cùng ETag cho mọi encoding → weak (So khớp If-None-Match vẫn đúng)
+            response.set_etag(etag, weak=True)
+        else:
+            body = compress_bytes(data, encoding, self.dynamic_level)
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        return response
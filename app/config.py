@@ -55,7 +55,9 @@ class Config:
     CHATBOT_ENABLED = True
     CHATBOT_REQUEST_LIMIT = int(os.environ.get('CHATBOT_REQUEST_LIMIT', 15))
     CHATBOT_REQUEST_WINDOW = int(os.environ.get('CHATBOT_REQUEST_WINDOW', 3600))  # 1h
+    CHATBOT_IP_REQUEST_LIMIT = int(os.environ.get('CHATBOT_IP_REQUEST_LIMIT', 45))  # nhiều người chung 1 IP
     GEMINI_TIMEOUT = int(os.environ.get('GEMINI_TIMEOUT', 30))  # ≤ 45s để còn headroom dưới gunicorn 60s
+    GEMINI_WARMUP = os.environ.get('GEMINI_WARMUP', '1') == '1'  # import SDK nền sau khi worker sẵn sàng
 
     # (Tuỳ chọn hybrid prompt)
     CHATBOT_HISTORY_TURNS = int(os.environ.get('CHATBOT_HISTORY_TURNS', 5))
@@ -64,21 +66,61 @@ class Config:
     CHATBOT_MAX_OUTPUT_TOKENS = int(os.environ.get('CHATBOT_MAX_OUTPUT_TOKENS', 800))
     HOTLINE_ZALO = os.environ.get('HOTLINE_ZALO', '0901.180.094')
 
-    # ===== FLASK-COMPRESS =====
+    # ===== COMPRESSION (app/compression.py) =====
     COMPRESS_MIMETYPES = [
         'text/html', 'text/css', 'text/xml', 'application/json',
         'application/javascript', 'text/javascript'
     ]
-    COMPRESS_LEVEL = 6
+    COMPRESS_LEVEL = 6  # gzip - response cacheable (nén 1 lần / ETag)
+    COMPRESS_BR_LEVEL = 5  # brotli quality - response cacheable
+    COMPRESS_DYNAMIC_LEVEL = 1  # gzip/brotli - response không cache được (nén mỗi request)
     COMPRESS_MIN_SIZE = 500
+    COMPRESS_CACHE_MAX_BYTES = int(os.environ.get('COMPRESS_CACHE_MAX_BYTES', 4 * 1024 * 1024))  # LRU body đã nén
+    COMPRESS_STATIC_ON_START = os.environ.get('COMPRESS_STATIC_ON_START', '1') == '1'  # tạo .br/.gz còn thiếu lúc khởi động
+
+    # ===== STATIC ASSETS (app/assets.py) =====
+    ASSETS_ENABLED = os.environ.get('ASSETS_ENABLED', '1') == '1'  # static_url() trả URL có hash (tắt khi debug)
+    ASSETS_BUILD_ON_START = os.environ.get('ASSETS_BUILD_ON_START', '1') == '1'  # build khi manifest thiếu / cũ
+    ASSETS_MINIFY = os.environ.get('ASSETS_MINIFY', '1') == '1'
+    STATIC_MAX_AGE = int(os.environ.get('STATIC_MAX_AGE', 3600))  # giây - URL static không hash
 
     # ===== CACHING =====
     CACHE_TYPE = 'simple'
     CACHE_DEFAULT_TIMEOUT = 300
+    DETAIL_CACHE_MAX_BYTES = int(os.environ.get('DETAIL_CACHE_MAX_BYTES', 8 * 1024 * 1024))  # LRU trang chi tiết (bytes)
+    DETAIL_CACHE_TTL = int(os.environ.get('DETAIL_CACHE_TTL', 600))
+    FRAGMENT_CACHE_ENABLED = os.environ.get('FRAGMENT_CACHE_ENABLED', '1') == '1'  # {% cache %} trong template (tắt khi debug)
+    FRAGMENT_CACHE_MAX_BYTES = int(os.environ.get('FRAGMENT_CACHE_MAX_BYTES', 1024 * 1024))  # LRU HTML fragment (bytes)
+    FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', 300))  # giây - bằng TTL cache settings
+    RELATED_TOP_N = int(os.environ.get('RELATED_TOP_N', 8))  # số item liên quan lưu sẵn mỗi item
+    RELATED_REFRESH_DELAY = int(os.environ.get('RELATED_REFRESH_DELAY', 10))  # giây chờ trước khi rebuild sau khi sửa
+    ADMIN_METRICS_TTL = int(os.environ.get('ADMIN_METRICS_TTL', 60))  # giây, số liệu dashboard/media
+    SNAPSHOT_WARM_PATH = os.environ.get('SNAPSHOT_WARM_PATH')  # thư mục snapshot nạp vào cache lúc boot (flask snapshot export)
+    # Xoá cache đồng bộ giữa worker/instance: 'off' (1 worker) | 'poll' (bảng cache_versions)
+    # | 'notify' (poll + PostgreSQL LISTEN/NOTIFY, xoá gần như tức thì)
+    CACHE_BUS = os.environ.get('CACHE_BUS', 'off')
+    CACHE_BUS_POLL_MS = int(os.environ.get('CACHE_BUS_POLL_MS', 1000))  # mỗi worker kiểm tra version tối đa 1 lần / N ms
+    # settings / danh mục / slug → id trong file mmap (/dev/shm) dùng chung giữa các worker (app/shared_cache.py)
+    SHARED_CACHE_ENABLED = os.environ.get('SHARED_CACHE_ENABLED', '0') == '1'
+    SHARED_CACHE_DIR = os.environ.get('SHARED_CACHE_DIR')  # mặc định /dev/shm/bricon-cache-<hash DB>
+    SHARED_CACHE_CHECK_MS = int(os.environ.get('SHARED_CACHE_CHECK_MS', 500))
+
+    # ===== DIAGNOSTICS =====
+    # /admin/diagnostics: tracemalloc snapshot + diff để tìm rò rỉ bộ nhớ (chỉ bật khi đo)
+    DIAGNOSTICS_ENABLED = os.environ.get('DIAGNOSTICS_ENABLED', '0') == '1'
+    DIAGNOSTICS_DIR = os.environ.get('DIAGNOSTICS_DIR')  # mặc định <tmp>/bricon-diagnostics (dùng chung giữa worker)
 
     # ===== SECURITY / RATE LIMIT =====
     RATELIMIT_ENABLED = True
-    RATELIMIT_STORAGE_URL = 'memory://'
+    # 'memory://' (1 worker) | 'database://' (nhiều worker/instance dùng chung bộ đếm)
+    RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL', 'memory://')
+    RATELIMIT_PROXY_COUNT = int(os.environ.get('RATELIMIT_PROXY_COUNT', 1))  # Render: 1 proxy phía trước
+    LOGIN_RATE_LIMIT = int(os.environ.get('LOGIN_RATE_LIMIT', 20))  # POST /login mỗi IP
+    LOGIN_RATE_WINDOW = int(os.environ.get('LOGIN_RATE_WINDOW', 900))  # 15 phút
+    LOGIN_LOCKOUT_SECONDS = int(os.environ.get('LOGIN_LOCKOUT_SECONDS', 1800))  # khoá 30 phút theo email
+    QUIZ_ANSWER_RATE_LIMIT = int(os.environ.get('QUIZ_ANSWER_RATE_LIMIT', 120))  # click/phút mỗi session
+    QUIZ_ANSWER_IP_RATE_LIMIT = int(os.environ.get('QUIZ_ANSWER_IP_RATE_LIMIT', 2400))  # cả phòng thi chung 1 IP
+    QUIZ_CHECKPOINT_SECONDS = int(os.environ.get('QUIZ_CHECKPOINT_SECONDS', 30))  # trình duyệt gửi câu trả lời theo lô
     SESSION_COOKIE_SECURE = os.environ.get('FLASK_ENV') == 'production'
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
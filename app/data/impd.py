@@ -1,319 +1,465 @@
 """
 Script Import Sản Phẩm BRICON từ sanpham.json
 ==============================================
-Chạy từ thư mục gốc: python -m app.data.import_products
+Chạy từ thư mục gốc:
+    python -m app.data.impd [file.json] [--dry-run] [--diff] [--yes]
+                            [--chunk-size 500] [--upload-images] [--workers 4]
 
 Tính năng:
-- Import categories và products từ sanpham.json
-- Tự động tạo slug từ tên
-- Cập nhật nếu sản phẩm đã tồn tại
-- Validate dữ liệu đầy đủ
-- Log chi tiết quá trình import
+- Import categories và products từ JSON (tự tạo slug từ tên nếu thiếu)
+- Nạp sẵn slug đã có trong DB vào dict (1 query) → không query từng dòng
+- Ghi theo lô (chunk): PostgreSQL dùng INSERT ... ON CONFLICT DO UPDATE,
+  DB khác dùng INSERT / UPDATE executemany
+- Đọc JSON streaming bằng ijson nếu có (file lớn không phải nạp hết vào RAM)
+- --dry-run / --diff: chỉ so sánh với DB, in số tạo mới / cập nhật / không đổi
+- --upload-images: đẩy ảnh (URL hoặc file local) lên Cloudinary bằng thread
+  pool giới hạn số luồng, ảnh trùng chỉ upload 1 lần
 """
 
+import argparse
 import json
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from slugify import slugify
 
 # Thêm đường dẫn để import được
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from app import create_app, db
+from app import cache, create_app, db, related
 from app.models import Product, Category
 from app.data import PRODUCTS_JSON
 
+CATEGORY_FIELDS = ('name', 'description', 'image')
+PRODUCT_FIELDS = (
+    'name', 'description', 'category_id', 'image', 'price', 'old_price', 'is_featured',
+    'composition', 'production', 'application', 'expiry', 'packaging',
+    'colors', 'technical_specs', 'standards',
+)
+
+
+# ==================== ĐỌC JSON (STREAMING) ====================
+def iter_section(json_file, key):
+    """
+    Duyệt từng phần tử của mảng `key` trong file JSON.
+    Có ijson → parse streaming (RAM phẳng), không có → json.load cả file.
+    """
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+
+    if ijson is None:
+        with open(json_file, 'r', encoding='utf-8') as f:
+            yield from json.load(f).get(key, [])
+        return
+
+    with open(json_file, 'rb') as f:
+        yield from ijson.items(f, f'{key}.item', use_float=True)
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ==================== BULK UPSERT ====================
+def bulk_upsert(table, rows, existing_slugs, update_fields):
+    """
+    Ghi 1 lô rows (dict có 'slug') vào table.
+    - PostgreSQL: 1 câu INSERT ... ON CONFLICT (slug) DO UPDATE
+    - DB khác (SQLite...): INSERT executemany cho slug mới + UPDATE executemany cho slug cũ
+    """
+    if not rows:
+        return
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.slug],
+            set_={field: stmt.excluded[field] for field in update_fields}
+        )
+        db.session.execute(stmt)
+        return
+
+    from sqlalchemy import bindparam
+
+    new_rows = [row for row in rows if row['slug'] not in existing_slugs]
+    old_rows = [
+        {'b_slug': row['slug'], **{field: row[field] for field in update_fields}}
+        for row in rows if row['slug'] in existing_slugs
+    ]
+
+    if new_rows:
+        db.session.execute(table.insert(), new_rows)
+    if old_rows:
+        db.session.execute(
+            table.update()
+            .where(table.c.slug == bindparam('b_slug'))
+            .values({field: bindparam(field) for field in update_fields}),
+            old_rows
+        )
+
+
+# ==================== UPLOAD ẢNH SONG SONG ====================
+class ImageUploader:
+    """Upload ảnh lên Cloudinary qua thread pool giới hạn, nhớ kết quả theo nguồn"""
+
+    def __init__(self, workers=4, folder='enterprise/products', base_dir=None):
+        self.workers = workers
+        self.folder = folder
+        self.base_dir = base_dir
+        self.uploaded = {}  # nguồn → URL Cloudinary
+        self.failed = {}
+
+    @staticmethod
+    def needs_upload(source):
+        return bool(source) and 'res.cloudinary.com' not in source
+
+    def _resolve(self, source):
+        if source.startswith(('http://', 'https://')) or os.path.isabs(source) or not self.base_dir:
+            return source
+        return os.path.join(self.base_dir, source)
+
+    def _upload(self, source):
+        import cloudinary.uploader
+
+        result = cloudinary.uploader.upload(
+            self._resolve(source),
+            folder=self.folder,
+            resource_type='image',
+            use_filename=True,
+            unique_filename=False,
+            overwrite=False,
+        )
+        return result.get('secure_url')
+
+    def upload_many(self, sources):
+        """Upload các nguồn chưa có URL (tối đa `workers` luồng cùng lúc)"""
+        pending = sorted({
+            s for s in sources
+            if self.needs_upload(s) and s not in self.uploaded and s not in self.failed
+        })
+        if not pending:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {source: pool.submit(self._upload, source) for source in pending}
+            for source, future in futures.items():
+                try:
+                    url = future.result()
+                    if url:
+                        self.uploaded[source] = url
+                    else:
+                        self.failed[source] = 'empty url'
+                except Exception as e:
+                    self.failed[source] = str(e)
+
+    def url_for(self, source):
+        return self.uploaded.get(source, source)
+
 
 class ProductImporter:
-    """Class xử lý import sản phẩm"""
+    """Class xử lý import sản phẩm (bulk)"""
 
-    def __init__(self, json_file=None):
-        self.app = create_app()
+    def __init__(self, json_file=None, chunk_size=500, dry_run=False, show_diff=False,
+                 upload_images=False, workers=4, app=None):
+        self.app = app or create_app()
         self.json_file = json_file or PRODUCTS_JSON
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.show_diff = show_diff
+        self.uploader = ImageUploader(
+            workers=workers, base_dir=os.path.dirname(os.path.abspath(self.json_file))
+        ) if upload_images else None
         self.stats = {
             'categories_created': 0,
             'categories_updated': 0,
+            'categories_unchanged': 0,
             'products_created': 0,
             'products_updated': 0,
+            'products_unchanged': 0,
+            'images_uploaded': 0,
             'errors': 0,
             'skipped': 0
         }
         self.categories_map = {}
-
-    def load_json_data(self):
-        """Đọc dữ liệu từ file JSON"""
-        if not os.path.exists(self.json_file):
-            print(f"❌ Không tìm thấy file: {self.json_file}")
-            return None
+        self.diff_lines = []
+
+    # ==================== DIFF ====================
+    def _diff(self, kind, slug, old, new, fields):
+        """So sánh 1 dòng với DB → 'created' | 'updated' | 'unchanged'"""
+        if old is None:
+            if self.show_diff:
+                self.diff_lines.append(f"  + {kind} {slug}")
+            return 'created'
+
+        changed = [f for f in fields if old.get(f) != new.get(f)]
+        if not changed:
+            return 'unchanged'
+        if self.show_diff:
+            for field in changed:
+                self.diff_lines.append(f"  ~ {kind} {slug}.{field}: {old.get(field)!r} → {new.get(field)!r}")
+        return 'updated'
+
+    @staticmethod
+    def _load_existing(model, fields, slugs):
+        """Giá trị hiện tại trong DB của các slug trong lô (1 query IN)"""
+        if not slugs:
+            return {}
+        columns = [model.slug] + [getattr(model, f) for f in fields]
+        rows = db.session.query(*columns).filter(model.slug.in_(slugs)).all()
+        return {row[0]: dict(zip(fields, row[1:])) for row in rows}
+
+    def _apply_chunk(self, kind, model, rows, fields, existing_slugs):
+        """Diff + ghi 1 lô (bỏ các dòng không đổi). Trả về số dòng đã ghi."""
+        table = model.__table__
+        current = self._load_existing(model, fields, [r['slug'] for r in rows])
+
+        to_write = []
+        for row in rows:
+            status = self._diff(kind, row['slug'], current.get(row['slug']), row, fields)
+            self.stats[f'{kind}_{status}'] += 1
+            if status != 'unchanged':
+                to_write.append(row)
+
+        if self.dry_run or not to_write:
+            return 0
+
+        update_fields = list(fields)
+        if 'updated_at' in table.c:
+            update_fields.append('updated_at')
+            now = datetime.utcnow()
+            for row in to_write:
+                row['updated_at'] = now
 
         try:
-            with open(self.json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            print("\n" + "=" * 70)
-            print("📦 THÔNG TIN FILE DỮ LIỆU")
-            print("=" * 70)
-            print(f"📄 File: {os.path.basename(self.json_file)}")
-            print(f"📊 Version: {data.get('version', 'N/A')}")
-            print(f"📅 Cập nhật: {data.get('last_updated', 'N/A')}")
-            print(f"📦 Tổng sản phẩm: {data.get('total_products', 0)}")
-            print(f"📂 Tổng danh mục: {len(data.get('categories', []))}")
-            print("=" * 70 + "\n")
-
-            return data
-
-        except json.JSONDecodeError as e:
-            print(f"❌ Lỗi đọc JSON tại dòng {e.lineno}: {e.msg}")
-            return None
+            bulk_upsert(table, to_write, existing_slugs, update_fields)
+            db.session.commit()
         except Exception as e:
-            print(f"❌ Lỗi: {e}")
-            return None
-
-    def import_categories(self, categories_data):
-        """Import danh mục sản phẩm"""
-        if not categories_data:
-            print("⚠️  Không có danh mục nào để import")
-            return {}
-
-        print("\n" + "=" * 70)
-        print("📂 IMPORT DANH MỤC SẢN PHẨM")
-        print("=" * 70)
-
-        with self.app.app_context():
-            for idx, cat_data in enumerate(categories_data, 1):
-                try:
-                    cat_name = cat_data.get('name')
-                    if not cat_name:
-                        print(f"⚠️  [{idx}] Bỏ qua: Thiếu tên danh mục")
-                        self.stats['skipped'] += 1
-                        continue
-
-                    cat_slug = cat_data.get('slug') or slugify(cat_name)
-
-                    # Tìm hoặc tạo mới category
-                    category = Category.query.filter_by(slug=cat_slug).first()
-
-                    if category:
-                        # Cập nhật
-                        category.name = cat_name
-                        category.description = cat_data.get('description', '')
-                        category.image = cat_data.get('image')
-                        # ❌ REMOVED: meta_description (không có trong Category model)
-
-                        print(f"📝 [{idx}] Cập nhật: {cat_name}")
-                        self.stats['categories_updated'] += 1
-                    else:
-                        # Tạo mới
-                        category = Category(
-                            name=cat_name,
-                            slug=cat_slug,
-                            description=cat_data.get('description', ''),
-                            image=cat_data.get('image'),
-                            # ❌ REMOVED: meta_description (không có trong Category model)
-                            is_active=True
-                        )
-                        db.session.add(category)
-                        db.session.flush()  # Để lấy ID
+            db.session.rollback()
+            print(f"❌ Lỗi ghi lô {kind} ({len(to_write)} dòng): {e}")
+            self.stats['errors'] += len(to_write)
+            return 0
 
-                        print(f"✅ [{idx}] Tạo mới: {cat_name} (ID: {category.id})")
-                        self.stats['categories_created'] += 1
+        existing_slugs.update(row['slug'] for row in to_write)
+        return len(to_write)
 
-                    # Lưu vào map
-                    self.categories_map[cat_name] = category.id
-
-
-                except Exception as e:
-                    print(f"❌ [{idx}] Lỗi: {cat_data.get('name', 'Unknown')} - {str(e)}")
-                    self.stats['errors'] += 1
-                    db.session.rollback()
+    # ==================== CATEGORIES ====================
+    def import_categories(self, categories_data):
+        """Import danh mục sản phẩm (theo lô)"""
+        print("\n📂 IMPORT DANH MỤC SẢN PHẨM")
+
+        existing_slugs = {slug for (slug,) in db.session.query(Category.slug)}
+        seen = set()
+
+        for chunk in chunked(categories_data, self.chunk_size):
+            rows = []
+            for cat_data in chunk:
+                cat_name = cat_data.get('name')
+                if not cat_name:
+                    self.stats['skipped'] += 1
                     continue
-
-            # Commit categories
-            try:
-                db.session.commit()
-                print(f"\n💾 Đã lưu {len(self.categories_map)} danh mục vào database")
-            except Exception as e:
-                print(f"\n❌ Lỗi commit categories: {e}")
-                db.session.rollback()
-                return {}
+                cat_slug = cat_data.get('slug') or slugify(cat_name)
+                if cat_slug in seen:
+                    self.stats['skipped'] += 1
+                    continue
+                seen.add(cat_slug)
+                rows.append({
+                    'name': cat_name,
+                    'slug': cat_slug,
+                    'description': cat_data.get('description', ''),
+                    'image': cat_data.get('image'),
+                    'is_active': True,
+                })
+            self._apply_chunk('categories', Category, rows, CATEGORY_FIELDS, existing_slugs)
+
+        # Map tên/slug → id (gồm cả danh mục đã có sẵn trong DB): 1 query
+        for cat_id, name, slug in db.session.query(Category.id, Category.name, Category.slug):
+            self.categories_map[name] = cat_id
+            self.categories_map[slug] = cat_id
+
+        # Dry-run: danh mục mới chưa có id → dùng slug làm id tạm để vẫn diff được sản phẩm
+        if self.dry_run:
+            for slug in seen - existing_slugs:
+                self.categories_map.setdefault(slug, f'<new:{slug}>')
 
         return self.categories_map
 
+    # ==================== PRODUCTS ====================
     def import_products(self, products_data):
-        """Import sản phẩm"""
-        if not products_data:
-            print("\n⚠️  Không có sản phẩm nào để import")
-            return
-
-        print("\n" + "=" * 70)
-        print("🧱 IMPORT SẢN PHẨM")
-        print("=" * 70)
-
-        with self.app.app_context():
-            for idx, prod_data in enumerate(products_data, 1):
-                try:
-                    prod_name = prod_data.get('name')
-                    if not prod_name:
-                        print(f"⚠️  [{idx}] Bỏ qua: Thiếu tên sản phẩm")
-                        self.stats['skipped'] += 1
-                        continue
-
-                    # Lấy category_id thay vì đối tượng category
-                    cat_name = prod_data.get('category')
-                    if cat_name not in self.categories_map:
-                        print(f"⚠️  [{idx}] Bỏ qua {prod_name}: Không tìm thấy danh mục '{cat_name}'")
-                        self.stats['skipped'] += 1
-                        continue
-
-                    category_id = self.categories_map[cat_name]
-                    prod_slug = prod_data.get('slug') or slugify(prod_name)
-
-                    # Tìm hoặc tạo mới product
-                    product = Product.query.filter_by(slug=prod_slug).first()
-
-                    if product:
-                        # Cập nhật
-                        product.name = prod_name
-                        product.description = prod_data.get('description', '')
-                        product.category_id = category_id
-                        product.image = prod_data.get('image')
-                        product.price = prod_data.get('price', 0)
-                        product.old_price = prod_data.get('old_price')
-                        product.is_featured = prod_data.get('is_featured', False)
-
-                        # Thông tin kỹ thuật
-                        product.composition = prod_data.get('composition')
-                        product.production = prod_data.get('production')
-                        product.application = prod_data.get('application')
-                        product.expiry = prod_data.get('expiry')
-                        product.packaging = prod_data.get('packaging')
-                        product.colors = prod_data.get('colors')
-                        product.technical_specs = prod_data.get('technical_specs')
-                        product.standards = prod_data.get('standards')
-
-                        # ❌ REMOVED: brand (không có trong Product model)
-                        # ❌ REMOVED: meta_description (không có trong Product model)
-                        # ❌ REMOVED: meta_keywords (không có trong Product model)
-
-                        product.updated_at = datetime.utcnow()
-
-                        print(f"📝 [{idx}] Cập nhật: {prod_name}")
-                        self.stats['products_updated'] += 1
+        """Import sản phẩm theo lô"""
+        print("\n🧱 IMPORT SẢN PHẨM")
+
+        existing_slugs = {slug for (slug,) in db.session.query(Product.slug)}
+        seen = set()
+        processed = 0
+        started = time.perf_counter()
+
+        for chunk in chunked(products_data, self.chunk_size):
+            if self.uploader is not None and not self.dry_run:
+                before = len(self.uploader.uploaded)
+                self.uploader.upload_many(p.get('image') for p in chunk)
+                self.stats['images_uploaded'] += len(self.uploader.uploaded) - before
+
+            rows = []
+            for prod_data in chunk:
+                prod_name = prod_data.get('name')
+                if not prod_name:
+                    self.stats['skipped'] += 1
+                    continue
 
-                    else:
-                        # Tạo mới
-                        product = Product(
-                            name=prod_name,
-                            slug=prod_slug,
-                            description=prod_data.get('description', ''),
-                            category_id=category_id,
-                            image=prod_data.get('image'),
-                            price=prod_data.get('price', 0),
-                            old_price=prod_data.get('old_price'),
-                            is_featured=prod_data.get('is_featured', True),
-                            is_active=True,
-
-                            # Thông tin kỹ thuật
-                            composition=prod_data.get('composition'),
-                            production=prod_data.get('production'),
-                            application=prod_data.get('application'),
-                            expiry=prod_data.get('expiry'),
-                            packaging=prod_data.get('packaging'),
-                            colors=prod_data.get('colors'),
-                            technical_specs=prod_data.get('technical_specs'),
-                            standards=prod_data.get('standards'),
-
-                            # ❌ REMOVED: brand (không có trong Product model)
-                            # ❌ REMOVED: meta_description (không có trong Product model)
-                            # ❌ REMOVED: meta_keywords (không có trong Product model)
-                        )
-                        db.session.add(product)
-
-                        print(f"✅ [{idx}] Tạo mới: {prod_name}")
-                        self.stats['products_created'] += 1
-
-                    # Commit từng sản phẩm để tránh rollback toàn bộ khi lỗi
-                    db.session.commit()
+                cat_name = prod_data.get('category')
+                category_id = self.categories_map.get(cat_name) or self.categories_map.get(slugify(cat_name or ''))
+                if category_id is None:
+                    self.stats['skipped'] += 1
+                    continue
 
-                except Exception as e:
-                    print(f"❌ [{idx}] Lỗi: {prod_data.get('name', 'Unknown')} - {str(e)}")
-                    self.stats['errors'] += 1
-                    db.session.rollback()
+                prod_slug = prod_data.get('slug') or slugify(prod_name)
+                if prod_slug in seen:
+                    self.stats['skipped'] += 1
                     continue
+                seen.add(prod_slug)
+
+                image = prod_data.get('image')
+                if self.uploader is not None:
+                    image = self.uploader.url_for(image)
+
+                is_new = prod_slug not in existing_slugs
+                rows.append({
+                    'name': prod_name,
+                    'slug': prod_slug,
+                    'description': prod_data.get('description', ''),
+                    'category_id': category_id,
+                    'image': image,
+                    'price': prod_data.get('price', 0),
+                    'old_price': prod_data.get('old_price'),
+                    'is_featured': prod_data.get('is_featured', is_new),
+                    'is_active': True,
+                    'composition': prod_data.get('composition'),
+                    'production': prod_data.get('production'),
+                    'application': prod_data.get('application'),
+                    'expiry': prod_data.get('expiry'),
+                    'packaging': prod_data.get('packaging'),
+                    'colors': prod_data.get('colors'),
+                    'technical_specs': prod_data.get('technical_specs'),
+                    'standards': prod_data.get('standards'),
+                })
+
+            self._apply_chunk('products', Product, rows, PRODUCT_FIELDS, existing_slugs)
+            processed += len(chunk)
+            print(f"   … {processed} sản phẩm ({time.perf_counter() - started:.1f}s)")
 
     def print_summary(self):
         """In tổng kết"""
+        if self.diff_lines:
+            print("\n" + "=" * 70)
+            print("🔍 THAY ĐỔI")
+            print("=" * 70)
+            print("\n".join(self.diff_lines))
+
         print("\n" + "=" * 70)
-        print("📊 TỔNG KẾT IMPORT")
+        print("📊 TỔNG KẾT IMPORT" + (" (DRY-RUN - KHÔNG GHI DB)" if self.dry_run else ""))
         print("=" * 70)
         print(f"📂 Danh mục:")
         print(f"   ✅ Tạo mới:    {self.stats['categories_created']}")
         print(f"   📝 Cập nhật:   {self.stats['categories_updated']}")
+        print(f"   ➖ Không đổi:  {self.stats['categories_unchanged']}")
         print(f"\n🧱 Sản phẩm:")
         print(f"   ✅ Tạo mới:    {self.stats['products_created']}")
         print(f"   📝 Cập nhật:   {self.stats['products_updated']}")
+        print(f"   ➖ Không đổi:  {self.stats['products_unchanged']}")
+        if self.uploader is not None:
+            print(f"\n🖼️  Ảnh upload:  {self.stats['images_uploaded']} (lỗi: {len(self.uploader.failed)})")
+            for source, error in list(self.uploader.failed.items())[:20]:
+                print(f"   ❌ {source}: {error}")
         print(f"\n⚠️  Bỏ qua:      {self.stats['skipped']}")
         print(f"❌ Lỗi:         {self.stats['errors']}")
         print("=" * 70)
 
-        total_success = (
-                self.stats['categories_created'] +
-                self.stats['categories_updated'] +
-                self.stats['products_created'] +
-                self.stats['products_updated']
-        )
-
-        if total_success > 0:
-            print(f"\n🎉 Hoàn tất! Đã xử lý thành công {total_success} mục")
-
         if self.stats['errors'] > 0:
             print(f"⚠️  Có {self.stats['errors']} lỗi trong quá trình import")
 
-    def run(self):
+    def run(self, assume_yes=False):
         """Chạy toàn bộ quá trình import"""
         print("\n" + "🚀 " * 35)
         print("   BRICON - IMPORT SẢN PHẨM TỪ JSON")
         print("🚀 " * 35)
 
-        # Load dữ liệu
-        data = self.load_json_data()
-        if not data:
-            print("\n❌ Không thể đọc dữ liệu. Dừng import.")
+        if not os.path.exists(self.json_file):
+            print(f"❌ Không tìm thấy file: {self.json_file}")
             return False
 
-        # Xác nhận
-        print("\n⚠️  Bạn có chắc muốn import dữ liệu?")
-        print("   (Dữ liệu cũ sẽ được CẬP NHẬT nếu trùng slug)")
-        confirm = input("\n👉 Nhập 'yes' để tiếp tục: ").strip().lower()
+        size_kb = os.path.getsize(self.json_file) // 1024
+        print(f"📄 File: {os.path.basename(self.json_file)} ({size_kb} KB) | lô: {self.chunk_size}")
 
-        if confirm != 'yes':
-            print("\n❌ Đã hủy import")
-            return False
+        if not self.dry_run and not assume_yes:
+            print("\n⚠️  Bạn có chắc muốn import dữ liệu?")
+            print("   (Dữ liệu cũ sẽ được CẬP NHẬT nếu trùng slug)")
+            confirm = input("\n👉 Nhập 'yes' để tiếp tục: ").strip().lower()
+            if confirm != 'yes':
+                print("\n❌ Đã hủy import")
+                return False
 
-        # Import categories
-        categories = data.get('categories', [])
-        self.import_categories(categories)
+        started = time.perf_counter()
+        try:
+            with self.app.app_context():
+                self.import_categories(iter_section(self.json_file, 'categories'))
 
-        if not self.categories_map:
-            print("\n❌ Không có danh mục nào được import. Dừng import sản phẩm.")
-            return False
+                if not self.categories_map:
+                    print("\n❌ Không có danh mục nào. Dừng import sản phẩm.")
+                    return False
 
-        # Import products
-        products = data.get('products', [])
-        self.import_products(products)
+                self.import_products(iter_section(self.json_file, 'products'))
+
+                # Ghi bằng Core upsert → không có event ORM: tự xoá cache + tính lại related
+                if not self.dry_run:
+                    cache.clear_all()
+                    related.rebuild(('product',))
+        except (ValueError, OSError) as e:
+            print(f"❌ Lỗi đọc JSON: {e}")
+            return False
 
-        # Tổng kết
         self.print_summary()
+        print(f"⏱️  {time.perf_counter() - started:.2f}s")
+        return self.stats['errors'] == 0
+
 
-        return True
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Import sản phẩm/danh mục BRICON từ JSON')
+    parser.add_argument('json_file', nargs='?', default=PRODUCTS_JSON, help='File JSON (mặc định: sanpham.json)')
+    parser.add_argument('--chunk-size', type=int, default=500, help='Số dòng mỗi lô ghi DB')
+    parser.add_argument('--dry-run', action='store_true', help='Chỉ so sánh với DB, không ghi')
+    parser.add_argument('--diff', action='store_true', help='In chi tiết từng trường thay đổi')
+    parser.add_argument('--yes', '-y', action='store_true', help='Không hỏi xác nhận')
+    parser.add_argument('--upload-images', action='store_true', help='Upload ảnh chưa nằm trên Cloudinary')
+    parser.add_argument('--workers', type=int, default=4, help='Số luồng upload ảnh đồng thời')
+    return parser.parse_args(argv)
 
 
-def main():
+def main(argv=None):
     """Hàm chính"""
+    args = parse_args(argv)
     try:
-        importer = ProductImporter()
-        success = importer.run()
+        importer = ProductImporter(
+            json_file=args.json_file,
+            chunk_size=args.chunk_size,
+            dry_run=args.dry_run,
+            show_diff=args.diff,
+            upload_images=args.upload_images,
+            workers=args.workers,
+        )
+        success = importer.run(assume_yes=args.yes)
         sys.exit(0 if success else 1)
 
     except KeyboardInterrupt:
@@ -328,4 +474,4 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,290 @@
+"""
+Detail Cache - Cache đọc xuyên (read-through) cho trang chi tiết
+
+product_detail / blog_detail / project_detail / job_detail trước đây mỗi
+lượt xem đều query theo slug + query danh sách liên quan (+ join category,
++ tra Media để lấy SEO ảnh). Giờ:
+
+- Dữ liệu trang được chụp thành Snapshot chỉ đọc (cột + category + SEO ảnh
+  đã tính sẵn) lưu trong LRU giới hạn theo bytes ('detail'), key (kind, id)
+- Index slug → id riêng ('detail_slug'): URL vào bằng slug, cache theo id
+  nên sửa bài chỉ cần xoá đúng 1 key
+- Danh sách liên quan: id lấy từ related index tính sẵn (app/related.py),
+  thẻ item cache theo id; item chưa có trong index thì fallback danh sách
+  theo nhóm (cùng category / cùng loại dự án...) cache chung cho cả nhóm
+- after_insert/after_update/after_delete của model (và Category, Media) xoá
+  key tương ứng sau khi commit
+
+Lượt xem vẫn cộng thẳng vào DB bằng 1 câu UPDATE (không qua ORM flush nên
+không làm mất cache); số lượt xem hiển thị có thể trễ tối đa DETAIL_CACHE_TTL.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import joinedload, object_session
+
+from app import cache, db, shared_cache
+from app.models import Product, Category, Blog, Project, Job, Media
+from app.related import related_ids
+
+_details = cache.lru_namespace('detail', max_bytes=8 * 1024 * 1024, ttl=600)
+_slug_index = cache.namespace('detail_slug')
+
+# Số item liên quan hiển thị mỗi trang (cache thêm 1 để loại trừ chính nó)
+RELATED_LIMITS = {'product': 4, 'blog': 3, 'project': 2, 'job': 5}
+_MODELS = {'product': Product, 'blog': Blog, 'project': Project, 'job': Job}
+
+
+def init_app(app):
+    """Đọc giới hạn bộ nhớ / TTL từ config"""
+    _details.max_bytes = app.config.get('DETAIL_CACHE_MAX_BYTES', _details.max_bytes)
+    _details.ttl = app.config.get('DETAIL_CACHE_TTL', _details.ttl)
+
+
+# ==================== SNAPSHOT CHỈ ĐỌC ====================
+class FrozenDict(dict):
+    """dict không sửa được (picklable, khác MappingProxyType)"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('Snapshot chỉ đọc')
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return FrozenDict((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class Snapshot:
+    """Bản chụp 1 bản ghi cho template: đọc thuộc tính như model, không ghi được"""
+
+    __slots__ = ('_data',)
+
+    def __init__(self, data):
+        object.__setattr__(self, '_data', FrozenDict(data))
+
+    def __getattr__(self, name):
+        if name.startswith('__') or name == '_data':
+            raise AttributeError(name)
+        try:
+            return self._data[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Snapshot chỉ đọc')
+
+    def __reduce__(self):
+        return Snapshot, (dict(self._data),)
+
+    def get_media_seo_info(self):
+        return self._data.get('media_seo')
+
+    def is_expired(self):
+        deadline = self._data.get('deadline')
+        return bool(deadline) and datetime.utcnow() > deadline
+
+
+def snapshot_of(obj, fields=None):
+    """ORM object → Snapshot (tất cả cột hoặc chỉ `fields`) + SEO ảnh tính sẵn"""
+    columns = fields or [attr.key for attr in inspect(obj).mapper.column_attrs]
+    data = {name: _freeze(getattr(obj, name)) for name in columns}
+    if hasattr(obj, 'get_media_seo_info'):
+        data['media_seo'] = obj.get_media_seo_info()
+    return Snapshot(data)
+
+
+# ==================== LOADERS ====================
+def _load_product(slug):
+    product = Product.query.options(joinedload(Product.category)).filter_by(slug=slug, is_active=True).first()
+    if product is None:
+        return None
+    snapshot = snapshot_of(product)
+    category = None
+    if product.category is not None:
+        category = Snapshot({'id': product.category.id, 'name': product.category.name, 'slug': product.category.slug})
+    return Snapshot(dict(snapshot._data, category=category))
+
+
+def _load_by_slug(model):
+    def load(slug):
+        obj = model.query.filter_by(slug=slug, is_active=True).first()
+        return snapshot_of(obj) if obj is not None else None
+    return load
+
+
+_LOADERS = {
+    'product': _load_product,
+    'blog': _load_by_slug(Blog),
+    'project': _load_by_slug(Project),
+    'job': _load_by_slug(Job),
+}
+
+
+def get_detail(kind, slug):
+    """
+    Snapshot trang chi tiết theo slug (None nếu không có / đã ẩn)
+    Hit: 0 query. Miss: 1 query (+ tra Media cho SEO ảnh) rồi lưu cache.
+    """
+    if shared_cache.enabled():
+        item_id = shared_cache.get('slugs', f'{kind}:{slug}')  # index slug dùng chung giữa worker
+    else:
+        item_id = _slug_index.get((kind, slug))
+    if item_id is not None:
+        snapshot = _details.get((kind, item_id))
+        # slug cũ vẫn còn trong index sau khi đổi slug → kiểm tra lại
+        if snapshot is not None and snapshot.slug == slug:
+            return snapshot
+
+    snapshot = _LOADERS[kind](slug)
+    if snapshot is None:
+        return None
+    if not shared_cache.enabled():
+        _slug_index.set((kind, slug), snapshot.id)
+    return _details.set((kind, snapshot.id), snapshot)
+
+
+# ==================== DANH SÁCH LIÊN QUAN ====================
+# Cột cần cho thẻ item liên quan trên trang chi tiết
+CARD_FIELDS = {
+    'product': ('id', 'slug', 'name', 'image', 'price', 'old_price'),
+    'blog': ('id', 'slug', 'title', 'image', 'created_at'),
+    'project': ('id', 'slug', 'title', 'image', 'location'),
+    'job': ('id', 'slug', 'title', 'location', 'is_urgent'),
+}
+
+
+def _cards(kind, ids):
+    """Snapshot thẻ của các id (giữ thứ tự); thiếu thì nạp 1 query IN rồi cache theo id"""
+    cards = {item_id: _details.get((f'{kind}_card', item_id)) for item_id in ids}
+    missing = [item_id for item_id, card in cards.items() if card is None]
+    if missing:
+        model = _MODELS[kind]
+        for obj in model.query.filter(model.id.in_(missing), model.is_active == True):  # noqa: E712
+            cards[obj.id] = _details.set((f'{kind}_card', obj.id), snapshot_of(obj, CARD_FIELDS[kind]))
+    return [cards[item_id] for item_id in ids if cards[item_id] is not None]
+
+
+def _fallback_query(kind, group):
+    """Danh sách cũ (cùng danh mục / mới nhất...) khi item chưa có trong related index"""
+    limit = RELATED_LIMITS[kind] + 1
+    if kind == 'product':
+        return Product.query.filter(
+            Product.category_id == group, Product.is_active == True  # noqa: E712
+        ).order_by(Product.id).limit(limit)
+    if kind == 'blog':
+        return Blog.query.filter(Blog.is_active == True).order_by(  # noqa: E712
+            Blog.created_at.desc()
+        ).limit(limit)
+    if kind == 'project':
+        return Project.query.filter(
+            Project.project_type == group, Project.is_active == True  # noqa: E712
+        ).order_by(Project.id).limit(limit)
+    return Job.query.filter(Job.is_active == True).order_by(  # noqa: E712
+        Job.is_urgent.desc(), Job.id
+    ).limit(limit)
+
+
+def _group_of(kind, snapshot):
+    if kind == 'product':
+        return snapshot.category_id
+    if kind == 'project':
+        return snapshot.project_type
+    return None
+
+
+def get_related(kind, snapshot):
+    """
+    Item liên quan của 1 trang (không gồm chính nó):
+    ưu tiên top-N tính sẵn (app/related.py, tra dict O(1)), chưa có thì
+    dùng danh sách theo nhóm (cache chung cho cả nhóm)
+    """
+    limit = RELATED_LIMITS[kind]
+    ids = related_ids(kind, snapshot.id)
+    if ids:
+        items = _cards(kind, ids[:limit + 2])  # dư 2 phòng item vừa bị ẩn
+        if items:
+            return items[:limit]
+
+    group = _group_of(kind, snapshot)
+
+    def load():
+        return tuple(snapshot_of(obj, CARD_FIELDS[kind]) for obj in _fallback_query(kind, group))
+
+    items = _details.get_or_set((f'{kind}_related', group), load)
+    return [item for item in items if item.id != snapshot.id][:limit]
+
+
+# ==================== LƯỢT XEM ====================
+_VIEW_COLUMNS = {
+    'product': Product.views,
+    'blog': Blog.views,
+    'project': Project.view_count,
+    'job': Job.view_count,
+}
+
+
+def increment_views(kind, item_id):
+    """UPDATE ... SET views = views + 1 (bulk update → không kích hoạt after_update)"""
+    model, column = _MODELS[kind], _VIEW_COLUMNS[kind]
+    model.query.filter(model.id == item_id).update(
+        {column: column + 1}, synchronize_session=False
+    )
+    db.session.commit()
+
+
+# ==================== AUTO INVALIDATE ====================
+def _history_values(target, attr):
+    """Giá trị hiện tại + giá trị cũ (nếu vừa đổi) của 1 thuộc tính"""
+    history = inspect(target).attrs[attr].history
+    values = {getattr(target, attr)}
+    values.update(history.deleted or ())
+    return values
+
+
+def _invalidate(session, kind, target, group_attr=None):
+    cache.invalidate_after_commit(session, 'detail', (kind, target.id))
+    cache.invalidate_after_commit(session, 'detail', (f'{kind}_card', target.id))
+    groups = _history_values(target, group_attr) if group_attr else {None}
+    for group in groups:
+        cache.invalidate_after_commit(session, 'detail', (f'{kind}_related', group))
+
+
+def _listener(kind, group_attr=None):
+    def handler(mapper, connection, target):
+        session = object_session(target)
+        if session is not None:
+            _invalidate(session, kind, target, group_attr)
+    return handler
+
+
+for _model, _kind, _group_attr in (
+    (Product, 'product', 'category_id'),
+    (Blog, 'blog', None),
+    (Project, 'project', 'project_type'),
+    (Job, 'job', None),
+):
+    _handler = _listener(_kind, _group_attr)
+    for _event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event_name, _handler)
+
+
+def _invalidate_all(mapper, connection, target):
+    """Category (tên/slug nhúng trong trang sản phẩm), Media (SEO ảnh) đổi → xoá hết"""
+    session = object_session(target)
+    if session is not None:
+        cache.invalidate_after_commit(session, 'detail')
+
+
+for _model in (Category, Media):
+    for _event_name in ('after_update', 'after_delete'):
+        event.listen(_model, _event_name, _invalidate_all)
+event.listen(Media, 'after_insert', _invalidate_all)
@@ -0,0 +1,123 @@
+"""
+Fragment Cache - Cache HTML từng đoạn template (header, footer, widget...)
+
+base.html render top bar, menu, footer, social links ở mọi trang: vài chục
+lần get_setting + url_for, giống hệt nhau cho mọi request. Tag {% cache %}
+lưu HTML đã render của đoạn đó trong LRU in-process (namespace 'fragments',
+giới hạn FRAGMENT_CACHE_MAX_BYTES):
+
+    {% cache 'header', request.endpoint %}
+      ... HTML chỉ phụ thuộc settings / danh mục + các tham số key ...
+    {% endcache %}
+
+- Key = tên + các tham số + version của DEPENDS ('settings', 'categories'):
+  namespace đó bị xoá (sau commit, hoặc worker khác báo qua cache bus) →
+  version tăng → lần render sau dùng key mới, bản cũ tự bị LRU đẩy ra
+- TTL (FRAGMENT_CACHE_TTL) bằng TTL cache settings: không có bus thì đoạn
+  HTML cũng không cũ lâu hơn settings
+- Mọi thứ khác đoạn HTML phụ thuộc (request.endpoint, user, dữ liệu trang...)
+  phải nằm trong tham số key - không đặt {% block %} / flash message bên trong
+- Hit rate theo từng fragment: stats() (/admin/cache/stats)
+
+Tắt (FRAGMENT_CACHE_ENABLED=0 hoặc debug): tag chỉ render body như thường.
+"""
+
+import sys
+import threading
+from collections import Counter
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from app import cache
+
+DEPENDS = ('settings', 'categories')
+
+_versions = Counter()
+_hits = Counter()
+_misses = Counter()
+_lock = threading.Lock()
+_fragments = None
+_enabled = False
+
+
+def _on_invalidated(names):
+    with _lock:
+        for name in names:
+            if name in DEPENDS:
+                _versions[name] += 1
+
+
+def versions():
+    return tuple(_versions[name] for name in DEPENDS)
+
+
+# ==================== JINJA EXTENSION ====================
+class FragmentCacheExtension(Extension):
+    """{% cache 'tên', key1, key2... %}body{% endcache %}"""
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_render', [nodes.List(args)]), [], [], body
+        ).set_lineno(lineno)
+
+    def _render(self, parts, caller):
+        if not _enabled:
+            return caller()
+
+        name = parts[0]
+        rendered = []
+
+        def load():
+            rendered.append(True)
+            return str(caller())
+
+        html = _fragments.get_or_set((tuple(map(_hashable, parts)), versions()), load)
+        with _lock:
+            (_misses if rendered else _hits)[name] += 1
+        return Markup(html)
+
+
+def _hashable(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(item) for item in value)
+    return value
+
+
+# ==================== API ====================
+def init_app(app):
+    """Đăng ký tag {% cache %} (luôn có để template parse được, kể cả khi tắt)"""
+    global _fragments, _enabled
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    _enabled = app.config.get('FRAGMENT_CACHE_ENABLED', True) and not app.debug
+    _fragments = cache.lru_namespace(
+        'fragments', max_bytes=app.config.get('FRAGMENT_CACHE_MAX_BYTES', 1024 * 1024),
+        ttl=app.config.get('FRAGMENT_CACHE_TTL', 300), sizeof=sys.getsizeof
+    )
+    cache.subscribe(_on_invalidated)
+
+
+def stats():
+    """Hit / miss / hit_rate theo từng fragment của worker hiện tại"""
+    with _lock:
+        names = sorted(set(_hits) | set(_misses))
+        return {
+            'enabled': _enabled,
+            'versions': dict(zip(DEPENDS, versions())),
+            'fragments': {
+                name: {
+                    'hits': _hits[name],
+                    'misses': _misses[name],
+                    'hit_rate': round(_hits[name] / (_hits[name] + _misses[name]), 3),
+                }
+                for name in names
+            },
+        }
@@ -4,6 +4,7 @@ from app.models import Product, Category, Banner, Blog, FAQ, Contact, Project, J
 from app.forms import ContactForm
 from sqlalchemy import or_
 from app.project_config import PROJECT_TYPES
+from app.detail_cache import get_detail, get_related, increment_views
 from jinja2 import Template
 from sqlalchemy.orm import joinedload, load_only
 import os
@@ -152,20 +153,13 @@ from datetime import datetime, timedelta
 @main_bp.route('/san-pham/<slug>')
 def product_detail(slug):
     """Trang chi tiết sản phẩm với render động meta description"""
-    product = Product.query.options(joinedload(Product.category)) \
-        .filter_by(slug=slug, is_active=True).first_or_404()
+    product = get_detail('product', slug) or abort(404)
 
     # Tăng lượt xem
-    product.views += 1
-    db.session.commit()
-
-    # Lấy sản phẩm liên quan (cùng danh mục)
-    related_products = Product.query.options(joinedload(Product.category)) \
-        .filter(
-        Product.category_id == product.category_id,
-        Product.id != product.id,
-        Product.is_active == True
-    ).limit(4).all()
+    increment_views('product', product.id)
+
+    # Lấy sản phẩm liên quan (cùng danh mục) - cache theo danh mục
+    related_products = get_related('product', product)
 
     # ✅ XỬ LÝ META DESCRIPTION ĐỘNG
     rendered_meta_description = None
@@ -268,21 +262,13 @@ def blog():
 @main_bp.route('/tin-tuc/<slug>')
 def blog_detail(slug):
     """Trang chi tiết blog"""
-    blog = (Blog.query
-            .options(joinedload(Blog.author_obj))
-            .filter_by(slug=slug, is_active=True)
-            ).first_or_404()
+    blog = get_detail('blog', slug) or abort(404)
 
     # Tăng lượt xem
-    blog.views += 1
-    db.session.commit()
+    increment_views('blog', blog.id)
 
     # Bài viết liên quan
-    related_blogs = (Blog.query
-                     .options(load_only(Blog.slug, Blog.title, Blog.created_at, Blog.image))
-                     .filter(Blog.id != blog.id, Blog.is_active == True)
-                     .order_by(Blog.created_at.desc())
-                     ).limit(3).all()
+    related_blogs = get_related('blog', blog)
 
     return render_template('blog_detail.html',
                            blog=blog,
@@ -441,21 +427,13 @@ def projects():
 @main_bp.route('/du-an/<slug>')
 def project_detail(slug):
     """Trang chi tiết dự án"""
-    project = Project.query.filter_by(slug=slug, is_active=True).first_or_404()
+    project = get_detail('project', slug) or abort(404)
 
     # Tăng lượt xem
-    project.view_count += 1
-    db.session.commit()
-
-    # Dự án liên quan
-    related = (Project.query
-    .options(load_only(Project.slug, Project.title, Project.image, Project.location))
-    .filter(
-        Project.id != project.id,
-        Project.project_type == project.project_type,
-        Project.is_active == True
-    )
-    ).limit(2).all()
+    increment_views('project', project.id)
+
+    # Dự án liên quan (cùng loại dự án)
+    related = get_related('project', project)
 
     return render_template('project_detail.html',
                            project=project,
@@ -504,17 +482,13 @@ def careers():
 @main_bp.route('/tuyen-dung/<slug>')
 def job_detail(slug):
     """Trang chi tiết tuyển dụng"""
-    job = Job.query.filter_by(slug=slug, is_active=True).first_or_404()
+    job = get_detail('job', slug) or abort(404)
 
     # Tăng lượt xem
-    job.view_count += 1
-    db.session.commit()
+    increment_views('job', job.id)
 
     # Các vị trí khác
-    other_jobs = Job.query.filter(
-        Job.id != job.id,
-        Job.is_active == True
-    ).order_by(Job.is_urgent.desc()).limit(5).all()
+    other_jobs = get_related('job', job)
 
     return render_template('job_detail.html',
                            job=job,
@@ -3,7 +3,9 @@
 
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
-from app import db
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from app import cache, db, shared_cache
 from datetime import datetime
 
 
@@ -171,6 +173,17 @@ class Category(db.Model):
         return f'<Category {self.name}>'
 
 
+def _categories_changed(mapper, connection, target):
+    # Menu danh mục (app/__init__.py) - xoá ở mọi worker qua cache bus
+    session = object_session(target)
+    if session is not None:
+        cache.invalidate_after_commit(session, 'categories')
+
+
+for _event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Category, _event_name, _categories_changed)
+
+
 # ==================== PRODUCT MODEL ====================
 class Product(db.Model):
     """Model sản phẩm"""
@@ -805,14 +818,25 @@ class Settings(db.Model):
         return f'<Settings {self.key}: {self.value}>'
 
 # Helper function để get/set settings
+# Toàn bộ bảng settings (vài chục dòng) được nạp 1 query rồi cache theo process:
+# mỗi trang gọi get_setting hàng chục lần → 0 query thay vì N query
+_settings_cache = cache.namespace('settings', ttl=300, stale_ttl=60)
+
+
+def load_settings():
+    """{key: value} của toàn bộ settings - 1 query"""
+    return dict(db.session.query(Settings.key, Settings.value).all())
+
+
 def get_setting(key, default=None):
-    """Lấy giá trị setting từ DB"""
-    setting = Settings.query.filter_by(key=key).first()
-    return setting.value if setting else default
+    """Lấy giá trị setting (cache process-level, xoá sau commit khi có thay đổi)"""
+    if shared_cache.enabled():
+        return shared_cache.get('settings', key, default)  # mmap dùng chung giữa worker
+    return _settings_cache.get_or_set('all', load_settings).get(key, default)
 
 
-def set_setting(key, value, group='general', description=''):
-    """Lưu hoặc cập nhật setting"""
+def _normalize_setting_value(value, description=''):
+    """Đưa value về string (tuple từ save_upload_file → chỉ lấy URL)"""
 
     # ✅ BƯỚC 1: XỬ LÝ TUPLE TRƯỚC KHI GÁN (chỉ 1 lần duy nhất)
     if isinstance(value, tuple):
@@ -828,17 +852,101 @@ def set_setting(key, value, group='general', description=''):
     if not isinstance(value, str):
         value = str(value) if value is not None else ''
 
-    # ✅ BƯỚC 3: TÌM HOẶC TẠO SETTING
-    setting = Settings.query.filter_by(key=key).first()
+    return value, description
+
+
+def set_settings(items, commit=True):
+    """
+    Lưu nhiều setting trong 1 transaction
+
+    Args:
+        items: {key: (value, group, description)} - tuple 1-3 phần tử,
+               group mặc định 'general', description mặc định ''
+    Returns:
+        {key: Settings}
+
+    1 query IN nạp các key có sẵn, chỉ UPDATE dòng thực sự đổi, 1 commit
+    → cache settings chỉ bị xoá 1 lần sau commit.
+    """
+    if not items:
+        return {}
+
+    existing = {
+        setting.key: setting
+        for setting in Settings.query.filter(Settings.key.in_(list(items)))
+    }
+
+    result = {}
+    for key, spec in items.items():
+        value, group, description = spec + ('general', '')[len(spec) - 1:]
+        value, description = _normalize_setting_value(value, description)
+
+        setting = existing.get(key)
+        if setting is None:
+            setting = Settings(key=key, value=value, group=group, description=description)
+            db.session.add(setting)
+        elif (setting.value, setting.group, setting.description) != (value, group, description):
+            setting.value = value
+            setting.group = group
+            setting.description = description
+        result[key] = setting
+
+    if commit:
+        db.session.commit()
+    return result
 
-    if setting:
-        setting.value = value
-        setting.group = group
-        setting.description = description
-    else:
-        setting = Settings(key=key, value=value, group=group, description=description)
-        db.session.add(setting)
 
-    # ✅ BƯỚC 4: COMMIT
-    db.session.commit()
-    return setting
\ No newline at end of file
+def set_setting(key, value, group='general', description=''):
+    """Lưu hoặc cập nhật 1 setting (dùng set_settings khi lưu nhiều key)"""
+    return set_settings({key: (value, group, description)})[key]
+
+
+def _settings_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        cache.invalidate_after_commit(session, 'settings')
+
+
+for _event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Settings, _event_name, _settings_changed)
+
+
+# ==================== RATE LIMIT COUNTER ====================
+class RateLimitCounter(db.Model):
+    """Bộ đếm rate limit dùng chung giữa các worker (RATELIMIT_STORAGE_URL='database://')"""
+    __tablename__ = 'rate_limit_counters'
+
+    key = db.Column(db.String(255), primary_key=True)
+    window_start = db.Column(db.Integer, primary_key=True)  # epoch // window
+    count = db.Column(db.Integer, nullable=False, default=0)
+    expires_at = db.Column(db.Integer, nullable=False, index=True)  # epoch, dùng để dọn dẹp
+
+    def __repr__(self):
+        return f'<RateLimitCounter {self.key}@{self.window_start}: {self.count}>'
+
+
+# ==================== CACHE VERSIONS ====================
+class CacheVersion(db.Model):
+    """Phiên bản từng namespace cache - tăng khi 1 worker xoá cache (xem app/cache_bus.py)"""
+    __tablename__ = 'cache_versions'
+
+    namespace = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<CacheVersion {self.namespace}: {self.version}>'
+
+
+# ==================== RELATED ITEMS INDEX ====================
+class RelatedItem(db.Model):
+    """Top-N item liên quan đã tính sẵn (TF-IDF + cùng danh mục/loại) - xem app/related.py"""
+    __tablename__ = 'related_items'
+
+    kind = db.Column(db.String(20), primary_key=True)  # product | blog | project
+    item_id = db.Column(db.Integer, primary_key=True)
+    related_ids = db.Column(db.Text, nullable=False, default='')  # "12,7,33" theo thứ tự điểm giảm dần
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<RelatedItem {self.kind}#{self.item_id}: {self.related_ids}>'
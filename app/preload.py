@@ -0,0 +1,128 @@
+"""
+Preload - Warm-up ở master gunicorn trước khi fork (copy-on-write)
+
+preload_app=True: master import app rồi fork worker, các page bộ nhớ dùng
+chung cho tới khi bị ghi. Nhưng refcount + GC của Python ghi lên header của
+object → page bị copy dần sang từng worker (RSS worker tăng dần, phải dựa
+vào max_requests để recycle).
+
+warm_up(app) (gọi từ when_ready trong gunicorn.conf.py):
+1. Import toàn bộ module app.* (blueprint, form, model...) → worker không
+   import thêm sau khi fork
+2. Compile sẵn mọi Jinja template vào cache của jinja_env
+3. Ghi nhận mốc version của cache bus, rồi nạp sẵn cache đọc (settings,
+   danh mục menu, related index, company info) + ghi shared cache (mmap).
+   Worker fork sau này (max_requests) so version với mốc đó → cache kế thừa
+   đã cũ bị xoá ở lần poll đầu. Bus tắt thì không nạp related index (không
+   TTL, không có gì báo worker mới rằng bản kế thừa đã cũ)
+4. Đóng connection DB (worker không dùng chung socket của master)
+5. gc.collect() rồi gc.freeze(): object hiện có chuyển sang vùng permanent,
+   GC ở worker không duyệt (không ghi) lên chúng nữa
+
+Kiểm chứng: memory_report() (app/startup_profile.py) - log ở post_worker_init
+/ worker_exit và endpoint /admin/memory (shared vs private RSS mỗi worker).
+"""
+
+import gc
+import importlib
+import pkgutil
+import time
+
+import app as app_package
+from app import db
+
+# Script chạy tay (argparse, tạo app riêng) - không import lúc preload
+SKIP_MODULES = ('app.data.',)
+
+# Kết quả warm-up của master (worker kế thừa qua fork → xem ở /admin/memory)
+LAST_REPORT = {}
+
+
+def import_all():
+    """Import mọi module trong package app → (số module, {module: lỗi})"""
+    loaded, failed = 0, {}
+    for info in pkgutil.walk_packages(app_package.__path__, prefix='app.'):
+        if info.name.startswith(SKIP_MODULES):
+            continue
+        try:
+            importlib.import_module(info.name)
+            loaded += 1
+        except Exception as e:
+            failed[info.name] = str(e)
+    return loaded, failed
+
+
+def compile_templates(app):
+    """Compile mọi template .html vào cache của jinja_env → (số template, {template: lỗi})"""
+    env = app.jinja_env
+    compiled, failed = 0, {}
+    for name in env.list_templates(extensions=('html',)):
+        try:
+            env.get_template(name)
+            compiled += 1
+        except Exception as e:
+            failed[name] = str(e)
+    return compiled, failed
+
+
+def prime_caches(app):
+    """Nạp sẵn cache đọc nhiều; DB chưa sẵn sàng thì bỏ qua (worker tự nạp khi cần)"""
+    from app import active_categories, shared_cache
+    from app.cache_bus import bus
+    from app.chatbot.routes import load_company_info
+    from app.models import get_setting
+    from app.related import KINDS, related_ids
+
+    steps = [
+        ('settings', lambda: get_setting('site_name')),
+        ('categories', active_categories),
+        ('related', lambda: [related_ids(kind, 0) for kind in KINDS]),
+        ('company_info', load_company_info),
+    ]
+    primed, failed = [], {}
+    with app.app_context():
+        try:
+            bus_enabled = bus.mark_baseline()
+        except Exception as e:
+            bus_enabled = False
+            failed['cache_bus'] = str(e)
+        if not bus_enabled:
+            steps = [step for step in steps if step[0] != 'related']
+
+        for name, step in steps:
+            try:
+                step()
+                primed.append(name)
+            except Exception as e:
+                failed[name] = str(e)
+                db.session.rollback()
+        db.session.remove()
+
+    shared_cache.prebuild(app)
+    return primed, failed
+
+
+def warm_up(app):
+    """Toàn bộ warm-up trước khi fork - trả về báo cáo (cũng lưu ở LAST_REPORT)"""
+    started = time.perf_counter()
+    modules, import_errors = import_all()
+    templates, template_errors = compile_templates(app)
+    primed, cache_errors = prime_caches(app)
+
+    # Không để worker kế thừa connection đang mở của master
+    with app.app_context():
+        db.engine.dispose()
+
+    gc.collect()
+    gc.freeze()
+
+    LAST_REPORT.clear()
+    LAST_REPORT.update(
+        modules=modules,
+        templates=templates,
+        caches=primed,
+        frozen=gc.get_freeze_count(),
+        ms=round((time.perf_counter() - started) * 1000, 1),
+        errors={**import_errors, **template_errors, **cache_errors},
+    )
+    return LAST_REPORT
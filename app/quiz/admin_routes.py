@@ -10,26 +10,27 @@ Chức năng:
 Yêu cầu: Login và có quyền manage_quiz
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, abort, current_app, stream_with_context
 from flask_login import login_required, current_user
 from app import db
 from app.quiz.models import Quiz, Question, Answer, QuizAttempt, UserAnswer
+from app.quiz.stats import get_quiz_stats, get_overview
+from app.quiz.analytics import forget_attempt, get_item_analysis
+from app.quiz.qr import FORMATS as QR_FORMATS, get_qr, pregenerate, qr_version
+from app.quiz.export import build_results_query, iter_long_rows, iter_wide_rows, stream_csv, stream_xlsx
 from app.decorators import permission_required
 from datetime import datetime
-from sqlalchemy import func
 
 quiz_admin_bp = Blueprint('quiz_admin', __name__, url_prefix='/admin/quiz')
 
 
 # ==================== QUẢN LÝ QUIZ ====================
 
-# ✨ QR_CACHE: Thay thế hàm quizzes() hoàn toàn (từ dòng @quiz_admin_bp.route('/quizzes'))
-
 @quiz_admin_bp.route('/quizzes')
 @permission_required('manage_quiz')
 def quizzes():
     """
-    ✨ QR_CACHE: Danh sách tất cả quiz + Generate QR code cache
+    Danh sách tất cả quiz + thống kê (QR phục vụ qua endpoint riêng quiz_qr)
     """
     page = request.args.get('page', 1, type=int)
     # ✨ QR_CACHE: Thêm search filter
@@ -45,34 +46,32 @@ def quizzes():
     )
 
     # Thống kê cho mỗi quiz
+    # QR không tạo ở đây nữa: ảnh render lazy qua quiz_qr (?v= đổi khi slug đổi)
     quiz_stats = []
     for quiz in quizzes.items:
-        # ✨ QR_CACHE: QUAN TRỌNG - Tạo/Update QR code cache tại đây
-        # Chỉ tạo 1 lần hoặc khi URL thay đổi
-        from flask import url_for
-        quiz_url = url_for('quiz.quiz_take', slug=quiz.slug, _external=True)
-        quiz.generate_or_get_qr_code(quiz_url)
-
-        stats = {
+        stats = get_quiz_stats(quiz.id)  # 1 query GROUP BY cho mọi đề (cache)
+        quiz_url = _quiz_public_url(quiz)
+        quiz_stats.append({
             'quiz': quiz,
-            'total_questions': quiz.questions.count(),
-            'total_attempts': quiz.attempts.count(),
-            'completed_attempts': quiz.attempts.filter_by(is_completed=True).count(),
-            'pass_rate': quiz.get_pass_percentage(),
-            'avg_score': quiz.get_average_score()
-        }
-        quiz_stats.append(stats)
+            'quiz_url': quiz_url,
+            'qr_png_url': url_for('quiz_admin.quiz_qr', quiz_id=quiz.id, fmt='png', v=qr_version(quiz_url, 'png')),
+            'qr_svg_url': url_for('quiz_admin.quiz_qr', quiz_id=quiz.id, fmt='svg', v=qr_version(quiz_url, 'svg')),
+            'total_questions': stats.total_questions,
+            'total_attempts': stats.total_attempts,
+            'completed_attempts': stats.completed_attempts,
+            'pass_rate': stats.pass_rate,
+            'avg_score': stats.avg_score
+        })
 
     return render_template('admin/quiz/quizzes.html',
                            quizzes=quizzes,
                            quiz_stats=quiz_stats)
 
 
-# ✨ QR_CACHE: Sửa hàm add_quiz - tạo QR khi thêm quiz mới
 @quiz_admin_bp.route('/quizzes/add', methods=['GET', 'POST'])
 @permission_required('manage_quiz')
 def add_quiz():
-    """✨ QR_CACHE: Thêm quiz mới + Generate QR ngay"""
+    """Thêm quiz mới (QR render lazy khi mở lần đầu)"""
     from app.forms import QuizForm
     form = QuizForm()
 
@@ -97,21 +96,16 @@ def add_quiz():
         db.session.add(quiz)
         db.session.commit()
 
-        # ✨ QR_CACHE: Tạo QR code ngay sau khi tạo quiz
-        quiz_url = url_for('quiz.quiz_take', slug=quiz.slug, _external=True)
-        quiz.generate_or_get_qr_code(quiz_url)
-
         flash(f'✅ Đã tạo quiz "{quiz.title}" thành công!', 'success')
         return redirect(url_for('quiz_admin.edit_questions', quiz_id=quiz.id))
 
     return render_template('admin/quiz/quiz_form.html', form=form, title='Thêm Quiz')
 
 
-# ✨ QR_CACHE: Sửa hàm edit_quiz - update QR nếu slug thay đổi
 @quiz_admin_bp.route('/quizzes/edit/<int:id>', methods=['GET', 'POST'])
 @permission_required('manage_quiz')
 def edit_quiz(id):
-    """✨ QR_CACHE: Sửa quiz + Regenerate QR nếu slug thay đổi"""
+    """Sửa quiz (đổi slug → version QR đổi → ảnh mới tự render)"""
     from app.forms import QuizForm
     from flask import url_for
 
@@ -132,10 +126,6 @@ def edit_quiz(id):
 
         db.session.commit()
 
-        # ✨ QR_CACHE: Nếu slug thay đổi, regenerate QR code
-        quiz_url = url_for('quiz.quiz_take', slug=quiz.slug, _external=True)
-        quiz.generate_or_get_qr_code(quiz_url)
-
         flash('✅ Đã cập nhật quiz thành công!', 'success')
         return redirect(url_for('quiz_admin.quizzes'))
 
@@ -333,23 +323,7 @@ def results():
     search = request.args.get('search', '').strip()
     status = request.args.get('status', '')  # 'passed', 'failed'
 
-    query = QuizAttempt.query.filter_by(is_completed=True)
-
-    if quiz_id:
-        query = query.filter_by(quiz_id=quiz_id)
-
-    if search:
-        query = query.filter(
-            db.or_(
-                QuizAttempt.user_name.ilike(f'%{search}%'),
-                QuizAttempt.user_email.ilike(f'%{search}%')
-            )
-        )
-
-    if status == 'passed':
-        query = query.filter_by(passed=True)
-    elif status == 'failed':
-        query = query.filter_by(passed=False)
+    query = build_results_query(quiz_id=quiz_id, search=search, status=status)
 
     attempts = query.order_by(QuizAttempt.completed_at.desc()).paginate(
         page=page, per_page=30, error_out=False
@@ -362,25 +336,56 @@ def results():
                            quizzes=quizzes)
 
 
+@quiz_admin_bp.route('/results/export')
+@permission_required('manage_quiz')
+def export_results():
+    """
+    Xuất toàn bộ kết quả (theo bộ lọc hiện tại) ra CSV / XLSX - streaming
+    ?format=csv|xlsx  ?layout=long|wide (wide: 1 cột / câu hỏi, cần chọn 1 đề)
+    """
+    fmt = request.args.get('format', 'csv')
+    layout = request.args.get('layout', 'long')
+    filters = {
+        'quiz_id': request.args.get('quiz_id', type=int),
+        'search': request.args.get('search', '').strip(),
+        'status': request.args.get('status', ''),
+    }
+    back_url = url_for('quiz_admin.results', **{k: v for k, v in filters.items() if v})
+
+    if layout == 'wide' and not filters['quiz_id']:
+        flash('⚠️ Chọn 1 quiz để xuất dạng mỗi câu hỏi 1 cột.', 'warning')
+        return redirect(back_url)
+
+    rows = iter_wide_rows(filters) if layout == 'wide' else iter_long_rows(filters)
+
+    if fmt == 'xlsx':
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            flash('⚠️ Server chưa cài openpyxl, hãy xuất CSV.', 'warning')
+            return redirect(back_url)
+        body = stream_xlsx(rows)
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        fmt = 'csv'
+        body = stream_csv(rows)
+        mimetype = 'text/csv; charset=utf-8'
+
+    filename = f"ket-qua-quiz-{layout}-{datetime.utcnow():%Y%m%d-%H%M}.{fmt}"
+    response = current_app.response_class(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['X-Accel-Buffering'] = 'no'  # không để proxy buffer cả file
+    return response
+
+
 @quiz_admin_bp.route('/results/<int:attempt_id>')
 @permission_required('manage_quiz')
 def view_result(attempt_id):
     """Xem chi tiết kết quả của 1 lượt làm bài"""
     attempt = QuizAttempt.query.get_or_404(attempt_id)
 
-    # Lấy chi tiết từng câu trả lời
-    questions_detail = []
-    for user_answer in attempt.user_answers.all():
-        question = user_answer.question
-        selected_answer = user_answer.answer
-        correct_answer = question.get_correct_answer()
-
-        questions_detail.append({
-            'question': question,
-            'selected_answer': selected_answer,
-            'correct_answer': correct_answer,
-            'is_correct': user_answer.is_correct
-        })
+    # Lấy chi tiết từng câu trả lời (số query cố định)
+    questions_detail = attempt.get_questions_detail()
 
     return render_template('admin/quiz/result_detail.html',
                            attempt=attempt,
@@ -395,6 +400,10 @@ def delete_attempt(attempt_id):
 
     attempt = QuizAttempt.query.get_or_404(attempt_id)
 
+    # Trừ khỏi bảng rollup phân bố đáp án (chỉ bài đã nộp mới được cộng)
+    if attempt.is_completed:
+        forget_attempt(attempt.id)
+
     # Xoá tất cả câu trả lời liên quan
     UserAnswer.query.filter_by(attempt_id=attempt.id).delete()
 
@@ -407,8 +416,67 @@ def delete_attempt(attempt_id):
 
 
 
+# ==================== QR CODE ====================
+def _quiz_public_url(quiz):
+    """URL làm bài được mã hoá trong QR"""
+    return url_for('quiz.quiz_take', slug=quiz.slug, _external=True)
+
+
+@quiz_admin_bp.route('/<int:quiz_id>/qr.<fmt>')
+@permission_required('manage_quiz')
+def quiz_qr(quiz_id, fmt):
+    """
+    Ảnh QR của đề (png / svg) - render lazy, ETag = version
+    ?v=<version> đúng → cache 1 năm (immutable); ?download=1 → tải file
+    """
+    if fmt not in QR_FORMATS:
+        abort(404)
+
+    quiz = Quiz.query.get_or_404(quiz_id)
+    quiz_url = _quiz_public_url(quiz)
+    version = qr_version(quiz_url, fmt)
+
+    if request.if_none_match.contains(version):
+        response = current_app.response_class(status=304)
+    else:
+        content, version = get_qr(quiz.id, quiz_url, fmt)
+        response = current_app.response_class(content, mimetype=QR_FORMATS[fmt])
+
+    response.set_etag(version)
+    response.cache_control.private = True
+    if request.args.get('v') == version:
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+
+    if request.args.get('download'):
+        response.headers['Content-Disposition'] = f'attachment; filename="quiz-{quiz.slug}-qr.{fmt}"'
+    return response
+
+
+@quiz_admin_bp.route('/quizzes/qr/pregenerate', methods=['POST'])
+@permission_required('manage_quiz')
+def pregenerate_qr():
+    """Tạo sẵn QR (PNG + SVG) cho tất cả đề"""
+    rendered = pregenerate(Quiz.query.all(), _quiz_public_url)
+    flash(f'✅ Đã tạo {rendered} ảnh QR', 'success')
+    return redirect(url_for('quiz_admin.quizzes'))
+
+
 # ==================== THỐNG KÊ CHI TIẾT ====================
 
+@quiz_admin_bp.route('/quizzes/<int:quiz_id>/item-analysis')
+@permission_required('manage_quiz')
+def item_analysis(quiz_id):
+    """
+    API phân tích câu hỏi của cả đề (JSON, 1 lần gọi):
+    độ khó, độ phân biệt, point-biserial + phân bố đáp án từng câu
+    """
+    Quiz.query.get_or_404(quiz_id)
+    return jsonify(get_item_analysis(quiz_id))
+
+
 @quiz_admin_bp.route('/statistics')
 @permission_required('manage_quiz')
 def statistics():
@@ -418,28 +486,7 @@ def statistics():
     - Top quiz phổ biến
     - Tỷ lệ đạt/không đạt
     """
-    total_quizzes = Quiz.query.count()
-    total_questions = Question.query.count()
-    total_attempts = QuizAttempt.query.filter_by(is_completed=True).count()
-
-    # Top quiz có nhiều người làm nhất
-    top_quizzes = db.session.query(
-        Quiz.title,
-        func.count(QuizAttempt.id).label('attempt_count')
-    ).join(QuizAttempt).filter(
-        QuizAttempt.is_completed == True
-    ).group_by(Quiz.id).order_by(
-        func.count(QuizAttempt.id).desc()
-    ).limit(5).all()
-
-    # Thống kê đạt/không đạt
-    passed_count = QuizAttempt.query.filter_by(is_completed=True, passed=True).count()
-    failed_count = QuizAttempt.query.filter_by(is_completed=True, passed=False).count()
-
-    return render_template('admin/quiz/statistics.html',
-                           total_quizzes=total_quizzes,
-                           total_questions=total_questions,
-                           total_attempts=total_attempts,
-                           top_quizzes=top_quizzes,
-                           passed_count=passed_count,
-                           failed_count=failed_count)
+    # Toàn bộ số liệu tính từ 1 query GROUP BY (cache, xoá khi có bài nộp mới)
+    overview = get_overview(top=5)
+
+    return render_template('admin/quiz/statistics.html', **overview)
@@ -0,0 +1,257 @@
+"""
+Quiz Analytics - Phân tích câu hỏi (item analysis)
+
+- Phân bố đáp án: đọc từ bảng rollup question_answer_stats (cộng dồn khi
+  nộp bài, trừ khi xoá kết quả) thay vì COUNT từng đáp án
+- Độ khó (difficulty index) + độ phân biệt (discrimination) mỗi câu: tính
+  bằng NumPy trên ma trận attempts × questions (0/1), nạp bằng 1 query
+- Kết quả item analysis cache theo quiz_id, xoá khi có bài nộp / xoá bài
+
+NumPy chỉ import khi admin mở item analysis (không tốn RAM lúc boot).
+"""
+
+from sqlalchemy import bindparam, event, func
+from sqlalchemy.orm import object_session
+
+from app import cache, db
+from app.quiz.models import Question, Answer, QuizAttempt, UserAnswer, QuestionAnswerStat
+
+_analysis_cache = cache.namespace('quiz_item_analysis', ttl=600, stale_ttl=120)
+
+# Nhóm trên/dưới 27% theo tổng điểm (chuẩn Kelley) để tính độ phân biệt
+GROUP_FRACTION = 0.27
+
+
+# ==================== ROLLUP ====================
+def _attempt_pairs(attempt_id):
+    return db.session.query(UserAnswer.question_id, UserAnswer.answer_id).filter(
+        UserAnswer.attempt_id == attempt_id
+    ).all()
+
+
+def record_attempt(attempt_id):
+    """
+    Cộng dồn đáp án của 1 bài vừa nộp vào rollup (KHÔNG commit - chung
+    transaction với submit). 1 SELECT + 1 upsert executemany.
+    """
+    rows = [
+        {'question_id': question_id, 'answer_id': answer_id, 'selected_count': 1}
+        for question_id, answer_id in _attempt_pairs(attempt_id)
+    ]
+    if not rows:
+        return
+
+    table = QuestionAnswerStat.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        insert = None
+
+    if insert is not None:
+        stmt = insert(table).on_conflict_do_update(
+            index_elements=[table.c.question_id, table.c.answer_id],
+            set_={'selected_count': table.c.selected_count + 1}
+        )
+        db.session.execute(stmt, rows)
+        return
+
+    for row in rows:
+        updated = db.session.execute(
+            table.update()
+            .where(table.c.question_id == row['question_id'], table.c.answer_id == row['answer_id'])
+            .values(selected_count=table.c.selected_count + 1)
+        ).rowcount
+        if not updated:
+            db.session.execute(table.insert().values(**row))
+
+
+def forget_attempt(attempt_id):
+    """Trừ đáp án của 1 bài đã nộp khỏi rollup (gọi trước khi xoá bài)"""
+    rows = [
+        {'q_id': question_id, 'a_id': answer_id}
+        for question_id, answer_id in _attempt_pairs(attempt_id)
+    ]
+    if not rows:
+        return
+
+    table = QuestionAnswerStat.__table__
+    db.session.execute(
+        table.update()
+        .where(table.c.question_id == bindparam('q_id'), table.c.answer_id == bindparam('a_id'))
+        .values(selected_count=table.c.selected_count - 1),
+        rows
+    )
+
+
+def rebuild_rollup():
+    """Tính lại toàn bộ rollup từ user_answers (dùng khi dữ liệu lệch)"""
+    table = QuestionAnswerStat.__table__
+    db.session.execute(table.delete())
+    select_counts = db.session.query(
+        UserAnswer.question_id, UserAnswer.answer_id, func.count()
+    ).join(
+        QuizAttempt, QuizAttempt.id == UserAnswer.attempt_id
+    ).filter(
+        QuizAttempt.is_completed == True  # noqa: E712
+    ).group_by(UserAnswer.question_id, UserAnswer.answer_id)
+
+    db.session.execute(
+        table.insert().from_select(['question_id', 'answer_id', 'selected_count'], select_counts)
+    )
+    db.session.commit()
+    _analysis_cache.invalidate()
+
+
+def get_answer_distribution(question_id):
+    """{answer_text: % số lần được chọn} - 1 query trên rollup"""
+    rows = db.session.query(Answer.answer_text, QuestionAnswerStat.selected_count).outerjoin(
+        QuestionAnswerStat,
+        (QuestionAnswerStat.answer_id == Answer.id) & (QuestionAnswerStat.question_id == Answer.question_id)
+    ).filter(Answer.question_id == question_id).order_by(Answer.order).all()
+
+    total = sum(count or 0 for _, count in rows)
+    if total == 0:
+        return {}
+    return {text: round(((count or 0) / total) * 100, 1) for text, count in rows}
+
+
+# ==================== ITEM ANALYSIS (NUMPY) ====================
+def _compute_item_stats(attempt_ids, question_ids, cells):
+    """
+    Ma trận X (attempts × questions): 1 = đúng, 0 = sai/bỏ trống
+    - difficulty  p_j = mean(X[:, j])  (tỉ lệ làm đúng, càng thấp càng khó)
+    - discrimination D_j = p_upper - p_lower (nhóm 27% điểm cao nhất/thấp nhất)
+    - point_biserial r_j = corr(X[:, j], tổng điểm trừ câu j)
+    """
+    import numpy as np
+
+    n_attempts, n_questions = len(attempt_ids), len(question_ids)
+    if n_attempts == 0 or n_questions == 0:
+        return {}
+
+    row_index = {attempt_id: i for i, attempt_id in enumerate(attempt_ids)}
+    col_index = {question_id: j for j, question_id in enumerate(question_ids)}
+
+    matrix = np.zeros((n_attempts, n_questions), dtype=np.float64)
+    rows, cols = [], []
+    for attempt_id, question_id in cells:
+        if attempt_id in row_index and question_id in col_index:
+            rows.append(row_index[attempt_id])
+            cols.append(col_index[question_id])
+    matrix[np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)] = 1.0
+
+    totals = matrix.sum(axis=1)
+    difficulty = matrix.mean(axis=0)
+
+    group_size = max(1, int(round(n_attempts * GROUP_FRACTION)))
+    order = np.argsort(totals, kind='stable')
+    lower, upper = matrix[order[:group_size]], matrix[order[-group_size:]]
+    discrimination = upper.mean(axis=0) - lower.mean(axis=0)
+
+    # Tổng điểm đã loại câu j (corrected item-total) → tránh tự tương quan
+    rest = totals[:, None] - matrix
+    x_centered = matrix - difficulty
+    rest_centered = rest - rest.mean(axis=0)
+    denominator = np.sqrt((x_centered ** 2).sum(axis=0) * (rest_centered ** 2).sum(axis=0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        point_biserial = np.where(
+            denominator > 0, (x_centered * rest_centered).sum(axis=0) / denominator, np.nan
+        )
+
+    return {
+        question_id: {
+            'difficulty': round(float(difficulty[j]), 3),
+            'discrimination': round(float(discrimination[j]), 3),
+            'point_biserial': None if np.isnan(point_biserial[j]) else round(float(point_biserial[j]), 3),
+        }
+        for question_id, j in col_index.items()
+    }
+
+
+def _build_item_analysis(quiz_id):
+    questions = Question.query.filter_by(quiz_id=quiz_id).order_by(Question.order, Question.id).all()
+    question_ids = [q.id for q in questions]
+
+    attempt_ids = [
+        attempt_id for (attempt_id,) in db.session.query(QuizAttempt.id).filter(
+            QuizAttempt.quiz_id == quiz_id, QuizAttempt.is_completed == True  # noqa: E712
+        ).order_by(QuizAttempt.id)
+    ]
+
+    # Các ô "làm đúng" của ma trận: 1 query cho cả đề
+    correct_cells = db.session.query(UserAnswer.attempt_id, UserAnswer.question_id).join(
+        QuizAttempt, QuizAttempt.id == UserAnswer.attempt_id
+    ).filter(
+        QuizAttempt.quiz_id == quiz_id,
+        QuizAttempt.is_completed == True,  # noqa: E712
+        UserAnswer.is_correct == True  # noqa: E712
+    ).all()
+
+    item_stats = _compute_item_stats(attempt_ids, question_ids, correct_cells)
+
+    # Phân bố đáp án của cả đề từ rollup: 1 query
+    answer_rows = db.session.query(
+        Answer.id, Answer.question_id, Answer.answer_text, Answer.is_correct, QuestionAnswerStat.selected_count
+    ).outerjoin(
+        QuestionAnswerStat,
+        (QuestionAnswerStat.answer_id == Answer.id) & (QuestionAnswerStat.question_id == Answer.question_id)
+    ).filter(
+        Answer.question_id.in_(question_ids)
+    ).order_by(Answer.question_id, Answer.order, Answer.id).all() if question_ids else []
+
+    distribution = {}
+    for answer_id, question_id, text, is_correct, count in answer_rows:
+        distribution.setdefault(question_id, []).append({
+            'answer_id': answer_id,
+            'text': text,
+            'is_correct': bool(is_correct),
+            'count': count or 0,
+        })
+
+    items = []
+    for question in questions:
+        answers = distribution.get(question.id, [])
+        answered = sum(a['count'] for a in answers)
+        for a in answers:
+            a['percent'] = round(a['count'] / answered * 100, 1) if answered else 0
+
+        stats = item_stats.get(question.id, {})
+        items.append({
+            'question_id': question.id,
+            'text': question.question_text,
+            'order': question.order,
+            'points': question.points,
+            'answered': answered,
+            'difficulty': stats.get('difficulty'),
+            'discrimination': stats.get('discrimination'),
+            'point_biserial': stats.get('point_biserial'),
+            'answers': answers,
+        })
+
+    return {
+        'quiz_id': quiz_id,
+        'attempts': len(attempt_ids),
+        'questions': items,
+    }
+
+
+def get_item_analysis(quiz_id):
+    return _analysis_cache.get_or_set(quiz_id, lambda: _build_item_analysis(quiz_id))
+
+
+# ==================== AUTO INVALIDATE ====================
+def _quiz_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        cache.invalidate_after_commit(session, 'quiz_item_analysis', target.quiz_id)
+
+
+for _model, _events in (
+    (QuizAttempt, ('after_update', 'after_delete')),
+    (Question, ('after_insert', 'after_update', 'after_delete')),
+):
+    for _event_name in _events:
+        event.listen(_model, _event_name, _quiz_changed)
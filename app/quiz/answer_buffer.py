@@ -0,0 +1,124 @@
+"""
+Answer Buffer - Gom câu trả lời quiz, ghi DB theo lô
+
+Trình duyệt giữ map {question_id: answer_id} (kèm localStorage) và chỉ gửi
+lên server khi:
+- Checkpoint định kỳ (QUIZ_CHECKPOINT_SECONDS) hoặc khi rời trang (sendBeacon)
+- Nộp bài (field ẩn `answers` trong form submit)
+
+Server validate bằng answer key trong RAM (không query Question/Answer) rồi
+flush 1 lần: DELETE các câu đổi đáp án + INSERT executemany. Checkpoint và
+submit có thể chạy song song cho cùng 1 attempt (user_answers không có unique
+constraint) → flush khoá dòng quiz_attempts trước khi đọc/ghi.
+
+Không giữ buffer trong RAM phía server: worker bị recycle (max_requests)
+hoặc chạy nhiều worker sẽ làm mất câu trả lời chưa flush.
+"""
+
+import json
+
+from app import db
+from app.quiz.models import QuizAttempt, UserAnswer
+
+
+def parse_answers(raw):
+    """
+    Chuẩn hoá payload thành {question_id: answer_id} (int).
+    Nhận dict {"12": 34}, list [{"question_id": 12, "answer_id": 34}] hoặc chuỗi JSON.
+    Entry sai định dạng bị bỏ qua.
+    """
+    if not raw:
+        return {}
+    if isinstance(raw, (str, bytes)):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            return {}
+
+    if isinstance(raw, dict):
+        pairs = raw.items()
+    elif isinstance(raw, list):
+        pairs = ((item.get('question_id'), item.get('answer_id')) for item in raw if isinstance(item, dict))
+    else:
+        return {}
+
+    answers = {}
+    for question_id, answer_id in pairs:
+        try:
+            answers[int(question_id)] = int(answer_id)
+        except (TypeError, ValueError):
+            continue
+    return answers
+
+
+def validate_answers(answer_key, answers):
+    """
+    Tách câu trả lời hợp lệ / không hợp lệ theo answer key.
+
+    Returns:
+        (valid, rejected): valid = {question_id: (answer_id, is_correct)},
+                           rejected = [question_id, ...]
+    """
+    valid = {}
+    rejected = []
+    for question_id, answer_id in answers.items():
+        is_correct = answer_key.check(question_id, answer_id)
+        if is_correct is None:
+            rejected.append(question_id)
+        else:
+            valid[question_id] = (answer_id, is_correct)
+    return valid, rejected
+
+
+def flush_answers(attempt_id, valid):
+    """
+    Ghi các câu trả lời đã validate vào DB (KHÔNG commit - caller commit).
+    Chỉ ghi câu mới/đổi đáp án: 1 SELECT + tối đa 1 DELETE + 1 INSERT executemany.
+
+    Khoá dòng attempt (FOR UPDATE) tới hết transaction: flush khác của cùng
+    attempt phải chờ, không INSERT trùng câu. Attempt đã nộp thì không ghi.
+
+    Returns:
+        Số câu đã trả lời của attempt sau khi flush
+    """
+    is_completed = (
+        db.session.query(QuizAttempt.is_completed)
+        .filter(QuizAttempt.id == attempt_id)
+        .with_for_update()
+        .scalar()
+    )
+
+    existing = dict(
+        db.session.query(UserAnswer.question_id, UserAnswer.answer_id)
+        .filter(UserAnswer.attempt_id == attempt_id)
+        .all()
+    )
+
+    changed = {
+        question_id: value for question_id, value in valid.items()
+        if existing.get(question_id) != value[0]
+    }
+    if changed and not is_completed:
+        replaced = [question_id for question_id in changed if question_id in existing]
+        if replaced:
+            db.session.query(UserAnswer).filter(
+                UserAnswer.attempt_id == attempt_id,
+                UserAnswer.question_id.in_(replaced)
+            ).delete(synchronize_session=False)
+
+        db.session.execute(
+            UserAnswer.__table__.insert(),
+            [
+                {
+                    'attempt_id': attempt_id,
+                    'question_id': question_id,
+                    'answer_id': answer_id,
+                    'is_correct': is_correct,
+                }
+                for question_id, (answer_id, is_correct) in changed.items()
+            ]
+        )
+
+    if is_completed:
+        return len(existing)
+    return len(existing.keys() | valid.keys())
@@ -0,0 +1,102 @@
+"""
+Quiz Answer Key - Đáp án của đề thi giữ trong RAM
+
+Thay vì query Question/Answer mỗi lần user click đáp án, mỗi đề được nạp
+1 lần bằng 1 query (Question JOIN Answer) thành 1 object bất biến:
+    question_id → QuestionKey(points, correct_answer_id, answer_ids)
+
+Cache tự xoá sau khi commit có thay đổi Question/Answer của đề đó
+(admin sửa câu hỏi/đáp án → lần đọc sau nạp lại).
+"""
+
+from collections import namedtuple
+from types import MappingProxyType
+
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+
+from app import cache, db
+from app.quiz.models import Question, Answer
+
+_answer_keys = cache.namespace('quiz_answer_key', ttl=3600)
+
+QuestionKey = namedtuple('QuestionKey', ['points', 'correct_answer_id', 'answer_ids'])
+
+
+class QuizAnswerKey(namedtuple('QuizAnswerKey', ['quiz_id', 'questions', 'total_points'])):
+    """Đáp án của 1 đề - bất biến, dùng chung giữa các thread"""
+
+    __slots__ = ()
+
+    def check(self, question_id, answer_id):
+        """
+        Returns:
+            None nếu câu hỏi/đáp án không thuộc đề, ngược lại True/False (đúng/sai)
+        """
+        question = self.questions.get(question_id)
+        if question is None or answer_id not in question.answer_ids:
+            return None
+        return answer_id == question.correct_answer_id
+
+
+def build_answer_key(quiz_id):
+    """Nạp đáp án của đề bằng 1 query"""
+    rows = db.session.query(
+        Question.id, Question.points, Answer.id, Answer.is_correct
+    ).outerjoin(
+        Answer, Answer.question_id == Question.id
+    ).filter(
+        Question.quiz_id == quiz_id
+    ).all()
+
+    points = {}
+    answers = {}
+    correct = {}
+    for question_id, question_points, answer_id, is_correct in rows:
+        points[question_id] = question_points or 0
+        answers.setdefault(question_id, set())
+        if answer_id is not None:
+            answers[question_id].add(answer_id)
+            if is_correct and question_id not in correct:
+                correct[question_id] = answer_id
+
+    questions = {
+        qid: QuestionKey(points[qid], correct.get(qid), frozenset(answers[qid]))
+        for qid in points
+    }
+    return QuizAnswerKey(quiz_id, MappingProxyType(questions), sum(points.values()))
+
+
+def get_answer_key(quiz_id):
+    return _answer_keys.get_or_set(quiz_id, lambda: build_answer_key(quiz_id))
+
+
+def invalidate_answer_key(quiz_id=None):
+    if quiz_id is None:
+        _answer_keys.invalidate()
+    else:
+        _answer_keys.invalidate(quiz_id)
+
+
+# ==================== AUTO INVALIDATE (SAU COMMIT) ====================
+# Chỉ xoá cache sau khi commit thành công (cache.invalidate_after_commit)
+# → request khác không nạp lại dữ liệu chưa commit.
+def _question_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None and target.quiz_id is not None:
+        cache.invalidate_after_commit(session, 'quiz_answer_key', target.quiz_id)
+
+
+def _answer_changed(mapper, connection, target):
+    # Answer chỉ biết question_id → tìm đề đang cache chứa câu hỏi đó
+    session = object_session(target)
+    if session is None:
+        return
+    for quiz_id, key in _answer_keys.items():
+        if target.question_id in key.questions:
+            cache.invalidate_after_commit(session, 'quiz_answer_key', quiz_id)
+
+
+for _event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Question, _event_name, _question_changed)
+    event.listen(Answer, _event_name, _answer_changed)
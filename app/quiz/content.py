@@ -0,0 +1,113 @@
+"""
+Quiz Content - Bộ nội dung đề thi (câu hỏi + đáp án) cache theo đề
+
+Trước đây quiz_take query câu hỏi rồi mỗi câu 1 query đáp án (N+1) và xáo
+trộn trên ORM object → 50 thí sinh mở đề 60 câu cùng lúc ≈ 3.000 query.
+
+- build_bundle(): 1 query JOIN questions ⟕ answers → tuple/namedtuple bất biến
+- get_bundle(quiz): cache theo quiz_id, kiểm tra version = quiz.updated_at;
+  sửa câu hỏi/đáp án → xoá sau commit
+- arrange(): xáo trộn theo seed = attempt id → tải lại trang thứ tự không đổi,
+  không cần lưu thứ tự vào DB
+"""
+
+import random
+from collections import namedtuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+
+from app import cache, db
+from app.quiz.models import Question, Answer
+
+_bundles = cache.namespace('quiz_content', ttl=3600)
+
+BundleAnswer = namedtuple('BundleAnswer', 'id answer_text')
+QuizBundle = namedtuple('QuizBundle', 'quiz_id version questions question_ids')
+
+
+class BundleQuestion(namedtuple('BundleQuestion', 'id question_text question_type points answers')):
+    __slots__ = ()
+
+    @property
+    def shuffled_answers(self):
+        """Đáp án theo thứ tự hiển thị (tên cũ template quiz_take đang dùng)"""
+        return self.answers
+
+
+def build_bundle(quiz_id, version=None):
+    """Câu hỏi (theo order) + đáp án (theo order) của 1 đề - 1 query"""
+    rows = db.session.query(
+        Question.id, Question.question_text, Question.question_type, Question.points,
+        Answer.id, Answer.answer_text
+    ).outerjoin(
+        Answer, Answer.question_id == Question.id
+    ).filter(
+        Question.quiz_id == quiz_id
+    ).order_by(Question.order, Question.id, Answer.order, Answer.id).all()
+
+    questions = []
+    current = None
+    answers = []
+    for question_id, text, question_type, points, answer_id, answer_text in rows:
+        if current is None or current[0] != question_id:
+            if current is not None:
+                questions.append(BundleQuestion(*current, tuple(answers)))
+            current = (question_id, text, question_type, points)
+            answers = []
+        if answer_id is not None:
+            answers.append(BundleAnswer(answer_id, answer_text))
+    if current is not None:
+        questions.append(BundleQuestion(*current, tuple(answers)))
+
+    return QuizBundle(quiz_id, version, tuple(questions), frozenset(q.id for q in questions))
+
+
+def get_bundle(quiz):
+    """Bundle của đề (cache); đề vừa sửa (updated_at khác) thì build lại"""
+    return _bundles.get_or_set(
+        quiz.id, lambda: build_bundle(quiz.id, quiz.updated_at), version=quiz.updated_at
+    )
+
+
+def arrange(bundle, attempt_id, shuffle_questions=False, shuffle_answers=False):
+    """
+    Thứ tự câu hỏi / đáp án cho 1 lượt làm bài.
+    Seed theo attempt id (và question id cho đáp án) → ổn định giữa các lần
+    tải lại, và thêm/xoá 1 câu không làm đổi thứ tự đáp án của câu khác.
+    """
+    questions = list(bundle.questions)
+    if shuffle_questions:
+        random.Random(attempt_id).shuffle(questions)
+
+    if not shuffle_answers:
+        return questions
+
+    arranged = []
+    for question in questions:
+        answers = list(question.answers)
+        random.Random(f'{attempt_id}:{question.id}').shuffle(answers)
+        arranged.append(question._replace(answers=tuple(answers)))
+    return arranged
+
+
+# ==================== AUTO INVALIDATE ====================
+def _question_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        cache.invalidate_after_commit(session, 'quiz_content', target.quiz_id)
+
+
+def _answer_changed(mapper, connection, target):
+    # Answer chỉ biết question_id → tìm đề đang cache chứa câu hỏi đó
+    session = object_session(target)
+    if session is None:
+        return
+    for quiz_id, bundle in _bundles.items():
+        if target.question_id in bundle.question_ids:
+            cache.invalidate_after_commit(session, 'quiz_content', quiz_id)
+
+
+for _event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Question, _event_name, _question_changed)
+    event.listen(Answer, _event_name, _answer_changed)
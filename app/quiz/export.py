@@ -0,0 +1,193 @@
+"""
+Quiz Export - Xuất kết quả làm bài ra CSV / XLSX (streaming)
+
+- Đọc bằng server-side cursor (yield_per) → RAM không tăng theo số lượt làm bài
+- CSV: generator trả từng dòng, response stream thẳng ra client
+- XLSX: openpyxl write-only (ghi ra file tạm) rồi stream file theo chunk
+- 2 layout:
+    long: 1 dòng / (lượt làm bài × câu hỏi đã trả lời)
+    wide: 1 dòng / lượt làm bài, 1 cột / câu hỏi (chỉ khi lọc theo 1 đề)
+  Cả 2 chỉ dùng 1 query stream (JOIN UserAnswer), không query theo từng lượt.
+"""
+
+import csv
+import os
+import tempfile
+from itertools import groupby
+
+import pytz
+from sqlalchemy import select
+
+from app import db, VN_TZ
+from app.quiz.models import Quiz, Question, Answer, QuizAttempt, UserAnswer
+
+YIELD_PER = 1000
+FILE_CHUNK = 64 * 1024
+
+ATTEMPT_COLUMNS = [
+    ('Mã kết quả', QuizAttempt.id),
+    ('Đề thi', Quiz.title),
+    ('Họ tên', QuizAttempt.user_name),
+    ('Email', QuizAttempt.user_email),
+    ('SĐT', QuizAttempt.user_phone),
+    ('Điểm (%)', QuizAttempt.score),
+    ('Đúng', QuizAttempt.correct_answers),
+    ('Sai', QuizAttempt.wrong_answers),
+    ('Kết quả', QuizAttempt.passed),
+    ('Thời gian làm (giây)', QuizAttempt.time_spent_seconds),
+    ('Nộp lúc', QuizAttempt.completed_at),
+]
+LONG_COLUMNS = ['Thứ tự câu', 'Câu hỏi', 'Câu trả lời', 'Đúng/Sai']
+
+
+def build_results_query(quiz_id=None, search='', status=''):
+    """Bộ lọc dùng chung cho trang kết quả và export"""
+    query = QuizAttempt.query.filter_by(is_completed=True)
+
+    if quiz_id:
+        query = query.filter_by(quiz_id=quiz_id)
+
+    if search:
+        query = query.filter(
+            db.or_(
+                QuizAttempt.user_name.ilike(f'%{search}%'),
+                QuizAttempt.user_email.ilike(f'%{search}%')
+            )
+        )
+
+    if status == 'passed':
+        query = query.filter_by(passed=True)
+    elif status == 'failed':
+        query = query.filter_by(passed=False)
+
+    return query
+
+
+# ==================== FORMAT GIÁ TRỊ ====================
+# Ô bắt đầu bằng các ký tự này bị Excel/LibreOffice hiểu là công thức
+# (=HYPERLINK(...)...) - tên/email/SĐT lấy từ form public nên phải chặn
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _format_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'Đạt' if value else 'Chưa đạt'
+    if hasattr(value, 'strftime'):
+        if value.tzinfo is None:
+            value = pytz.utc.localize(value)
+        return value.astimezone(VN_TZ).strftime('%d/%m/%Y %H:%M:%S')
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _attempt_cells(row):
+    return [_format_value(v) for v in row[:len(ATTEMPT_COLUMNS)]]
+
+
+# ==================== ROW GENERATORS ====================
+def _stream_rows(filters, extra_columns):
+    """1 query stream: attempt (đã lọc) LEFT JOIN câu trả lời, sắp theo attempt"""
+    attempt_ids = build_results_query(**filters).with_entities(QuizAttempt.id).subquery()
+
+    query = db.session.query(
+        *[column for _, column in ATTEMPT_COLUMNS], *extra_columns
+    ).join(
+        Quiz, Quiz.id == QuizAttempt.quiz_id
+    ).outerjoin(
+        UserAnswer, UserAnswer.attempt_id == QuizAttempt.id
+    ).outerjoin(
+        Question, Question.id == UserAnswer.question_id
+    ).outerjoin(
+        Answer, Answer.id == UserAnswer.answer_id
+    ).filter(
+        QuizAttempt.id.in_(select(attempt_ids.c.id))
+    ).order_by(
+        QuizAttempt.completed_at.desc(), QuizAttempt.id, Question.order, Question.id
+    )
+    return query.yield_per(YIELD_PER)
+
+
+def iter_long_rows(filters):
+    """Header + 1 dòng / câu trả lời"""
+    yield [name for name, _ in ATTEMPT_COLUMNS] + LONG_COLUMNS
+
+    extra = (Question.order, Question.question_text, Answer.answer_text, UserAnswer.is_correct)
+    for row in _stream_rows(filters, extra):
+        order, question_text, answer_text, is_correct = row[len(ATTEMPT_COLUMNS):]
+        if question_text is None:
+            # Lượt làm bài không trả lời câu nào
+            yield _attempt_cells(row) + ['', '', '', '']
+            continue
+        yield _attempt_cells(row) + [
+            order, _format_value(question_text), _format_value(answer_text), 'Đúng' if is_correct else 'Sai'
+        ]
+
+
+def iter_wide_rows(filters):
+    """Header (1 cột / câu hỏi) + 1 dòng / lượt làm bài"""
+    questions = db.session.query(Question.id, Question.order, Question.question_text).filter(
+        Question.quiz_id == filters['quiz_id']
+    ).order_by(Question.order, Question.id).all()
+    column_index = {question_id: i for i, (question_id, _, _) in enumerate(questions)}
+
+    yield [name for name, _ in ATTEMPT_COLUMNS] + [
+        f'Câu {i + 1}: {text[:60]}' for i, (_, _, text) in enumerate(questions)
+    ]
+
+    extra = (UserAnswer.question_id, Answer.answer_text, UserAnswer.is_correct)
+    n = len(ATTEMPT_COLUMNS)
+    for _, rows in groupby(_stream_rows(filters, extra), key=lambda r: r[0]):
+        cells = None
+        answers = [''] * len(questions)
+        for row in rows:
+            if cells is None:
+                cells = _attempt_cells(row)
+            question_id, answer_text, is_correct = row[n:]
+            if question_id in column_index:
+                mark = '✓' if is_correct else '✗'
+                answers[column_index[question_id]] = f'{mark} {answer_text}'
+        yield cells + answers
+
+
+# ==================== WRITERS ====================
+class _LineBuffer:
+    """csv.writer ghi vào đây → trả về chính dòng vừa ghi"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_LineBuffer())
+    yield '\ufeff'  # BOM để Excel đọc đúng tiếng Việt
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_xlsx(rows, sheet_title='Kết quả'):
+    """
+    openpyxl write-only: từng dòng được ghi xuống file tạm ngay → RAM phẳng.
+    File xlsx là zip nên phải ghi xong mới gửi; gửi theo chunk rồi xoá file tạm.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title)
+    for row in rows:
+        sheet.append(row)
+
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        workbook.save(path)
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(FILE_CHUNK)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.unlink(path)
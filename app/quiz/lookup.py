@@ -0,0 +1,154 @@
+"""
+Quiz Lookup - Tra cứu kết quả công khai theo tên / email
+
+Trước đây: ilike('%term%') trên user_name/user_email của mọi bài đã nộp,
+trả về .all() không giới hạn → full scan, lộ ra public.
+
+- Cột chuẩn hoá (điền tự động khi insert/update QuizAttempt):
+    search_name  = tên bỏ dấu + lowercase ("Trịnh Trần Phương" → "trinh tran phuong")
+    search_email = email lowercase
+- PostgreSQL: index trigram (pg_trgm) → LIKE '%term%' dùng index (từ 3 ký tự)
+- DB khác / term ngắn: so khớp tiền tố bằng khoảng [term, term + U+FFFF) → dùng B-tree
+- Keyset pagination theo (completed_at, id) giảm dần (cursor có ký), tối đa MAX_RESULTS dòng
+- Mỗi dòng có sẵn tên đề (JOIN) → template không lazy load
+"""
+
+import unicodedata
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import and_, event, or_
+
+from app import db
+from app.quiz.models import Quiz, QuizAttempt
+
+PAGE_SIZE = 20
+MAX_RESULTS = 200
+MIN_TERM_LENGTH = 2
+TRIGRAM_MIN_LENGTH = 3
+
+ResultRow = namedtuple(
+    'ResultRow',
+    'id quiz_title user_name score passed correct_answers total_questions completed_at'
+)
+
+
+# ==================== CHUẨN HOÁ ====================
+def fold_name(text):
+    """Bỏ dấu tiếng Việt + lowercase + gộp khoảng trắng"""
+    if not text:
+        return ''
+    text = text.replace('đ', 'd').replace('Đ', 'D')
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')
+    return ' '.join(text.lower().split())
+
+
+def normalize_email(text):
+    return (text or '').strip().lower()
+
+
+@event.listens_for(QuizAttempt, 'before_insert')
+@event.listens_for(QuizAttempt, 'before_update')
+def _fill_search_columns(mapper, connection, target):
+    target.search_name = fold_name(target.user_name)
+    target.search_email = normalize_email(target.user_email) or None
+
+
+# ==================== CURSOR ====================
+# Cursor ký bằng SECRET_KEY (kèm term đã chuẩn hoá): client không sửa được
+# số dòng đã xem để vượt MAX_RESULTS, cũng không mang cursor sang term khác
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_CURSOR_SALT = 'quiz-lookup-cursor'
+
+
+def _serializer():
+    return URLSafeSerializer(current_app.secret_key, salt=_CURSOR_SALT)
+
+
+def encode_cursor(row, seen, term):
+    return _serializer().dumps([(row.completed_at - _EPOCH) // _MICROSECOND, row.id, seen, term])
+
+
+def decode_cursor(cursor, term):
+    """Cursor đã ký → (completed_at, id, seen) hoặc None nếu sai chữ ký / khác term"""
+    try:
+        micros, attempt_id, seen, cursor_term = _serializer().loads(cursor)
+        if cursor_term != term:
+            return None
+        return _EPOCH + int(micros) * _MICROSECOND, int(attempt_id), int(seen)
+    except (BadSignature, TypeError, ValueError, OverflowError):
+        return None
+
+
+# ==================== TÌM KIẾM ====================
+def _prefix(column, term):
+    return and_(column >= term, column < term + '\uffff')
+
+
+def _match_filter(term):
+    name, email = fold_name(term), normalize_email(term)
+    use_trigram = (
+        db.session.get_bind().dialect.name == 'postgresql'
+        and len(name) >= TRIGRAM_MIN_LENGTH
+    )
+    if use_trigram:
+        return or_(
+            QuizAttempt.search_name.contains(name, autoescape=True),
+            QuizAttempt.search_email.contains(email, autoescape=True),
+        )
+    return or_(_prefix(QuizAttempt.search_name, name), _prefix(QuizAttempt.search_email, email))
+
+
+def search(term, cursor=None, page_size=PAGE_SIZE):
+    """
+    Returns:
+        (rows: list[ResultRow], next_cursor: str | None, capped: bool)
+        Term quá ngắn → ([], None, False). Đã trả đủ MAX_RESULTS mà vẫn còn
+        kết quả → không có trang sau, capped=True.
+    """
+    term = (term or '').strip()
+    folded = fold_name(term)
+    if len(folded) < MIN_TERM_LENGTH:
+        return [], None, False
+
+    seen = 0
+    query = db.session.query(
+        QuizAttempt.id, Quiz.title, QuizAttempt.user_name, QuizAttempt.score, QuizAttempt.passed,
+        QuizAttempt.correct_answers, QuizAttempt.total_questions, QuizAttempt.completed_at
+    ).join(
+        Quiz, Quiz.id == QuizAttempt.quiz_id
+    ).filter(
+        QuizAttempt.is_completed == True,  # noqa: E712
+        QuizAttempt.completed_at.isnot(None),
+        _match_filter(term)
+    )
+
+    if cursor:
+        decoded = decode_cursor(cursor, folded)
+        if decoded is not None:
+            completed_at, attempt_id, seen = decoded
+            query = query.filter(or_(
+                QuizAttempt.completed_at < completed_at,
+                and_(QuizAttempt.completed_at == completed_at, QuizAttempt.id < attempt_id)
+            ))
+
+    limit = min(page_size, MAX_RESULTS - seen)
+    if limit <= 0:
+        return [], None, True
+
+    rows = [ResultRow(*row) for row in query.order_by(
+        QuizAttempt.completed_at.desc(), QuizAttempt.id.desc()
+    ).limit(limit + 1)]
+
+    next_cursor, capped = None, False
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if seen + limit < MAX_RESULTS:
+            next_cursor = encode_cursor(rows[-1], seen + limit, folded)
+        else:
+            capped = True
+    return rows, next_cursor, capped
@@ -7,6 +7,7 @@ Bảng:
 - Answer: Đáp án của câu hỏi (có 1 đáp án đúng)
 - QuizAttempt: Lượt làm bài của user
 - UserAnswer: Câu trả lời của user trong 1 lần làm bài
+- QuizQRCode: Ảnh QR của đề (PNG/SVG) - tách khỏi bảng quizzes
 """
 
 from app import db
@@ -45,36 +46,23 @@ class Quiz(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
 
-    # ==================== ✨ QR_CACHE: Lưu QR Code Cache ====================
-    # Tất cả 3 trường này dùng để cache QR code, tránh tạo lại mỗi lần
-    qr_code_base64 = db.Column(db.Text, nullable=True)      # Ảnh QR dưới dạng Base64
-    quiz_url_cached = db.Column(db.String(500), nullable=True)  # URL đã lưu QR (để phát hiện thay đổi)
-    qr_generated_at = db.Column(db.DateTime, nullable=True)  # Thời điểm tạo QR
-
     # Relationships
     questions = db.relationship('Question', backref='quiz', lazy='dynamic', cascade='all, delete-orphan')
     attempts = db.relationship('QuizAttempt', backref='quiz', lazy='dynamic', cascade='all, delete-orphan')
+    qr_codes = db.relationship('QuizQRCode', backref='quiz', lazy='dynamic', cascade='all, delete-orphan')
 
     def __repr__(self):
         return f'<Quiz {self.title}>'
 
     def get_pass_percentage(self):
-        """Tính % người đạt"""
-        total = self.attempts.filter_by(is_completed=True).count()
-        if total == 0:
-            return 0
-        passed = self.attempts.filter(
-            QuizAttempt.is_completed == True,
-            QuizAttempt.score >= self.pass_score
-        ).count()
-        return round((passed / total) * 100, 1)
+        """Tính % người đạt (lấy từ thống kê GROUP BY đã cache)"""
+        from app.quiz.stats import get_quiz_stats
+        return get_quiz_stats(self.id).pass_rate
 
     def get_average_score(self):
-        """Điểm trung bình"""
-        attempts = self.attempts.filter_by(is_completed=True).all()
-        if not attempts:
-            return 0
-        return round(sum(a.score for a in attempts) / len(attempts), 1)
+        """Điểm trung bình (AVG trong SQL, không nạp từng attempt)"""
+        from app.quiz.stats import get_quiz_stats
+        return get_quiz_stats(self.id).avg_score
 
     def get_completion_rate(self):
         """Tỷ lệ hoàn thành"""
@@ -84,61 +72,6 @@ class Quiz(db.Model):
         completed = self.attempts.filter_by(is_completed=True).count()
         return round((completed / total) * 100, 1)
 
-    def generate_or_get_qr_code(self, quiz_url):
-        """
-        ✨ QR_CACHE: Tạo hoặc lấy QR code đã cache
-        - Lần đầu: Tạo QR từ URL và lưu vào DB (Base64)
-        - Lần sau: Nếu URL không đổi, dùng QR cũ
-        - Nếu URL đổi: Tạo QR mới (ví dụ: slug thay đổi)
-
-        Args:
-            quiz_url (str): URL đầy đủ của quiz (VD: https://example.com/quiz/python-test)
-
-        Returns:
-            str: Base64 string của QR code
-        """
-        # Nếu URL khác hoặc chưa có QR → tạo cái mới
-        if self.quiz_url_cached != quiz_url or not self.qr_code_base64:
-            import qrcode
-            from io import BytesIO
-            import base64
-
-            # Tạo QR code object
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=2,
-            )
-            qr.add_data(quiz_url)
-            qr.make(fit=True)
-
-            # Convert ảnh sang Base64
-            img = qr.make_image(fill_color="black", back_color="white")
-            buffer = BytesIO()
-            img.save(buffer, format='PNG')
-            img_str = base64.b64encode(buffer.getvalue()).decode()
-
-            # Lưu vào DB
-            self.qr_code_base64 = img_str
-            self.quiz_url_cached = quiz_url
-            self.qr_generated_at = datetime.utcnow()
-            db.session.commit()
-
-        return self.qr_code_base64
-
-    def get_qr_code_data_url(self):
-        """
-        ✨ QR_CACHE: Trả về data URL để dùng trực tiếp trong <img src="">
-
-        Returns:
-            str: Data URL hoặc None nếu chưa có QR
-            VD: "data:image/png;base64,iVBORw0KGgoAAAANS..."
-        """
-        if self.qr_code_base64:
-            return f"data:image/png;base64,{self.qr_code_base64}"
-        return None
-
 
 # ==================== QUESTION MODEL (CÂU HỎI) ====================
 class Question(db.Model):
@@ -174,16 +107,9 @@ class Question(db.Model):
         return self.answers.filter_by(is_correct=True).first()
 
     def get_answer_distribution(self):
-        """Thống kê % người chọn mỗi đáp án"""
-        total = self.user_answers.count()
-        if total == 0:
-            return {}
-
-        distribution = {}
-        for answer in self.answers.all():
-            count = self.user_answers.filter_by(answer_id=answer.id).count()
-            distribution[answer.answer_text] = round((count / total) * 100, 1)
-        return distribution
+        """Thống kê % người chọn mỗi đáp án (đọc từ bảng rollup, 1 query)"""
+        from app.quiz.analytics import get_answer_distribution
+        return get_answer_distribution(self.id)
 
 
 # ==================== ANSWER MODEL (ĐÁP ÁN) ====================
@@ -214,6 +140,9 @@ class QuizAttempt(db.Model):
     Không cần đăng nhập - chỉ lưu tên
     """
     __tablename__ = 'quiz_attempts'
+    __table_args__ = (
+        db.Index('ix_quiz_attempts_completed_at_id', 'completed_at', 'id'),  # keyset pagination
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id'), nullable=False)
@@ -224,6 +153,10 @@ class QuizAttempt(db.Model):
     user_phone = db.Column(db.String(20))  # SĐT (optional)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))  # Nếu có tài khoản
 
+    # Cột tra cứu (tự điền - xem app/quiz/lookup.py): tên bỏ dấu, email lowercase
+    search_name = db.Column(db.String(200), index=True)
+    search_email = db.Column(db.String(200), index=True)
+
     # Trạng thái làm bài
     started_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime)
@@ -248,35 +181,76 @@ class QuizAttempt(db.Model):
         return f'<QuizAttempt {self.user_name} - Quiz {self.quiz_id}>'
 
     def calculate_score(self):
-        """Tính điểm cho lượt làm bài"""
+        """
+        Tính điểm cho lượt làm bài
+        Điểm từng câu lấy từ answer key trong RAM → 1 query + 1 lượt duyệt câu trả lời
+        """
         if not self.is_completed:
             return
 
-        quiz = Quiz.query.get(self.quiz_id)
-        total_points = sum(q.points for q in quiz.questions.all())
+        from app.quiz.answer_key import get_answer_key
+        answer_key = get_answer_key(self.quiz_id)
 
-        if total_points == 0:
+        if answer_key.total_points == 0:
             self.score = 0
             return
 
+        rows = db.session.query(UserAnswer.question_id, UserAnswer.is_correct).filter(
+            UserAnswer.attempt_id == self.id
+        ).all()
+
         earned_points = 0
         correct_count = 0
-        wrong_count = 0
-
-        for user_answer in self.user_answers.all():
-            if user_answer.is_correct:
-                earned_points += user_answer.question.points
+        for question_id, is_correct in rows:
+            if is_correct:
+                question = answer_key.questions.get(question_id)
+                earned_points += question.points if question else 0
                 correct_count += 1
-            else:
-                wrong_count += 1
 
-        self.score = round((earned_points / total_points) * 100, 2)
+        self.score = round((earned_points / answer_key.total_points) * 100, 2)
         self.correct_answers = correct_count
-        self.wrong_answers = wrong_count
-        self.passed = self.score >= quiz.pass_score
+        self.wrong_answers = len(rows) - correct_count
+        self.passed = self.score >= self.quiz.pass_score
 
         db.session.commit()
 
+    def get_questions_detail(self):
+        """
+        Chi tiết từng câu trả lời cho trang kết quả - số query cố định:
+        1 query UserAnswer JOIN Question/Answer + 1 query các đáp án đúng
+        """
+        from sqlalchemy.orm import joinedload
+        from app.quiz.answer_key import get_answer_key
+
+        user_answers = UserAnswer.query.options(
+            joinedload(UserAnswer.question),
+            joinedload(UserAnswer.answer)
+        ).filter(
+            UserAnswer.attempt_id == self.id
+        ).order_by(UserAnswer.id).all()
+
+        answer_key = get_answer_key(self.quiz_id)
+        correct_ids = {
+            answer_key.questions[ua.question_id].correct_answer_id
+            for ua in user_answers if ua.question_id in answer_key.questions
+        }
+        correct_ids.discard(None)
+        correct_answers = {
+            answer.id: answer
+            for answer in Answer.query.filter(Answer.id.in_(correct_ids)).all()
+        } if correct_ids else {}
+
+        questions_detail = []
+        for user_answer in user_answers:
+            question_key = answer_key.questions.get(user_answer.question_id)
+            questions_detail.append({
+                'question': user_answer.question,
+                'selected_answer': user_answer.answer,
+                'correct_answer': correct_answers.get(question_key.correct_answer_id) if question_key else None,
+                'is_correct': user_answer.is_correct
+            })
+        return questions_detail
+
     def get_time_spent_formatted(self):
         """Format thời gian làm bài"""
         if not self.time_spent_seconds:
@@ -309,4 +283,42 @@ class UserAnswer(db.Model):
     answer = db.relationship('Answer', backref='user_answers')
 
     def __repr__(self):
-        return f'<UserAnswer Attempt:{self.attempt_id} Q:{self.question_id}>'
\ No newline at end of file
+        return f'<UserAnswer Attempt:{self.attempt_id} Q:{self.question_id}>'
+
+# ==================== ROLLUP: SỐ LẦN CHỌN MỖI ĐÁP ÁN ====================
+class QuestionAnswerStat(db.Model):
+    """
+    Bảng tổng hợp: mỗi đáp án được chọn bao nhiêu lần (chỉ tính bài đã nộp)
+    Cộng dồn khi nộp bài, trừ khi xoá kết quả → phân bố đáp án chỉ cần 1 query
+    """
+    __tablename__ = 'question_answer_stats'
+
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id', ondelete='CASCADE'), primary_key=True)
+    answer_id = db.Column(db.Integer, db.ForeignKey('answers.id', ondelete='CASCADE'), primary_key=True)
+    selected_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<QuestionAnswerStat Q:{self.question_id} A:{self.answer_id} = {self.selected_count}>'
+
+
+# ==================== QR CODE (TÁCH KHỎI BẢNG QUIZZES) ====================
+class QuizQRCode(db.Model):
+    """
+    Ảnh QR của đề thi (PNG / SVG) dạng binary
+    Bảng riêng → query Quiz không kéo theo vài KB base64 mỗi dòng
+    """
+    __tablename__ = 'quiz_qr_codes'
+    __table_args__ = (
+        db.UniqueConstraint('quiz_id', 'format', name='uq_quiz_qr_codes_quiz_format'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id', ondelete='CASCADE'), nullable=False)
+    format = db.Column(db.String(10), nullable=False)  # 'png' | 'svg'
+    url = db.Column(db.String(500), nullable=False)  # URL đã mã hoá (đổi slug → tạo lại)
+    version = db.Column(db.String(16), nullable=False)  # hash(url + kiểu render) → ETag / ?v=
+    content = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<QuizQRCode Quiz:{self.quiz_id} {self.format}>'
@@ -0,0 +1,120 @@
+"""
+Quiz QR - Tạo và phục vụ ảnh QR của đề thi
+
+- Không tạo QR trong trang danh sách nữa: ảnh được render lazy khi trình
+  duyệt gọi /admin/quiz/<id>/qr.png (hoặc .svg)
+- Binary lưu ở bảng quiz_qr_codes (không phình bảng quizzes) + cache RAM
+- version = hash(URL + kiểu render): dùng làm ETag và tham số ?v= trên
+  URL ảnh → cache trình duyệt 1 năm, đổi slug thì URL ảnh tự đổi
+"""
+
+import hashlib
+from io import BytesIO
+
+from sqlalchemy.exc import IntegrityError
+
+from app import cache, db
+from app.quiz.models import QuizQRCode
+
+# Tăng khi đổi tham số render (box_size, border...) để vô hiệu hoá ảnh cũ
+RENDER_VERSION = 1
+FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+_qr_cache = cache.namespace('quiz_qr', ttl=3600)
+
+
+def qr_version(quiz_url, fmt='png'):
+    """Hash ngắn của URL + kiểu render (ổn định giữa các worker)"""
+    raw = f'{RENDER_VERSION}:{fmt}:{quiz_url}'.encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+
+def _make_qr(quiz_url):
+    import qrcode
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=2,
+    )
+    qr.add_data(quiz_url)
+    qr.make(fit=True)
+    return qr
+
+
+def render_qr(quiz_url, fmt='png'):
+    """Render QR → bytes (PNG qua PIL, SVG dạng path không cần PIL)"""
+    qr = _make_qr(quiz_url)
+    buffer = BytesIO()
+    if fmt == 'svg':
+        from qrcode.image.svg import SvgPathImage
+        qr.make_image(image_factory=SvgPathImage).save(buffer)
+    else:
+        img = qr.make_image(fill_color="black", back_color="white")
+        img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def get_qr(quiz_id, quiz_url, fmt='png', commit=True):
+    """
+    Lấy ảnh QR: RAM → bảng quiz_qr_codes → render mới (và lưu lại)
+
+    Returns:
+        (content: bytes, version: str)
+    """
+    version = qr_version(quiz_url, fmt)
+    cache_key = (quiz_id, fmt)
+
+    def load():
+        row = QuizQRCode.query.filter_by(quiz_id=quiz_id, format=fmt).first()
+        if row is not None and row.version == version:
+            return row.content, version
+
+        content = render_qr(quiz_url, fmt)
+        if row is None:
+            row = QuizQRCode(quiz_id=quiz_id, format=fmt)
+            db.session.add(row)
+        row.url = quiz_url
+        row.version = version
+        row.content = content
+        if commit:
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Request khác vừa lưu cùng ảnh (unique quiz_id + format) → dùng bản vừa render
+                db.session.rollback()
+        return content, version
+
+    # Nhiều request cùng mở QR của 1 đề → chỉ 1 lần query/render
+    return _qr_cache.get_or_set(cache_key, load, version=version)
+
+
+def pregenerate(quizzes, url_for_quiz, formats=('png', 'svg')):
+    """
+    Tạo sẵn QR cho nhiều đề (CLI / nút admin) - 1 commit cho cả lô
+
+    Args:
+        quizzes: list Quiz
+        url_for_quiz: hàm quiz → URL đầy đủ
+    Returns:
+        Số ảnh được render mới
+    """
+    existing = {
+        (row.quiz_id, row.format): row.version
+        for row in db.session.query(QuizQRCode.quiz_id, QuizQRCode.format, QuizQRCode.version)
+    }
+
+    rendered = 0
+    for quiz in quizzes:
+        quiz_url = url_for_quiz(quiz)
+        for fmt in formats:
+            if existing.get((quiz.id, fmt)) != qr_version(quiz_url, fmt):
+                get_qr(quiz.id, quiz_url, fmt, commit=False)
+                rendered += 1
+
+    db.session.commit()
+    return rendered
@@ -8,11 +8,15 @@ Chức năng:
 4. Nộp bài và xem kết quả
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
-from app import db
-from app.quiz.models import Quiz, Question, Answer, QuizAttempt, UserAnswer
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, current_app
+from app import db, limiter
+from app.quiz.models import Quiz, QuizAttempt, UserAnswer
+from app.quiz.answer_key import get_answer_key
+from app.quiz.answer_buffer import parse_answers, validate_answers, flush_answers
+from app.quiz.analytics import record_attempt
+from app.quiz.content import get_bundle, arrange
+from app.quiz.lookup import search as search_attempts, MIN_TERM_LENGTH, MAX_RESULTS
 from datetime import datetime
-import random
 
 quiz_bp = Blueprint('quiz', __name__, url_prefix='/quiz')
 # ==================== TRANG NHẬP THÔNG TIN TRƯỚC KHI LÀM BÀI ====================
@@ -85,22 +89,21 @@ def quiz_take(slug):
         flash('Bạn đã hoàn thành bài quiz này rồi!', 'info')
         return redirect(url_for('quiz.quiz_result', attempt_id=attempt.id))
 
-    # Lấy danh sách câu hỏi
-    questions = quiz.questions.order_by(Question.order).all()
-
-    # Xáo trộn câu hỏi nếu cần
-    if quiz.shuffle_questions:
-        random.shuffle(questions)
-
-    # Xáo trộn đáp án nếu cần
-    for question in questions:
-        answers = list(question.answers.order_by(Answer.order).all())
-        if quiz.shuffle_answers:
-            random.shuffle(answers)
-        question.shuffled_answers = answers
+    # Câu hỏi + đáp án từ bundle cache theo đề (0 query khi cache còn),
+    # xáo trộn theo seed attempt id → tải lại trang không đổi thứ tự
+    questions = arrange(
+        get_bundle(quiz), attempt.id,
+        shuffle_questions=quiz.shuffle_questions,
+        shuffle_answers=quiz.shuffle_answers
+    )
 
-    # Lấy các câu đã trả lời (để highlight)
-    answered_questions = {ua.question_id for ua in attempt.user_answers.all()}
+    # Các câu đã trả lời (checkpoint trước đó) → khôi phục lựa chọn khi tải lại trang
+    selected_answers = dict(
+        db.session.query(UserAnswer.question_id, UserAnswer.answer_id)
+        .filter(UserAnswer.attempt_id == attempt.id)
+        .all()
+    )
+    answered_questions = set(selected_answers)
 
     # Tính thời gian còn lại
     start_time = datetime.fromisoformat(session.get('quiz_start_time'))
@@ -112,68 +115,86 @@ def quiz_take(slug):
                            attempt=attempt,
                            questions=questions,
                            answered_questions=answered_questions,
+                           selected_answers=selected_answers,
+                           checkpoint_seconds=current_app.config.get('QUIZ_CHECKPOINT_SECONDS', 30),
                            remaining_seconds=remaining_seconds)
 
 
 # ==================== LƯU CÂU TRẢ LỜI (AJAX) ====================
-@quiz_bp.route('/answer', methods=['POST'])
-def save_answer():
-    """
-    API lưu câu trả lời của user (AJAX)
-    Được gọi khi user click vào đáp án
-    """
-    data = request.get_json()
+def _get_open_attempt():
+    """Attempt đang làm trong session (None nếu không có hoặc đã nộp)"""
     attempt_id = session.get('current_attempt_id')
-
     if not attempt_id:
-        return jsonify({'success': False, 'message': 'Phiên làm bài không hợp lệ'}), 400
-
+        return None
     attempt = QuizAttempt.query.get(attempt_id)
     if not attempt or attempt.is_completed:
-        return jsonify({'success': False, 'message': 'Không thể lưu câu trả lời'}), 400
+        return None
+    return attempt
+
 
-    question_id = data.get('question_id')
-    answer_id = data.get('answer_id')
+@quiz_bp.route('/answer', methods=['POST'])
+@limiter.limit('quiz_answer_ip', limit=lambda: current_app.config.get('QUIZ_ANSWER_IP_RATE_LIMIT', 2400),
+               window=60, key_by=('ip',))
+@limiter.limit('quiz_answer', limit=lambda: current_app.config.get('QUIZ_ANSWER_RATE_LIMIT', 120),
+               window=60, key_by=('session',))
+def save_answer():
+    """
+    API lưu 1 câu trả lời (AJAX) - giữ cho client cũ.
+    Trang làm bài hiện gom câu trả lời và gửi theo lô qua save_answers_batch.
+    """
+    data = request.get_json(silent=True) or {}
+    attempt = _get_open_attempt()
+    if not attempt:
+        return jsonify({'success': False, 'message': 'Không thể lưu câu trả lời'}), 400
 
-    if not question_id or not answer_id:
+    answers = parse_answers([data])
+    if not answers:
         return jsonify({'success': False, 'message': 'Thiếu thông tin'}), 400
 
-    # Kiểm tra question thuộc quiz này không
-    question = Question.query.get(question_id)
-    if not question or question.quiz_id != attempt.quiz_id:
-        return jsonify({'success': False, 'message': 'Câu hỏi không hợp lệ'}), 400
-
-    # Kiểm tra answer thuộc question này không
-    answer = Answer.query.get(answer_id)
-    if not answer or answer.question_id != question_id:
-        return jsonify({'success': False, 'message': 'Đáp án không hợp lệ'}), 400
-
-    # Xóa câu trả lời cũ (nếu có)
-    UserAnswer.query.filter_by(
-        attempt_id=attempt.id,
-        question_id=question_id
-    ).delete()
-
-    # Lưu câu trả lời mới
-    user_answer = UserAnswer(
-        attempt_id=attempt.id,
-        question_id=question_id,
-        answer_id=answer_id,
-        is_correct=answer.is_correct
-    )
+    answer_key = get_answer_key(attempt.quiz_id)
+    valid, rejected = validate_answers(answer_key, answers)
+    if rejected:
+        return jsonify({'success': False, 'message': 'Câu hỏi hoặc đáp án không hợp lệ'}), 400
 
-    db.session.add(user_answer)
+    answered_count = flush_answers(attempt.id, valid)
     db.session.commit()
 
-    # Đếm số câu đã trả lời
-    answered_count = attempt.user_answers.count()
-    total_questions = attempt.quiz.questions.count()
+    is_correct = next(iter(valid.values()))[1]
+    return jsonify({
+        'success': True,
+        'is_correct': is_correct,
+        'answered_count': answered_count,
+        'total_questions': len(answer_key.questions)
+    })
+
+
+@quiz_bp.route('/answers/batch', methods=['POST'])
+@limiter.limit('quiz_answer_ip', limit=lambda: current_app.config.get('QUIZ_ANSWER_IP_RATE_LIMIT', 2400),
+               window=60, key_by=('ip',))
+@limiter.limit('quiz_answer', limit=lambda: current_app.config.get('QUIZ_ANSWER_RATE_LIMIT', 120),
+               window=60, key_by=('session',))
+def save_answers_batch():
+    """
+    Checkpoint câu trả lời theo lô (định kỳ / khi rời trang qua sendBeacon)
+    Body: {"answers": {"<question_id>": <answer_id>, ...}}
+    """
+    data = request.get_json(force=True, silent=True) or {}
+    attempt = _get_open_attempt()
+    if not attempt:
+        return jsonify({'success': False, 'message': 'Phiên làm bài không hợp lệ'}), 400
+
+    answer_key = get_answer_key(attempt.quiz_id)
+    valid, rejected = validate_answers(answer_key, parse_answers(data.get('answers')))
+
+    answered_count = flush_answers(attempt.id, valid)
+    db.session.commit()
 
     return jsonify({
         'success': True,
-        'is_correct': answer.is_correct,
+        'saved': len(valid),
+        'rejected': rejected,
         'answered_count': answered_count,
-        'total_questions': total_questions
+        'total_questions': len(answer_key.questions)
     })
 
 
@@ -182,6 +203,7 @@ def save_answer():
 def submit_quiz():
     """
     Nộp bài và chuyển đến trang kết quả
+    Form gửi kèm field ẩn `answers` (JSON) → flush 1 lần trước khi chấm điểm
     """
     attempt_id = session.get('current_attempt_id')
 
@@ -192,16 +214,35 @@ def submit_quiz():
     attempt = QuizAttempt.query.get(attempt_id)
     if not attempt or attempt.is_completed:
         flash('Bài quiz này đã được nộp rồi!', 'info')
-        return redirect(url_for('quiz.quiz_result', attempt_id=attempt.id))
+        return redirect(url_for('quiz.quiz_result', attempt_id=attempt_id))
+
+    # Ghi các câu trả lời còn trong buffer của trình duyệt
+    answers = parse_answers(request.form.get('answers'))
+    if answers:
+        valid, _ = validate_answers(get_answer_key(attempt.quiz_id), answers)
+        flush_answers(attempt.id, valid)
 
     # Tính thời gian làm bài
     start_time = datetime.fromisoformat(session.get('quiz_start_time'))
     time_spent = int((datetime.utcnow() - start_time).total_seconds())
 
-    # Cập nhật attempt
-    attempt.is_completed = True
-    attempt.completed_at = datetime.utcnow()
-    attempt.time_spent_seconds = time_spent
+    # Cập nhật attempt - UPDATE có điều kiện: 2 lần submit cùng lúc thì chỉ 1
+    # lần chuyển được is_completed, lần còn lại không chấm / không cộng rollup
+    completed = QuizAttempt.query.filter(
+        QuizAttempt.id == attempt.id,
+        QuizAttempt.is_completed == False  # noqa: E712
+    ).update({
+        'is_completed': True,
+        'completed_at': datetime.utcnow(),
+        'time_spent_seconds': time_spent,
+    })
+    if completed != 1:
+        db.session.rollback()
+        flash('Bài quiz này đã được nộp rồi!', 'info')
+        return redirect(url_for('quiz.quiz_result', attempt_id=attempt_id))
+
+    # Cộng dồn phân bố đáp án (rollup) - chung transaction với lần commit bên dưới
+    record_attempt(attempt.id)
 
     # Tính điểm
     attempt.calculate_score()
@@ -231,19 +272,8 @@ def quiz_result(attempt_id):
 
     quiz = attempt.quiz
 
-    # Lấy chi tiết các câu trả lời
-    questions_detail = []
-    for user_answer in attempt.user_answers.all():
-        question = user_answer.question
-        selected_answer = user_answer.answer
-        correct_answer = question.get_correct_answer()
-
-        questions_detail.append({
-            'question': question,
-            'selected_answer': selected_answer,
-            'correct_answer': correct_answer,
-            'is_correct': user_answer.is_correct
-        })
+    # Chi tiết các câu trả lời (số query cố định, đáp án đúng lấy từ answer key)
+    questions_detail = attempt.get_questions_detail()
 
     return render_template('quiz/quiz_result.html',
                            attempt=attempt,
@@ -256,21 +286,19 @@ def quiz_result(attempt_id):
 def public_results():
     """
     Trang xem lại kết quả của các lần làm bài (public)
-    Search bằng tên hoặc email
+    Search bằng tên (không dấu cũng được) hoặc email, phân trang keyset,
+    tối đa MAX_RESULTS kết quả
     """
     search_query = request.args.get('search', '').strip()
-
-    if not search_query:
-        return render_template('quiz/public_results.html', attempts=[])
-
-    # Tìm kiếm theo tên hoặc email
-    attempts = QuizAttempt.query.filter(
-        QuizAttempt.is_completed == True
-    ).filter(
-        db.or_(
-            QuizAttempt.user_name.ilike(f'%{search_query}%'),
-            QuizAttempt.user_email.ilike(f'%{search_query}%')
-        )
-    ).order_by(QuizAttempt.completed_at.desc()).all()
-
-    return render_template('quiz/public_results.html', attempts=attempts, search_query=search_query)
\ No newline at end of file
+    cursor = request.args.get('after')
+
+    attempts, next_cursor, capped = search_attempts(search_query, cursor)
+
+    return render_template('quiz/public_results.html',
+                           attempts=attempts,
+                           search_query=search_query,
+                           next_cursor=next_cursor,
+                           capped=capped,
+                           is_first_page=not cursor,
+                           min_length=MIN_TERM_LENGTH,
+                           max_results=MAX_RESULTS)
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+Quiz Stats - Thống kê theo đề bằng 1 query GROUP BY
+
+Thay cho vòng lặp mỗi đề 6+ query (questions.count, attempts.count,
+get_pass_percentage, get_average_score...), toàn bộ số liệu của mọi đề
+được tính trong 1 query (COUNT / SUM(CASE) / AVG) rồi cache lại.
+
+Cache tự xoá sau commit có thay đổi QuizAttempt (bắt đầu / nộp / xoá bài),
+thêm/xoá câu hỏi hoặc sửa đề (pass_score, tiêu đề).
+"""
+
+from collections import namedtuple
+
+from sqlalchemy import and_, case, event, func, select
+from sqlalchemy.orm import object_session
+
+from app import cache, db
+from app.quiz.models import Quiz, Question, QuizAttempt
+
+_stats_cache = cache.namespace('quiz_stats', ttl=300, stale_ttl=60)
+
+QuizStats = namedtuple('QuizStats', [
+    'quiz_id', 'title', 'total_questions', 'total_attempts',
+    'completed_attempts', 'passed_attempts', 'pass_rate', 'avg_score'
+])
+TopQuiz = namedtuple('TopQuiz', ['title', 'attempt_count'])
+
+
+def _load_all_stats():
+    """1 query: số liệu của tất cả đề → {quiz_id: QuizStats}"""
+    question_count = select(func.count(Question.id)).where(
+        Question.quiz_id == Quiz.id
+    ).correlate(Quiz).scalar_subquery()
+
+    completed = QuizAttempt.is_completed == True  # noqa: E712
+    rows = db.session.query(
+        Quiz.id,
+        Quiz.title,
+        question_count,
+        func.count(QuizAttempt.id),
+        func.sum(case((completed, 1), else_=0)),
+        func.sum(case((and_(completed, QuizAttempt.score >= Quiz.pass_score), 1), else_=0)),
+        func.avg(case((completed, QuizAttempt.score))),
+    ).outerjoin(
+        QuizAttempt, QuizAttempt.quiz_id == Quiz.id
+    ).group_by(Quiz.id, Quiz.title).all()
+
+    stats = {}
+    for quiz_id, title, questions, attempts, done, passed, avg_score in rows:
+        done = int(done or 0)
+        passed = int(passed or 0)
+        stats[quiz_id] = QuizStats(
+            quiz_id=quiz_id,
+            title=title,
+            total_questions=int(questions or 0),
+            total_attempts=int(attempts or 0),
+            completed_attempts=done,
+            passed_attempts=passed,
+            pass_rate=round(passed / done * 100, 1) if done else 0,
+            avg_score=round(float(avg_score), 1) if avg_score is not None else 0,
+        )
+    return stats
+
+
+def get_all_stats():
+    return _stats_cache.get_or_set('all', _load_all_stats)
+
+
+def get_quiz_stats(quiz_id):
+    """Số liệu của 1 đề (đề mới chưa có trong cache → trả về số 0)"""
+    stats = get_all_stats().get(quiz_id)
+    if stats is None:
+        return QuizStats(quiz_id, None, 0, 0, 0, 0, 0, 0)
+    return stats
+
+
+def get_overview(top=5):
+    """Tổng quan cho trang thống kê - tính từ cùng 1 bộ số liệu"""
+    stats = list(get_all_stats().values())
+    completed = sum(s.completed_attempts for s in stats)
+    passed = sum(s.passed_attempts for s in stats)
+
+    popular = sorted(
+        (s for s in stats if s.completed_attempts),
+        key=lambda s: s.completed_attempts, reverse=True
+    )[:top]
+
+    return {
+        'total_quizzes': len(stats),
+        'total_questions': sum(s.total_questions for s in stats),
+        'total_attempts': completed,
+        'top_quizzes': [TopQuiz(s.title, s.completed_attempts) for s in popular],
+        'passed_count': passed,
+        'failed_count': completed - passed,
+    }
+
+
+def invalidate_stats():
+    _stats_cache.invalidate()
+
+
+# ==================== AUTO INVALIDATE ====================
+def _schedule_invalidate(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        cache.invalidate_after_commit(session, 'quiz_stats')
+
+
+for _model, _events in (
+    (QuizAttempt, ('after_insert', 'after_update', 'after_delete')),
+    (Question, ('after_insert', 'after_delete')),
+    (Quiz, ('after_insert', 'after_update', 'after_delete')),
+):
+    for _event_name in _events:
+        event.listen(_model, _event_name, _schedule_invalidate)
@@ -0,0 +1,349 @@
+"""
+Rate Limiter - Giới hạn tần suất request theo IP / session / email
+
+Thay cho việc đếm trong cookie session (xoá cookie là reset), bộ đếm
+được lưu phía server:
+- MemoryBackend ('memory://'): sliding log trong process, mỗi key là 1
+  deque(maxlen=limit). append/popleft của deque là atomic dưới GIL nên
+  không cần lock.
+- DatabaseBackend ('database://'): bảng rate_limit_counters, ước lượng
+  sliding window từ 2 fixed window liên tiếp. Dùng khi chạy nhiều
+  worker/instance (bộ đếm dùng chung).
+
+Usage:
+    @limiter.limit('chatbot', limit=15, window=3600, key_by=('ip', 'session'))
+    def send_message():
+        ...
+"""
+
+import secrets
+import time
+from collections import deque, namedtuple
+from functools import wraps
+
+from flask import current_app, g, jsonify, request, session
+
+# allowed: được phép hay không | remaining: số lượt còn lại
+# reset_after: số giây đến khi có thêm lượt
+RateLimitResult = namedtuple('RateLimitResult', ['allowed', 'limit', 'remaining', 'reset_after'])
+
+
+# ==================== HELPERS ====================
+def get_client_ip():
+    """
+    Lấy IP thật của client.
+    Render đứng sau 1 proxy → tin RATELIMIT_PROXY_COUNT entry cuối của X-Forwarded-For
+    (client tự gửi X-Forwarded-For giả thì chỉ nằm ở đầu danh sách).
+    """
+    proxy_count = int(current_app.config.get('RATELIMIT_PROXY_COUNT', 1))
+    route = request.access_route
+    if proxy_count > 0 and len(route) >= proxy_count and request.headers.get('X-Forwarded-For'):
+        return route[-proxy_count]
+    return request.remote_addr or 'unknown'
+
+
+def get_session_token():
+    """Token ngẫu nhiên gắn với session (không phụ thuộc dữ liệu người dùng)"""
+    token = session.get('_rl_sid')
+    if not token:
+        token = secrets.token_hex(8)
+        session['_rl_sid'] = token
+    return token
+
+
+def get_request_email():
+    """Email trong form/JSON (dùng cho login, check-lockout)"""
+    email = request.form.get('email')
+    if not email and request.is_json:
+        email = (request.get_json(silent=True) or {}).get('email')
+    return (email or '').strip().lower() or None
+
+
+KEY_FUNCS = {
+    'ip': get_client_ip,
+    'session': get_session_token,
+    'email': get_request_email,
+}
+
+
+def _resolve(value):
+    """limit/window có thể là hằng số hoặc callable (đọc config lúc chạy)"""
+    return int(value() if callable(value) else value)
+
+
+# ==================== BACKEND: MEMORY ====================
+class MemoryBackend:
+    """Sliding log trong process - không lock, tự dọn key hết hạn"""
+
+    SWEEP_EVERY = 1000  # sau mỗi N lượt hit thì dọn các bucket rỗng
+
+    def __init__(self):
+        self._buckets = {}
+        self._windows = {}  # key → window (giây) của rule đã tạo bucket, dùng khi dọn
+        self._hits = 0
+
+    def _bucket(self, key, limit):
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.maxlen != limit:
+            # setdefault atomic: 2 thread cùng tạo thì chỉ 1 deque được giữ lại
+            bucket = self._buckets.setdefault(key, deque(maxlen=limit))
+            if bucket.maxlen != limit:
+                bucket = self._buckets[key] = deque(bucket, maxlen=limit)
+        return bucket
+
+    @staticmethod
+    def _prune(bucket, cutoff):
+        try:
+            while bucket and bucket[0] <= cutoff:
+                bucket.popleft()
+        except IndexError:
+            # Thread khác vừa popleft phần tử cuối
+            pass
+
+    def _result(self, bucket, limit, window, now, allowed):
+        remaining = max(0, limit - len(bucket))
+        try:
+            reset_after = max(0, int(bucket[0] + window - now)) if bucket else 0
+        except IndexError:
+            reset_after = 0
+        return RateLimitResult(allowed, limit, remaining, reset_after)
+
+    def hit(self, key, limit, window):
+        now = time.time()
+        bucket = self._bucket(key, limit)
+        self._windows[key] = window
+        self._prune(bucket, now - window)
+
+        self._hits += 1
+        if self._hits % self.SWEEP_EVERY == 0:
+            self.sweep()
+
+        if len(bucket) >= limit:
+            return self._result(bucket, limit, window, now, False)
+
+        bucket.append(now)
+        return self._result(bucket, limit, window, now, True)
+
+    def peek(self, key, limit, window):
+        now = time.time()
+        bucket = self._buckets.get(key)
+        if not bucket:
+            return RateLimitResult(True, limit, limit, 0)
+        self._prune(bucket, now - window)
+        return self._result(bucket, limit, window, now, len(bucket) < limit)
+
+    def reset(self, key):
+        self._buckets.pop(key, None)
+        self._windows.pop(key, None)
+
+    def sweep(self, max_window=86400):
+        """
+        Xoá các bucket đã hết hạn để tránh phình RAM theo số IP.
+        Mỗi bucket hết hạn theo window của chính rule đó (login_fail 1800s,
+        chatbot 3600s...), không theo window của lượt hit gọi sweep;
+        max_window chỉ dùng cho bucket không rõ window.
+        """
+        now = time.time()
+        for key, bucket in list(self._buckets.items()):
+            cutoff = now - self._windows.get(key, max_window)
+            try:
+                expired = not bucket or bucket[-1] <= cutoff
+            except IndexError:
+                expired = True
+            if expired:
+                self._buckets.pop(key, None)
+                self._windows.pop(key, None)
+
+
+# ==================== BACKEND: DATABASE ====================
+class DatabaseBackend:
+    """
+    Bộ đếm dùng chung qua DB (nhiều worker / nhiều instance).
+    Sliding window ≈ count(window hiện tại) + count(window trước) * phần còn lại.
+    Chạy trên connection riêng (engine.begin) để không đụng transaction của request.
+    """
+
+    CLEANUP_EVERY = 200
+
+    def __init__(self):
+        self._hits = 0
+
+    @staticmethod
+    def _table():
+        from app.models import RateLimitCounter
+        return RateLimitCounter.__table__
+
+    @staticmethod
+    def _engine():
+        from app import db
+        return db.engine
+
+    def _estimate(self, conn, table, key, window, now):
+        from sqlalchemy import select
+
+        current = int(now // window)
+        rows = dict(conn.execute(
+            select(table.c.window_start, table.c.count).where(
+                table.c.key == key,
+                table.c.window_start.in_((current, current - 1))
+            )
+        ).all())
+        elapsed = (now % window) / window
+        estimate = rows.get(current, 0) + rows.get(current - 1, 0) * (1 - elapsed)
+        reset_after = int(window - (now % window))
+        return current, estimate, reset_after
+
+    def _increment(self, conn, table, key, window_start, expires_at):
+        engine = conn.engine
+        values = {'key': key, 'window_start': window_start, 'count': 1, 'expires_at': expires_at}
+
+        if engine.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif engine.dialect.name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            insert = None
+
+        if insert is not None:
+            stmt = insert(table).values(**values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.key, table.c.window_start],
+                set_={'count': table.c.count + 1}
+            )
+            conn.execute(stmt)
+            return
+
+        updated = conn.execute(
+            table.update()
+            .where(table.c.key == key, table.c.window_start == window_start)
+            .values(count=table.c.count + 1)
+        ).rowcount
+        if not updated:
+            conn.execute(table.insert().values(**values))
+
+    def hit(self, key, limit, window):
+        table = self._table()
+        now = time.time()
+
+        with self._engine().begin() as conn:
+            current, estimate, reset_after = self._estimate(conn, table, key, window, now)
+            if estimate >= limit:
+                return RateLimitResult(False, limit, 0, reset_after)
+
+            self._increment(conn, table, key, current, int(now + 2 * window))
+
+            self._hits += 1
+            if self._hits % self.CLEANUP_EVERY == 0:
+                conn.execute(table.delete().where(table.c.expires_at < int(now)))
+
+        remaining = max(0, int(limit - estimate - 1))
+        return RateLimitResult(True, limit, remaining, reset_after)
+
+    def peek(self, key, limit, window):
+        table = self._table()
+        with self._engine().connect() as conn:
+            _, estimate, reset_after = self._estimate(conn, table, key, window, time.time())
+        remaining = max(0, int(limit - estimate))
+        return RateLimitResult(estimate < limit, limit, remaining, reset_after if estimate >= limit else 0)
+
+    def reset(self, key):
+        table = self._table()
+        with self._engine().begin() as conn:
+            conn.execute(table.delete().where(table.c.key == key))
+
+
+BACKENDS = {
+    'memory': MemoryBackend,
+    'database': DatabaseBackend,
+}
+
+
+# ==================== LIMITER ====================
+class RateLimiter:
+    """Extension Flask: limiter.init_app(app) + decorator @limiter.limit(...)"""
+
+    def __init__(self, app=None):
+        self.backend = MemoryBackend()
+        self.enabled = True
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        url = app.config.get('RATELIMIT_STORAGE_URL', 'memory://') or 'memory://'
+        scheme = url.split('://', 1)[0]
+        if scheme not in BACKENDS:
+            raise ValueError(f'RATELIMIT_STORAGE_URL không hỗ trợ: {url}')
+        self.backend = BACKENDS[scheme]()
+        self.enabled = app.config.get('RATELIMIT_ENABLED', True)
+        app.extensions['rate_limiter'] = self
+
+    @staticmethod
+    def make_key(name, scope, ident):
+        return f'rl:{name}:{scope}:{ident}'
+
+    def hit(self, name, scope, ident, limit, window):
+        if not self.enabled:
+            return RateLimitResult(True, limit, limit, 0)
+        return self.backend.hit(self.make_key(name, scope, ident), limit, window)
+
+    def peek(self, name, scope, ident, limit, window):
+        if not self.enabled:
+            return RateLimitResult(True, limit, limit, 0)
+        return self.backend.peek(self.make_key(name, scope, ident), limit, window)
+
+    def reset(self, name, scope, ident):
+        self.backend.reset(self.make_key(name, scope, ident))
+
+    def limit(self, name, limit, window, key_by=('ip',), methods=None, on_limited=None):
+        """
+        Decorator giới hạn request cho 1 view.
+
+        Args:
+            name: Tên rule (vd: 'chatbot', 'login')
+            limit / window: Số lượt tối đa trong window giây (số hoặc callable)
+            key_by: Các scope đếm độc lập: 'ip', 'session', 'email'
+            methods: Chỉ áp dụng cho các method này (vd: ('POST',))
+            on_limited: Hàm (result) → response khi vượt giới hạn
+        """
+
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                if not self.enabled or (methods and request.method not in methods):
+                    return f(*args, **kwargs)
+
+                max_hits = _resolve(limit)
+                seconds = _resolve(window)
+                tightest = None
+
+                for scope in key_by:
+                    ident = KEY_FUNCS[scope]()
+                    if not ident:
+                        continue
+                    result = self.hit(name, scope, ident, max_hits, seconds)
+                    if tightest is None or result.remaining < tightest.remaining or not result.allowed:
+                        tightest = result
+                    if not result.allowed:
+                        break
+
+                g.rate_limit = tightest
+                if tightest is not None and not tightest.allowed:
+                    if on_limited is not None:
+                        return on_limited(tightest)
+                    return self.default_limited_response(tightest)
+
+                return f(*args, **kwargs)
+
+            return decorated_function
+
+        return decorator
+
+    @staticmethod
+    def default_limited_response(result):
+        response = jsonify({
+            'success': False,
+            'message': f'Bạn thao tác quá nhanh. Vui lòng thử lại sau {result.reset_after} giây.'
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = str(max(1, result.reset_after))
+        return response
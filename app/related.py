@@ -0,0 +1,247 @@
+"""
+Related Items - Item liên quan tính sẵn cho sản phẩm / blog / dự án
+
+- Mỗi item → văn bản (tên, mô tả, thành phần, từ khoá...) → TF-IDF (NumPy)
+- Điểm = cosine(TF-IDF) + AFFINITY_BONUS nếu cùng danh mục / cùng loại dự án
+- Lưu top-N id vào bảng related_items (1 dòng / item), nạp cả bảng vào RAM
+  thành dict → lúc render chỉ tra dict O(1)
+- Nội dung đổi (sửa/thêm/xoá/ẩn) → sau commit hẹn rebuild nền (debounce)
+  cho đúng loại đó; trong lúc chờ, trang dùng danh sách cũ hoặc fallback
+
+Tính theo block (BLOCK_ROWS dòng × n cột) nên RAM ~ n × MAX_FEATURES × 4 bytes
+cho ma trận TF-IDF, không cần ma trận n × n.
+
+Usage:
+    flask rebuild-related            # cả 3 loại
+    flask rebuild-related --kind blog
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+from datetime import datetime
+from html import unescape
+
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+
+from app import cache, db
+from app.models import Product, Category, Blog, Project, RelatedItem
+
+KINDS = ('product', 'blog', 'project')
+TOP_N = 8
+MAX_FEATURES = 2048
+AFFINITY_BONUS = 0.15
+BLOCK_ROWS = 256
+MAX_TEXT_CHARS = 5000
+
+_index_cache = cache.namespace('related_index')
+_app = None
+_timers = {}
+_timers_lock = threading.Lock()
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_TAG_RE = re.compile(r'<[^>]+>')
+_STOPWORDS = frozenset('''
+    và của là các cho với được trong có những một này không từ đến để khi theo
+    như cũng đã sẽ nên thì mà bởi tại trên dưới về ra vào rất nhiều hơn
+    the and for with from that this
+'''.split())
+
+
+def init_app(app):
+    """Giữ app để thread rebuild nền mở app context; đọc cấu hình"""
+    global _app, TOP_N
+    _app = app
+    TOP_N = app.config.get('RELATED_TOP_N', TOP_N)
+
+
+# ==================== VĂN BẢN CỦA TỪNG ITEM ====================
+def _join(*parts):
+    text = []
+    for part in parts:
+        if not part:
+            continue
+        if isinstance(part, (list, tuple)):
+            text.extend(str(p) for p in part)
+        elif isinstance(part, dict):
+            text.extend(f'{k} {v}' for k, v in part.items())
+        else:
+            text.append(str(part))
+    return ' '.join(text)
+
+
+def _documents(kind):
+    """[(id, nhóm affinity, văn bản)] của các item đang hiển thị - 1 query"""
+    if kind == 'product':
+        rows = db.session.query(
+            Product.id, Product.category_id, Category.name, Product.name, Product.description,
+            Product.composition, Product.application, Product.standards
+        ).outerjoin(Category, Category.id == Product.category_id).filter(
+            Product.is_active == True  # noqa: E712
+        ).order_by(Product.id)
+        # Tên sản phẩm lặp 2 lần → trọng số cao hơn mô tả
+        return [(r[0], r[1], _join(r[3], r[3], r[2], r[4], r[5], r[6], r[7])) for r in rows]
+
+    if kind == 'blog':
+        rows = db.session.query(
+            Blog.id, Blog.title, Blog.excerpt, Blog.meta_keywords, Blog.focus_keyword, Blog.content
+        ).filter(Blog.is_active == True).order_by(Blog.id)  # noqa: E712
+        return [
+            (r[0], None, _join(r[1], r[1], r[2], r[3], r[4], unescape(_TAG_RE.sub(' ', r[5] or ''))[:MAX_TEXT_CHARS]))
+            for r in rows
+        ]
+
+    rows = db.session.query(
+        Project.id, Project.project_type, Project.title, Project.description,
+        Project.location, Project.products_used
+    ).filter(Project.is_active == True).order_by(Project.id)  # noqa: E712
+    return [(r[0], r[1], _join(r[2], r[2], r[1], r[3], r[4], r[5])) for r in rows]
+
+
+def tokenize(text):
+    return [
+        token for token in _TOKEN_RE.findall(text.lower())
+        if len(token) > 1 and token not in _STOPWORDS and not token.isdigit()
+    ]
+
+
+# ==================== TF-IDF + TOP-N ====================
+def compute_related(ids, groups, texts, top_n=None):
+    """
+    Returns:
+        {item_id: [related_id, ...]} theo điểm giảm dần
+    """
+    import numpy as np
+
+    top_n = top_n or TOP_N
+    n = len(ids)
+    if n < 2:
+        return {item_id: [] for item_id in ids}
+
+    counts = [Counter(tokenize(text)) for text in texts]
+    df = Counter()
+    for c in counts:
+        df.update(c.keys())
+
+    # Bỏ từ chỉ xuất hiện ở 1 item (không tạo liên kết), giữ MAX_FEATURES từ phổ biến nhất
+    vocab = [term for term, freq in df.most_common() if freq > 1][:MAX_FEATURES]
+    column = {term: j for j, term in enumerate(vocab)}
+
+    matrix = np.zeros((n, len(vocab)), dtype=np.float32)
+    for i, c in enumerate(counts):
+        for term, tf in c.items():
+            j = column.get(term)
+            if j is not None:
+                matrix[i, j] = 1.0 + math.log(tf)  # sublinear tf
+
+    if vocab:
+        idf = np.log((1.0 + n) / (1.0 + np.array([df[t] for t in vocab], dtype=np.float32))) + 1.0
+        matrix *= idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+
+    group_codes = {}
+    group_array = np.array(
+        [-1 if g is None else group_codes.setdefault(g, len(group_codes)) for g in groups], dtype=np.int64
+    )
+    ids_array = np.asarray(ids)
+    k = min(top_n, n - 1)
+
+    result = {}
+    for start in range(0, n, BLOCK_ROWS):
+        stop = min(start + BLOCK_ROWS, n)
+        scores = matrix[start:stop] @ matrix.T  # (block × n) cosine
+
+        same_group = (group_array[start:stop, None] == group_array[None, :]) & (group_array[start:stop, None] >= 0)
+        scores += AFFINITY_BONUS * same_group
+        scores[np.arange(stop - start), np.arange(start, stop)] = -np.inf  # bỏ chính nó
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        for row in range(stop - start):
+            candidates = top[row][np.argsort(-scores[row, top[row]], kind='stable')]
+            result[ids[start + row]] = [
+                int(ids_array[j]) for j in candidates if scores[row, j] > 0
+            ]
+    return result
+
+
+# ==================== LƯU / ĐỌC INDEX ====================
+def rebuild(kinds=KINDS):
+    """Tính lại index cho các loại `kinds`, ghi bảng related_items. Returns: {kind: số item}"""
+    counts = {}
+    table = RelatedItem.__table__
+    for kind in kinds:
+        documents = _documents(kind)
+        related = compute_related(
+            [d[0] for d in documents], [d[1] for d in documents], [d[2] for d in documents]
+        )
+        now = datetime.utcnow()
+        rows = [
+            {'kind': kind, 'item_id': item_id, 'related_ids': ','.join(map(str, ids)), 'updated_at': now}
+            for item_id, ids in related.items()
+        ]
+        db.session.execute(table.delete().where(table.c.kind == kind))
+        if rows:
+            db.session.execute(table.insert(), rows)
+        db.session.commit()
+        _index_cache.invalidate(kind)
+        counts[kind] = len(rows)
+    return counts
+
+
+def _load_index(kind):
+    return {
+        item_id: tuple(int(x) for x in related_ids.split(',') if x)
+        for item_id, related_ids in db.session.query(RelatedItem.item_id, RelatedItem.related_ids).filter(
+            RelatedItem.kind == kind
+        )
+    }
+
+
+def related_ids(kind, item_id):
+    """Id item liên quan (đã sắp theo điểm) - tra dict trong RAM"""
+    if kind not in KINDS:
+        return ()
+    return _index_cache.get_or_set(kind, lambda: _load_index(kind)).get(item_id, ())
+
+
+# ==================== REFRESH KHI NỘI DUNG ĐỔI ====================
+def _rebuild_in_background(kind):
+    with _timers_lock:
+        _timers.pop(kind, None)
+    try:
+        with _app.app_context():
+            rebuild((kind,))
+    except Exception as e:
+        _app.logger.warning(f'Không rebuild được related index ({kind}): {e}')
+
+
+def schedule_rebuild(kind):
+    """Hẹn rebuild sau RELATED_REFRESH_DELAY giây; sửa liên tiếp chỉ rebuild 1 lần"""
+    if _app is None:
+        return
+    delay = _app.config.get('RELATED_REFRESH_DELAY', 10)
+    with _timers_lock:
+        timer = _timers.pop(kind, None)
+        if timer is not None:
+            timer.cancel()
+        timer = threading.Timer(delay, _rebuild_in_background, args=(kind,))
+        timer.daemon = True
+        _timers[kind] = timer
+        timer.start()
+
+
+def _mark_dirty(kind):
+    def handler(mapper, connection, target):
+        session = object_session(target)
+        if session is not None:
+            cache.call_after_commit(session, schedule_rebuild, kind)
+    return handler
+
+
+for _model, _kind in ((Product, 'product'), (Category, 'product'), (Blog, 'blog'), (Project, 'project')):
+    _handler = _mark_dirty(_kind)
+    for _event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event_name, _handler)
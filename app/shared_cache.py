@@ -0,0 +1,330 @@
+"""
+Shared Cache - Dữ liệu đọc nhiều dùng chung giữa các gunicorn worker (mmap)
+
+Mỗi worker giữ riêng 1 bản settings / danh mục menu / index slug → id: thêm
+worker là nhân đôi RAM của các cache đó. Khi SHARED_CACHE_ENABLED:
+
+- Mỗi bảng (settings, categories, slugs) được ghi thành 1 file nhị phân
+  trong SHARED_CACHE_DIR (mặc định /dev/shm → nằm trong RAM, page dùng
+  chung giữa các process): header | index (sắp theo key) | key/value JSON
+- Worker mmap file (read-only) và tra bằng binary search trên memoryview:
+  không nạp cả bảng vào heap, chỉ decode đúng value cần đọc
+- Master (preload_app, hook when_ready trong gunicorn.conf.py) ghi sẵn tất
+  cả bảng trước khi fork; sau đó bảng cũ thì worker đầu tiên đọc tới ghi
+  lại (flock: 1 process ghi, các process khác chờ rồi dùng luôn file đó)
+- Namespace liên quan bị xoá (sau commit, hoặc worker/instance khác báo qua
+  cache bus) → chạm file tombstone; file có built_at <= tombstone là cũ
+
+File format:
+    HEADER: magic 'BRSC' | format | built_at (epoch float) | số entry
+    ENTRY * n: key_off | key_len | value_off | value_len (uint32)
+    BLOB: key (utf-8) + value (JSON utf-8)
+
+Không có fcntl (Windows) hoặc không bật → enabled() = False, các chỗ gọi
+dùng cache in-process như cũ.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows (dev) - không có flock → không dùng shared cache
+    fcntl = None
+
+from app import cache, db
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'BRSC'
+FORMAT = 1
+HEADER = struct.Struct('<4sIdI')
+ENTRY = struct.Struct('<IIII')
+
+_TABLES = {}
+_enabled = False
+_directory = None
+_check_interval = 0.5
+_boot_time = 0.0
+
+
+# ==================== SEGMENT ====================
+class Segment:
+    """1 file bảng đã mmap - tra key bằng binary search, trả memoryview của value"""
+
+    __slots__ = ('mm', 'view', 'count', 'built_at', 'inode', 'size')
+
+    def __init__(self, mm, inode):
+        magic, fmt, built_at, count = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or fmt != FORMAT:
+            raise ValueError('Sai định dạng shared cache')
+        self.mm = mm
+        self.view = memoryview(mm)
+        self.count = count
+        self.built_at = built_at
+        self.inode = inode
+        self.size = len(mm)
+
+    def get(self, key):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key_off, key_len, value_off, value_len = ENTRY.unpack_from(self.mm, HEADER.size + mid * ENTRY.size)
+            probe = self.mm[key_off:key_off + key_len]
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                return self.view[value_off:value_off + value_len]
+        return None
+
+
+def encode(items, built_at):
+    """{key: value JSON được} → bytes của 1 segment"""
+    entries = sorted(
+        (str(key).encode('utf-8'), json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        for key, value in items.items()
+    )
+    blob_start = HEADER.size + ENTRY.size * len(entries)
+    index, blob = bytearray(), bytearray()
+    for key, value in entries:
+        key_off = blob_start + len(blob)
+        blob += key
+        value_off = blob_start + len(blob)
+        blob += value
+        index += ENTRY.pack(key_off, len(key), value_off, len(value))
+    return HEADER.pack(MAGIC, FORMAT, built_at, len(entries)) + bytes(index) + bytes(blob)
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+
+# ==================== BẢNG ====================
+class SharedTable:
+    """
+    1 bảng dữ liệu dùng chung: loader() → {key: value}, cũ đi khi 1 trong
+    các cache namespace `namespaces` bị xoá
+    """
+
+    def __init__(self, name, loader, namespaces=()):
+        self.name = name
+        self.loader = loader
+        self.namespaces = frozenset(namespaces)
+        self._state = None  # Segment, hoặc dict bytes khi không ghi được file
+        self._checked = 0.0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+
+    @property
+    def data_path(self):
+        return os.path.join(_directory, f'{self.name}.bin')
+
+    @property
+    def tomb_path(self):
+        return os.path.join(_directory, f'{self.name}.stale')
+
+    @property
+    def lock_path(self):
+        return os.path.join(_directory, f'{self.name}.lock')
+
+    def _stale_before(self):
+        # File ghi trước lần xoá cache gần nhất (hoặc trước khi app khởi động) là cũ
+        return max(_mtime(self.tomb_path), _boot_time)
+
+    def mark_stale(self):
+        with open(self.tomb_path, 'a'):
+            os.utime(self.tomb_path, None)
+        self._dirty = True
+
+    def _open(self):
+        """mmap file hiện tại nếu còn mới → Segment, None nếu thiếu / cũ"""
+        try:
+            fd = os.open(self.data_path, os.O_RDONLY)
+        except FileNotFoundError:
+            return None
+        try:
+            stat = os.fstat(fd)
+            current = self._state
+            if isinstance(current, Segment) and current.inode == stat.st_ino:
+                segment = current
+            else:
+                segment = Segment(mmap.mmap(fd, stat.st_size, access=mmap.ACCESS_READ), stat.st_ino)
+        finally:
+            os.close(fd)
+        return segment if segment.built_at > self._stale_before() else None
+
+    def write(self):
+        """Chạy loader và ghi file mới (atomic rename) - gọi khi đang giữ flock"""
+        built_at = time.time()  # trước khi query: xoá cache trong lúc query → file này cũ
+        items = self.loader()
+        tmp_path = f'{self.data_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(encode(items, built_at))
+        os.replace(tmp_path, self.data_path)
+        self.rebuilds += 1
+        return items
+
+    def _rebuild(self):
+        with open(self.lock_path, 'a') as lock_file:
+            # Process khác đang ghi → chờ xong rồi dùng luôn file của nó
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                segment = self._open()
+                if segment is not None:
+                    return segment
+                items = self.write()
+                segment = self._open()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        if segment is not None:
+            return segment
+        # Bị xoá cache ngay trong lúc ghi: dùng tạm dữ liệu vừa query, lần sau ghi lại
+        return {
+            str(key).encode('utf-8'): json.dumps(value, ensure_ascii=False).encode('utf-8')
+            for key, value in items.items()
+        }
+
+    def state(self):
+        """Segment (hoặc dict tạm) đang dùng - kiểm tra file tối đa 1 lần / SHARED_CACHE_CHECK_MS"""
+        state = self._state
+        if state is not None and not self._dirty and time.monotonic() - self._checked < _check_interval:
+            return state
+        with self._lock:
+            if self._state is state:
+                self._dirty = False
+                self._checked = time.monotonic()
+                self._state = self._open() or self._rebuild()
+            return self._state
+
+    def get(self, key, default=None):
+        raw = self.state().get(str(key).encode('utf-8'))
+        if raw is None:
+            return default
+        return json.loads(str(raw, 'utf-8'))
+
+    def stats(self):
+        state = self._state
+        if isinstance(state, Segment):
+            info = {'source': 'mmap', 'entries': state.count, 'bytes': state.size, 'built_at': state.built_at}
+        else:
+            info = {'source': 'local' if state is not None else None, 'entries': len(state or ())}
+        return dict(info, rebuilds=self.rebuilds, namespaces=sorted(self.namespaces))
+
+
+def table(name, namespaces=()):
+    """Decorator đăng ký loader của 1 bảng dùng chung"""
+    def decorator(loader):
+        _TABLES[name] = SharedTable(name, loader, namespaces)
+        return loader
+    return decorator
+
+
+# ==================== API ====================
+def init_app(app):
+    global _enabled, _directory, _check_interval, _boot_time
+    if not app.config.get('SHARED_CACHE_ENABLED') or fcntl is None:
+        return
+
+    directory = app.config.get('SHARED_CACHE_DIR')
+    if not directory:
+        # 1 thư mục / database (nhiều app trên cùng máy không đọc nhầm của nhau)
+        digest = hashlib.sha1(str(app.config.get('SQLALCHEMY_DATABASE_URI')).encode('utf-8')).hexdigest()[:8]
+        base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        directory = os.path.join(base, f'bricon-cache-{digest}')
+    os.makedirs(directory, exist_ok=True)
+
+    _directory = directory
+    _check_interval = app.config.get('SHARED_CACHE_CHECK_MS', 500) / 1000
+    # File còn sót từ lần chạy trước (dữ liệu có thể đã đổi lúc app tắt) coi như cũ
+    _boot_time = time.time()
+    _enabled = True
+    cache.subscribe(_on_invalidated)
+
+
+def enabled():
+    return _enabled
+
+
+def get(name, key, default=None):
+    """Value (đã decode JSON) của key trong bảng `name`"""
+    return _TABLES[name].get(key, default)
+
+
+def prebuild(app):
+    """
+    Ghi sẵn mọi bảng (master, trước khi fork) rồi đóng connection DB để
+    worker không dùng chung socket với master
+    """
+    if not _enabled:
+        return
+    with app.app_context():
+        for shared in _TABLES.values():
+            with open(shared.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    shared.write()
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        db.session.remove()
+        db.engine.dispose()
+
+
+def _on_invalidated(names):
+    for shared in _TABLES.values():
+        if not shared.namespaces.isdisjoint(names):
+            shared.mark_stale()
+
+
+def stats():
+    return {
+        'enabled': _enabled,
+        'directory': _directory,
+        'tables': {name: shared.stats() for name, shared in sorted(_TABLES.items())} if _enabled else {},
+    }
+
+
+# ==================== CÁC BẢNG ====================
+@table('settings', namespaces=('settings',))
+def _settings():
+    from app.models import load_settings
+    return load_settings()
+
+
+@table('categories', namespaces=('categories',))
+def _categories():
+    from app.models import Category
+    rows = db.session.query(
+        Category.id, Category.name, Category.slug, Category.image, Category.description
+    ).filter(Category.is_active == True).order_by(Category.id)  # noqa: E712
+    return {'active': [dict(row._mapping) for row in rows]}
+
+
+@table('slugs', namespaces=('detail',))
+def _slugs():
+    """'product:<slug>' → id của mọi item đang hiển thị (trang chi tiết vào bằng slug)"""
+    from app.models import Product, Blog, Project, Job
+
+    items = {}
+    for kind, model in (('product', Product), ('blog', Blog), ('project', Project), ('job', Job)):
+        for item_id, slug in db.session.query(model.id, model.slug).filter(model.is_active == True):  # noqa: E712
+            items[f'{kind}:{slug}'] = item_id
+    return items
+
+
+def menu_categories():
+    """Danh mục menu dạng Snapshot chỉ đọc (thay cho list ORM object mỗi worker)"""
+    from app.detail_cache import Snapshot
+    return [Snapshot(row) for row in get('categories', 'active', ())]
@@ -0,0 +1,326 @@
+"""
+Catalog Snapshot - Xuất / nhập dữ liệu catalog dạng gọn
+
+Định dạng (thư mục):
+    manifest.json          format, version, thời điểm tạo, alembic revision,
+                           mỗi bảng: file, số dòng, cột, sha256
+    categories.jsonl.gz    1 dòng JSON / bản ghi (gzip, mtime=0 → file ổn định)
+    products.jsonl.gz
+    ...
+
+- Export/import stream từng bảng (yield_per + chunk) → RAM phẳng
+- sha256 tính trên nội dung JSONL (chưa nén), import kiểm tra trước khi ghi
+- warm_caches(): nạp snapshot vào cache RAM lúc boot (SNAPSHOT_WARM_PATH) để
+  worker mới recycle không phải query DB cho các request đầu tiên. Dữ liệu
+  warm vẫn theo TTL của cache → tự làm mới từ DB sau vài phút.
+
+Usage:
+    flask snapshot export snapshots/2026-10-19
+    flask snapshot import snapshots/2026-10-19 --mode merge
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from datetime import date, datetime
+
+from sqlalchemy import Date, DateTime, select, text
+
+from app import db
+
+FORMAT = 'bricon-catalog-snapshot'
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+CHUNK_SIZE = 1000
+
+# Thứ tự theo khoá ngoại (categories trước products)
+TABLES = ('categories', 'products', 'blogs', 'projects', 'media', 'settings')
+
+# Bảng → hàm nạp dòng snapshot vào cache RAM (đăng ký bằng @warmer)
+_WARMERS = {}
+
+
+def warmer(table_name):
+    """Decorator: đăng ký hàm warm(rows) cho 1 bảng"""
+    def decorator(fn):
+        _WARMERS[table_name] = fn
+        return fn
+    return decorator
+
+
+def _table(name):
+    return db.metadata.tables[name]
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.decode('latin-1')
+    raise TypeError(f'Không serialize được {type(value).__name__}')
+
+
+def _alembic_revision():
+    try:
+        return db.session.execute(text('SELECT version_num FROM alembic_version')).scalar()
+    except Exception:
+        db.session.rollback()
+        return None
+
+
+# ==================== EXPORT ====================
+def export_snapshot(path, tables=TABLES):
+    """
+    Ghi snapshot vào thư mục `path`
+
+    Returns:
+        manifest (dict)
+    """
+    os.makedirs(path, exist_ok=True)
+    manifest = {
+        'format': FORMAT,
+        'version': FORMAT_VERSION,
+        'created_at': datetime.utcnow().isoformat(),
+        'alembic_revision': _alembic_revision(),
+        'tables': {},
+    }
+
+    for name in tables:
+        table = _table(name)
+        filename = f'{name}.jsonl.gz'
+        digest = hashlib.sha256()
+        count = 0
+
+        query = select(table).order_by(*table.primary_key.columns)
+        result = db.session.execute(query.execution_options(yield_per=CHUNK_SIZE))
+
+        with open(os.path.join(path, filename), 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as out:
+                for row in result.mappings():
+                    line = json.dumps(dict(row), ensure_ascii=False, default=_json_default,
+                                      separators=(',', ':')).encode('utf-8') + b'\n'
+                    digest.update(line)
+                    out.write(line)
+                    count += 1
+
+        manifest['tables'][name] = {
+            'file': filename,
+            'rows': count,
+            'columns': [column.name for column in table.columns],
+            'sha256': digest.hexdigest(),
+        }
+
+    with open(os.path.join(path, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+# ==================== ĐỌC SNAPSHOT ====================
+class SnapshotError(Exception):
+    pass
+
+
+def read_manifest(path):
+    manifest_path = os.path.join(path, MANIFEST)
+    if not os.path.exists(manifest_path):
+        raise SnapshotError(f'Không tìm thấy {manifest_path}')
+
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    if manifest.get('format') != FORMAT:
+        raise SnapshotError('Không phải snapshot catalog')
+    if manifest.get('version', 0) > FORMAT_VERSION:
+        raise SnapshotError(f"Snapshot version {manifest['version']} mới hơn bản hỗ trợ ({FORMAT_VERSION})")
+    return manifest
+
+
+def _iter_lines(path, info):
+    with gzip.open(os.path.join(path, info['file']), 'rb') as f:
+        yield from f
+
+
+def verify(path, manifest=None):
+    """Kiểm tra số dòng + sha256 từng bảng. Returns: list lỗi (rỗng = OK)"""
+    manifest = manifest or read_manifest(path)
+    errors = []
+    for name, info in manifest['tables'].items():
+        digest = hashlib.sha256()
+        count = 0
+        try:
+            for line in _iter_lines(path, info):
+                digest.update(line)
+                count += 1
+        except (OSError, EOFError) as e:
+            errors.append(f'{name}: {e}')
+            continue
+        if count != info['rows']:
+            errors.append(f"{name}: {count} dòng, manifest ghi {info['rows']}")
+        elif digest.hexdigest() != info['sha256']:
+            errors.append(f'{name}: sai checksum')
+    return errors
+
+
+def iter_rows(path, name, manifest=None):
+    """Duyệt các bản ghi (dict) của 1 bảng, đã chuyển lại kiểu ngày giờ"""
+    manifest = manifest or read_manifest(path)
+    info = manifest['tables'][name]
+    table = _table(name)
+    date_columns = {
+        column.name: column.type for column in table.columns
+        if isinstance(column.type, (DateTime, Date))
+    }
+    known = set(table.columns.keys())
+
+    for line in _iter_lines(path, info):
+        row = json.loads(line)
+        for column_name, column_type in date_columns.items():
+            value = row.get(column_name)
+            if value:
+                value = datetime.fromisoformat(value)
+                row[column_name] = value.date() if not isinstance(column_type, DateTime) else value
+        # Cột đã bị xoá khỏi model sau khi export → bỏ qua
+        yield {key: value for key, value in row.items() if key in known}
+
+
+# ==================== IMPORT ====================
+def _dangling_fk_columns(table, names):
+    """Cột khoá ngoại trỏ tới bảng KHÔNG có trong snapshot (vd users) → {cột: bảng đích}"""
+    result = {}
+    for column in table.columns:
+        for fk in column.foreign_keys:
+            if fk.column.table.name not in names and column.nullable:
+                result[column.name] = fk.column
+    return result
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _insert_statement(table, mode):
+    if mode != 'merge':
+        return table.insert()
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise SnapshotError(f'Mode merge chưa hỗ trợ {dialect}')
+
+    stmt = insert(table)
+    primary_keys = [column.name for column in table.primary_key.columns]
+    return stmt.on_conflict_do_update(
+        index_elements=primary_keys,
+        set_={column.name: stmt.excluded[column.name]
+              for column in table.columns if column.name not in primary_keys}
+    )
+
+
+def _reset_sequence(table):
+    """PostgreSQL: đưa sequence id về MAX(id) sau khi insert id tường minh"""
+    if db.session.get_bind().dialect.name != 'postgresql' or 'id' not in table.c:
+        return
+    db.session.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+        f"COALESCE((SELECT MAX(id) FROM {table.name}), 1))"
+    ))
+
+
+def import_snapshot(path, tables=None, mode='replace'):
+    """
+    Nạp snapshot vào DB trong 1 transaction
+
+    Args:
+        mode: 'replace' (xoá dữ liệu cũ của các bảng rồi insert)
+              'merge'   (upsert theo khoá chính, giữ bản ghi không có trong snapshot)
+    Returns:
+        {bảng: số dòng}
+    """
+    manifest = read_manifest(path)
+    errors = verify(path, manifest)
+    if errors:
+        raise SnapshotError('Snapshot hỏng: ' + '; '.join(errors))
+
+    names = [name for name in TABLES if name in manifest['tables'] and (not tables or name in tables)]
+    counts = {}
+
+    try:
+        if mode == 'replace':
+            for name in reversed(names):
+                db.session.execute(_table(name).delete())
+
+        for name in names:
+            table = _table(name)
+            stmt = _insert_statement(table, mode)
+
+            # Khoá ngoại tới bảng ngoài snapshot (vd blogs.author_id → users): id
+            # không tồn tại ở DB đích thì set NULL thay vì lỗi FK
+            dangling = {
+                column_name: {value for (value,) in db.session.execute(select(target))}
+                for column_name, target in _dangling_fk_columns(table, names).items()
+            }
+
+            counts[name] = 0
+            for chunk in _chunks(iter_rows(path, name, manifest), CHUNK_SIZE):
+                for row in chunk:
+                    for column_name, valid_ids in dangling.items():
+                        if row.get(column_name) is not None and row[column_name] not in valid_ids:
+                            row[column_name] = None
+                db.session.execute(stmt, chunk)
+                counts[name] += len(chunk)
+
+            _reset_sequence(table)
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    from app import cache
+    cache.clear_all()
+    return counts
+
+
+# ==================== WARM CACHE LÚC BOOT ====================
+def warm_caches(path):
+    """
+    Nạp các bảng có warmer đăng ký từ snapshot vào cache RAM (không query DB)
+
+    Returns:
+        {bảng: số dòng đã nạp}
+    """
+    manifest = read_manifest(path)
+    warmed = {}
+    for name, fn in _WARMERS.items():
+        if name not in manifest['tables']:
+            continue
+        rows = list(iter_rows(path, name, manifest))
+        fn(rows)
+        warmed[name] = len(rows)
+    return warmed
+
+
+@warmer('settings')
+def _warm_settings(rows):
+    from app import cache
+    cache.namespace('settings').set('all', {row['key']: row['value'] for row in rows})
+
+
+@warmer('categories')
+def _warm_categories(rows):
+    from app import warm_categories_cache
+    from app.models import Category
+
+    # Object transient (không gắn session) - template chỉ đọc id/name/slug
+    warm_categories_cache([Category(**row) for row in rows if row.get('is_active', True)])
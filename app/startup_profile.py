@@ -0,0 +1,234 @@
+"""
+Startup Profiler - Đo chi phí boot của create_app
+
+- Luôn ghi thời gian từng phase của create_app (config, extensions, blueprints,
+  gemini, ...) - chi phí vài µs, không ảnh hưởng production
+- STARTUP_PROFILE=1: in báo cáo phase sau khi create_app xong
+- `flask startup-profile`: chạy `python -X importtime` trong subprocess sạch,
+  gộp chi phí import từng module + phase → báo cáo sắp xếp giảm dần
+- `flask startup-profile --check`: exit 1 nếu tổng thời gian boot hoặc số module
+  import vượt budget (STARTUP_BUDGET_MS, STARTUP_BUDGET_MODULES) → dùng trong CI
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+_REPORT_MARKER = '@@STARTUP_PROFILE@@'
+
+
+def is_enabled():
+    """Bật chế độ profile qua biến môi trường STARTUP_PROFILE=1"""
+    return os.environ.get('STARTUP_PROFILE', '0').lower() in ('1', 'true', 'yes')
+
+
+def rss_kb():
+    """RSS hiện tại của process (KB) - đọc /proc, fallback về ru_maxrss"""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+
+# ==================== MEMORY (smaps_rollup) ====================
+_SMAPS_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty', 'Swap')
+
+
+def memory_report(pid='self'):
+    """
+    RSS chia theo shared / private (KB) từ /proc/<pid>/smaps_rollup (Linux >= 4.14).
+    shared: page còn dùng chung với master/worker khác (copy-on-write chưa bị ghi)
+    private: page riêng của process (đã copy hoặc cấp mới)
+    Không phải Linux → None
+    """
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    values = dict.fromkeys(_SMAPS_FIELDS, 0)
+    for line in lines:
+        name, _, rest = line.partition(':')
+        if name in values:
+            values[name] = int(rest.split()[0])
+    return {
+        'rss_kb': values['Rss'],
+        'pss_kb': values['Pss'],
+        'shared_kb': values['Shared_Clean'] + values['Shared_Dirty'],
+        'private_kb': values['Private_Clean'] + values['Private_Dirty'],
+        'swap_kb': values['Swap'],
+    }
+
+
+def format_memory(report, label=''):
+    if not report:
+        return f'{label}(không đọc được /proc/self/smaps_rollup)'
+    return (
+        f"{label}RSS {report['rss_kb'] // 1024} MB | shared {report['shared_kb'] // 1024} MB | "
+        f"private {report['private_kb'] // 1024} MB | PSS {report['pss_kb'] // 1024} MB"
+    )
+
+# ==================== PHASE TIMER ====================
+class StartupProfile:
+    """Ghi thời gian + RSS tăng thêm giữa các mốc trong create_app"""
+
+    def __init__(self):
+        self.phases = []
+        self._started = None
+        self._last = None
+        self._last_rss = None
+
+    def begin(self):
+        self.phases = []
+        self._started = self._last = time.perf_counter()
+        self._last_rss = rss_kb()
+
+    def mark(self, name):
+        """Kết thúc phase `name` (tính từ mốc trước đó)"""
+        if self._last is None:
+            self.begin()
+        now = time.perf_counter()
+        current_rss = rss_kb()
+        self.phases.append({
+            'phase': name,
+            'ms': round((now - self._last) * 1000, 2),
+            'rss_kb': current_rss - self._last_rss,
+        })
+        self._last = now
+        self._last_rss = current_rss
+
+    @property
+    def total_ms(self):
+        return round(sum(p['ms'] for p in self.phases), 2)
+
+    def as_dict(self):
+        return {'phases': list(self.phases), 'total_ms': self.total_ms, 'rss_kb': rss_kb()}
+
+    def format_report(self):
+        lines = ['⏱️  create_app phases:']
+        for p in sorted(self.phases, key=lambda x: x['ms'], reverse=True):
+            lines.append(f"   {p['phase']:<16} {p['ms']:>9.2f} ms   {p['rss_kb']:>+8} KB")
+        lines.append(f"   {'TOTAL':<16} {self.total_ms:>9.2f} ms   RSS {rss_kb()} KB")
+        return '\n'.join(lines)
+
+
+PROFILE = StartupProfile()
+
+
+# ==================== -X importtime ====================
+def parse_importtime(stderr_text):
+    """
+    Parse output của `python -X importtime`:
+        import time: self [us] | cumulative | imported package
+        import time:       412 |       1042 |   encodings
+    Returns: list dict {module, self_us, cumulative_us, depth}
+    """
+    modules = []
+    for line in stderr_text.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            _, rest = line.split(':', 1)
+            self_us, cumulative_us, name = rest.split('|', 2)
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        modules.append({
+            'module': name.strip(),
+            'self_us': int(self_us.strip()),
+            'cumulative_us': int(cumulative_us.strip()),
+            'depth': depth,
+        })
+    return modules
+
+
+def collect(with_gemini=False, python=None):
+    """
+    Boot app trong subprocess sạch với -X importtime.
+    with_gemini=True: ép import SDK Gemini để đo chi phí (mặc định lazy).
+    """
+    code = (
+        'import json, sys, time\n'
+        't = time.perf_counter()\n'
+        'from app import create_app\n'
+        'app = create_app()\n'
+        'boot_ms = (time.perf_counter() - t) * 1000\n'
+        'from app.startup_profile import PROFILE\n'
+        'from app.chatbot import routes as chatbot_routes\n'
+        f'if {bool(with_gemini)}:\n'
+        '    chatbot_routes.get_genai()\n'
+        'data = PROFILE.as_dict()\n'
+        'data.update(boot_ms=round(boot_ms, 2), module_count=len(sys.modules),\n'
+        '            gemini=chatbot_routes.GEMINI_IMPORT_STATS)\n'
+        f'print({_REPORT_MARKER!r} + json.dumps(data))\n'
+    )
+    env = dict(os.environ, STARTUP_PROFILE='0', GEMINI_WARMUP='0')
+    proc = subprocess.run(
+        [python or sys.executable, '-X', 'importtime', '-c', code],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True
+    )
+
+    result = None
+    for line in proc.stdout.splitlines():
+        if line.startswith(_REPORT_MARKER):
+            result = json.loads(line[len(_REPORT_MARKER):])
+    if result is None:
+        raise RuntimeError(f'Startup profile subprocess failed:\n{proc.stderr[-2000:]}')
+
+    result['imports'] = parse_importtime(proc.stderr)
+    return result
+
+
+def format_report(result, top=25):
+    """Báo cáo: phase create_app + top module import chậm nhất"""
+    lines = [
+        '=' * 70,
+        '🚀 STARTUP PROFILE',
+        '=' * 70,
+        f"Boot (import + create_app): {result['boot_ms']:.0f} ms | "
+        f"modules: {result['module_count']} | RSS: {result['rss_kb'] // 1024} MB",
+        '',
+        'create_app phases:',
+    ]
+    for p in sorted(result['phases'], key=lambda x: x['ms'], reverse=True):
+        lines.append(f"   {p['phase']:<16} {p['ms']:>9.2f} ms   {p['rss_kb']:>+8} KB")
+
+    gemini = result.get('gemini') or {}
+    if gemini.get('imported'):
+        lines.append('')
+        lines.append(f"Gemini SDK: import {gemini['import_seconds']}s, +{gemini['import_rss_kb']} KB RSS")
+
+    # Top-level packages (depth 0) theo cumulative: ai kéo cả cây dependency vào
+    packages = [m for m in result['imports'] if m['depth'] == 0]
+    lines.append('')
+    lines.append(f'Top {top} top-level imports (cumulative):')
+    for m in sorted(packages, key=lambda x: x['cumulative_us'], reverse=True)[:top]:
+        lines.append(f"   {m['cumulative_us'] / 1000:>9.1f} ms   {m['module']}")
+
+    lines.append('')
+    lines.append(f'Top {top} modules (self):')
+    for m in sorted(result['imports'], key=lambda x: x['self_us'], reverse=True)[:top]:
+        lines.append(f"   {m['self_us'] / 1000:>9.1f} ms   {m['module']}")
+    lines.append('=' * 70)
+    return '\n'.join(lines)
+
+
+def check_budget(result, max_boot_ms=None, max_modules=None):
+    """Trả về danh sách vi phạm budget (rỗng = OK)"""
+    max_boot_ms = max_boot_ms or int(os.environ.get('STARTUP_BUDGET_MS', 5000))
+    max_modules = max_modules or int(os.environ.get('STARTUP_BUDGET_MODULES', 1500))
+
+    violations = []
+    if result['boot_ms'] > max_boot_ms:
+        violations.append(f"Boot time {result['boot_ms']:.0f} ms > budget {max_boot_ms} ms")
+    if result['module_count'] > max_modules:
+        violations.append(f"Imported modules {result['module_count']} > budget {max_modules}")
+    return violations
@@ -2,10 +2,13 @@
 Gunicorn config - Render Starter (512MB RAM, 0.5 CPU)
 """
 
+import gc
 import os
 
 # ===== WORKERS / THREADS =====
-workers = 1
+# 1 worker mặc định (512MB). Chạy 2-3 worker thì bật SHARED_CACHE_ENABLED=1
+# (settings/danh mục/slug đọc chung từ /dev/shm) + CACHE_BUS=poll|notify
+workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
 threads = int(os.environ.get("GTHREADS", "3"))  # bắt đầu 3; nâng 4 nếu cần
 worker_class = "gthread"
 
@@ -15,6 +18,8 @@ graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL", "30"))
 keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "2"))
 
 # ===== MEMORY LEAK GUARD =====
+# Recycle worker sau N request (0 = tắt). Tìm chỗ rò bằng /admin/diagnostics
+# (DIAGNOSTICS_ENABLED=1) trước khi nâng/tắt
 max_requests = int(os.environ.get("GUNICORN_MAX_REQ", "300"))
 max_requests_jitter = int(os.environ.get("GUNICORN_MAX_JITTER", "60"))
 
@@ -23,9 +28,16 @@ bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
 backlog = int(os.environ.get("GUNICORN_BACKLOG", "256"))
 
 # ===== PERF / PROXY COMPAT =====
-preload_app = True           # 1 worker → an toàn, warm-up nhanh
+preload_app = True           # master nạp app 1 lần, worker fork dùng chung page (copy-on-write)
 sendfile = False             # tránh lỗi với reverse proxy
 
+# ===== COPY-ON-WRITE =====
+# Master: tắt GC tự động trong lúc import/warm-up (GC duyệt object = ghi lên page),
+# when_ready warm-up rồi gc.freeze(); worker bật lại GC trong post_fork
+_PRELOAD_WARMUP = os.environ.get("PRELOAD_WARMUP", "1") == "1"
+if preload_app and _PRELOAD_WARMUP:
+    gc.disable()
+
 # ===== LOGGING =====
 accesslog = "-"
 errorlog = "-"
@@ -36,9 +48,35 @@ def on_starting(server):
     print("🚀 Gunicorn starting (Render 512MB)")
     print(f"   Workers: {workers} | Threads: {threads} | Timeout: {timeout}s | Preload: {preload_app}")
 
+def when_ready(server):
+    # preload_app: import hết module, compile template, nạp cache, ghi shared cache
+    # rồi gc.freeze() ở master trước khi fork worker
+    if not (preload_app and _PRELOAD_WARMUP):
+        return
+    from app.preload import warm_up
+    from app.startup_profile import format_memory, memory_report
+
+    report = warm_up(server.app.wsgi())
+    print(
+        f"🔥 Preload: {report['modules']} modules | {report['templates']} templates | "
+        f"caches {', '.join(report['caches']) or '-'} | frozen {report['frozen']} objects ({report['ms']} ms)"
+    )
+    for name, error in report['errors'].items():
+        print(f"   ⚠️ {name}: {error}")
+    print(format_memory(memory_report(), "   Master: "))
+
 def post_fork(server, worker):
+    if preload_app and _PRELOAD_WARMUP:
+        gc.enable()  # object đã freeze ở master không bị GC của worker duyệt
     print(f"✅ Worker {worker.pid} ready")
 
+def post_worker_init(worker):
+    # Worker đã load app → warm-up Gemini SDK trong thread nền (không chặn request)
+    from app.chatbot.routes import start_warmup
+    from app.startup_profile import format_memory, memory_report
+    start_warmup(worker.wsgi)
+    print(format_memory(memory_report(), f"   Worker {worker.pid} (sau fork): "))
+
 def worker_int(worker):
     print(f"⚠️ Worker {worker.pid} received SIGINT")
 
@@ -46,4 +84,7 @@ def worker_abort(worker):
     print(f"❌ Worker {worker.pid} aborted (timeout/crash)")
 
 def worker_exit(server, worker):
-    print(f"👋 Worker {worker.pid} exited")
\ No newline at end of file
+    # Chạy trong worker: RSS private lúc recycle (max_requests) = phần đã bị copy / cấp mới
+    from app.startup_profile import format_memory, memory_report
+    print(f"👋 Worker {worker.pid} exited")
+    print(format_memory(memory_report(), "   "))
\ No newline at end of file
@@ -1,4 +1,6 @@
 import os
+import sys
+import click
 from app import create_app, db
 from app.models import User, Category, Product, Banner, Blog, FAQ, Contact
 
@@ -31,6 +33,144 @@ def init_db():
     print("ℹ Để seed dữ liệu mẫu, chạy: python seed/seed_data.py")
 
 
+@app.cli.command('startup-profile')
+@click.option('--top', default=25, show_default=True, help='Số module chậm nhất hiển thị')
+@click.option('--check', is_flag=True, help='Exit 1 nếu vượt STARTUP_BUDGET_MS / STARTUP_BUDGET_MODULES')
+@click.option('--with-gemini', is_flag=True, help='Ép import SDK Gemini để đo chi phí')
+def startup_profile(top, check, with_gemini):
+    """Đo thời gian boot (-X importtime + phase create_app) trong subprocess sạch"""
+    from app.startup_profile import collect, format_report, check_budget
+
+    result = collect(with_gemini=with_gemini)
+    print(format_report(result, top=top))
+
+    if check:
+        violations = check_budget(result)
+        if violations:
+            for violation in violations:
+                print(f"❌ {violation}")
+            sys.exit(1)
+        print("✓ Startup nằm trong budget")
+
+
+@app.cli.command('build-assets')
+@click.option('--no-minify', is_flag=True, help='Không minify CSS/JS')
+def build_assets(no_minify):
+    """Fingerprint + bundle CSS/JS vào app/static/dist (chạy trước compress-static)"""
+    from app.assets import build
+
+    manifest = build(app.static_folder, minify=not no_minify)
+    for name, target in sorted(manifest.items()):
+        print(f"✓ {name} → {target}")
+
+
+@app.cli.command('compress-static')
+@click.option('--force', is_flag=True, help='Nén lại cả file đã có bản .br/.gz')
+def compress_static(force):
+    """Tạo sẵn file .br / .gz cho app/static (chạy lúc build/deploy)"""
+    from app.compression import brotli, build_static
+
+    built, original, compressed = build_static(app.static_folder, app.config['COMPRESS_MIN_SIZE'], force=force)
+    if brotli is None:
+        print("ℹ Chưa cài brotli - chỉ tạo .gz")
+    print(f"✓ Đã nén {built} file ({original // 1024} KB → {compressed // 1024} KB)")
+
+
+@app.cli.command('rebuild-quiz-analytics')
+def rebuild_quiz_analytics():
+    """Tính lại bảng rollup phân bố đáp án từ user_answers"""
+    from app.quiz.analytics import rebuild_rollup
+    rebuild_rollup()
+    print("✓ Đã tính lại question_answer_stats")
+
+
+@app.cli.command('rebuild-related')
+@click.option('--kind', type=click.Choice(['product', 'blog', 'project']), multiple=True,
+              help='Chỉ tính lại loại này (mặc định: cả 3)')
+def rebuild_related(kind):
+    """Tính lại top-N item liên quan (TF-IDF + cùng danh mục/loại)"""
+    from app.related import KINDS, rebuild
+
+    for name, count in rebuild(kind or KINDS).items():
+        print(f"✓ {name}: {count} item")
+
+
+@app.cli.command('quiz-qr')
+@click.option('--base-url', required=True, help='Domain public, vd: https://bricon.vn')
+def quiz_qr(base_url):
+    """Tạo sẵn ảnh QR (PNG + SVG) cho tất cả đề thi"""
+    from flask import url_for
+    from app.quiz.models import Quiz
+    from app.quiz.qr import pregenerate
+
+    with app.test_request_context(base_url=base_url):
+        rendered = pregenerate(
+            Quiz.query.all(),
+            lambda quiz: url_for('quiz.quiz_take', slug=quiz.slug, _external=True)
+        )
+    print(f"✓ Đã tạo {rendered} ảnh QR")
+
+
+# ==================== SNAPSHOT CATALOG ====================
+@app.cli.group()
+def snapshot():
+    """Xuất / nhập snapshot catalog (gzip JSONL + manifest)"""
+
+
+@snapshot.command('export')
+@click.argument('path')
+@click.option('--table', 'tables', multiple=True, help='Chỉ xuất bảng này (lặp lại được)')
+def snapshot_export(path, tables):
+    """Xuất catalog ra thư mục PATH"""
+    from app.snapshot import TABLES, export_snapshot
+
+    manifest = export_snapshot(path, tables or TABLES)
+    for name, info in manifest['tables'].items():
+        print(f"✓ {name}: {info['rows']} dòng ({info['sha256'][:12]})")
+    print(f"✓ Đã ghi snapshot vào {path}")
+
+
+@snapshot.command('import')
+@click.argument('path')
+@click.option('--table', 'tables', multiple=True, help='Chỉ nhập bảng này (lặp lại được)')
+@click.option('--mode', type=click.Choice(['replace', 'merge']), default='replace', show_default=True,
+              help='replace: xoá dữ liệu cũ rồi nhập | merge: upsert theo khoá chính')
+@click.option('--yes', is_flag=True, help='Không hỏi xác nhận')
+def snapshot_import(path, tables, mode, yes):
+    """Nhập snapshot từ thư mục PATH (kiểm tra checksum trước khi ghi)"""
+    from app.snapshot import SnapshotError, import_snapshot
+
+    if mode == 'replace' and not yes:
+        click.confirm('Dữ liệu hiện tại của các bảng trong snapshot sẽ bị XOÁ. Tiếp tục?', abort=True)
+
+    try:
+        counts = import_snapshot(path, tables or None, mode=mode)
+    except SnapshotError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    for name, count in counts.items():
+        print(f"✓ {name}: {count} dòng")
+
+
+@snapshot.command('verify')
+@click.argument('path')
+def snapshot_verify(path):
+    """Kiểm tra số dòng + checksum của snapshot"""
+    from app.snapshot import SnapshotError, verify
+
+    try:
+        errors = verify(path)
+    except SnapshotError as e:
+        errors = [str(e)]
+
+    if errors:
+        for error in errors:
+            print(f"❌ {error}")
+        sys.exit(1)
+    print("✓ Snapshot hợp lệ")
+
+
 # 🔥 TỐI ƯU: Chỉ chạy dev server khi chạy trực tiếp
 # Gunicorn sẽ import app object, không chạy phần này
 if __name__ == '__main__':